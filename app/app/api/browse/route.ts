@@ -9,7 +9,7 @@ import { getSettings } from '@/lib/db';
 export const dynamic = 'force-dynamic';
 
 /**
- * GET /api/browse?path=...&recursive=...&pattern=...
+ * GET /api/browse?path=...&recursive=...&pattern=...&cursor=...&limit=...
  * Browse any directory on the runner's system
  */
 export async function GET(request: NextRequest) {
@@ -17,8 +17,10 @@ export async function GET(request: NextRequest) {
   const path = searchParams.get('path') || '';
   const recursive = searchParams.get('recursive') === 'true';
   const pattern = searchParams.get('pattern') || '';
+  const cursor = searchParams.get('cursor') || '';
+  const limit = searchParams.get('limit') || '';
 
-  console.log(`[API/browse] GET /api/browse path=${path} recursive=${recursive} pattern=${pattern}`);
+  console.log(`[API/browse] GET /api/browse path=${path} recursive=${recursive} pattern=${pattern} cursor=${cursor}`);
 
   try {
     const settings = await getSettings();
@@ -37,6 +39,8 @@ export async function GET(request: NextRequest) {
     if (path) params.set('path', path);
     if (recursive) params.set('recursive', 'true');
     if (pattern) params.set('pattern', pattern);
+    if (cursor) params.set('cursor', cursor);
+    if (limit) params.set('limit', limit);
 
     const url = `${runnerUrl}/browse?${params.toString()}`;
     console.log(`[API/browse] Calling ${url}`);
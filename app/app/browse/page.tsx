@@ -4,7 +4,7 @@ import { useState, useEffect } from 'react';
 
 interface FileEntry {
   name: string;
-  type: 'file' | 'dir' | 'drive';
+  type: 'file' | 'dir' | 'drive' | 'symlink';
   path?: string;
   size?: number;
   relative?: string;
@@ -17,6 +17,8 @@ interface AnalysisResult {
   error?: string;
 }
 
+const PAGE_SIZE = 500;
+
 export default function BrowsePage() {
   const [currentPath, setCurrentPath] = useState('');
   const [entries, setEntries] = useState<FileEntry[]>([]);
@@ -26,6 +28,8 @@ export default function BrowsePage() {
   const [error, setError] = useState<string | null>(null);
   const [pattern, setPattern] = useState('');
   const [recursive, setRecursive] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [truncated, setTruncated] = useState(false);
 
   // Code Analysis
   const [selectedFiles, setSelectedFiles] = useState<string[]>([]);
@@ -37,7 +41,10 @@ export default function BrowsePage() {
     loadDirectory(currentPath);
   }, []);
 
-  const loadDirectory = async (path: string, opts?: { pattern?: string; recursive?: boolean }) => {
+  const loadDirectory = async (
+    path: string,
+    opts?: { pattern?: string; recursive?: boolean; cursor?: string }
+  ) => {
     try {
       setLoading(true);
       setError(null);
@@ -46,6 +53,8 @@ export default function BrowsePage() {
       if (path) params.set('path', path);
       if (opts?.pattern || pattern) params.set('pattern', opts?.pattern || pattern);
       if (opts?.recursive ?? recursive) params.set('recursive', 'true');
+      if (opts?.cursor) params.set('cursor', opts.cursor);
+      params.set('limit', String(PAGE_SIZE));
 
       const res = await fetch(`/api/browse?${params.toString()}`);
       const json = await res.json();
@@ -54,12 +63,19 @@ export default function BrowsePage() {
         throw new Error(json.error || 'Failed to load directory');
       }
 
-      setEntries(Array.isArray(json.entries) ? json.entries : []);
+      const page: FileEntry[] = Array.isArray(json.entries) ? json.entries : [];
+      // Later pages extend the list; a new directory or filter replaces it
+      setEntries(prev => (opts?.cursor ? [...prev, ...page] : page));
+      setNextCursor(json.next_cursor || null);
+      setTruncated(Boolean(json.truncated));
       setCurrentPath(json.path || path);
     } catch (err) {
       console.error('[Browse] Error:', err);
       setError(err instanceof Error ? err.message : 'Failed to load directory');
-      setEntries([]);
+      if (!opts?.cursor) {
+        setEntries([]);
+        setNextCursor(null);
+      }
     } finally {
       setLoading(false);
     }
@@ -292,6 +308,20 @@ export default function BrowsePage() {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <button
+                    onClick={() => loadDirectory(currentPath, { cursor: nextCursor })}
+                    disabled={loading}
+                    className="w-full p-3 text-sm text-indigo-300 hover:bg-gray-800/50 disabled:opacity-50"
+                  >
+                    {loading ? 'Loading...' : 'Load more'}
+                  </button>
+                )}
+                {!nextCursor && truncated && (
+                  <div className="p-3 text-xs text-center text-gray-500">
+                    Search stopped at its depth/entry limit; narrow the pattern to see more
+                  </div>
+                )}
               </div>
             )}
           </div>
@@ -0,0 +1,4 @@
+"""
+Benchmarks for Project ME v0
+Run with: python -m benchmarks.bench --help
+"""
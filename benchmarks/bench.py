@@ -0,0 +1,446 @@
+"""
+Benchmark suite for Project ME v0
+Times the task store, event log, tools and runner endpoints.
+
+Synthetic task/event logs are generated at each requested size in a
+temporary directory; every TaskStore and MemoryStore query method is then
+timed against them, and the memory a full load holds is measured with
+tracemalloc (the "memory" entry of each size). Tools and runner endpoints
+are timed once (their cost does not depend on the log size) against a
+scratch sandbox, with LM Studio replaced by the stub server in stub_llm.py.
+Nothing under logs/ or the real sandbox is touched.
+
+Results are written as JSON so runs from different commits can be compared:
+    python -m benchmarks.bench --sizes 1e3,1e4,1e5 --output before.json
+    python -m benchmarks.bench --sizes 1e3,1e4,1e5 --output after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .stub_llm import StubLLMServer, add_stub_arguments, stub_from_args
+
+SUITES = ("task_store", "memory_store", "tools", "runner")
+
+TASK_TYPES = ["shell", "code_analysis", "generic_llm", "filesystem", "agent"]
+TASK_STATUSES = ["pending", "running", "done", "failed"]
+TAGS = ["urgent", "backend", "frontend", "infra", "docs", "bug", "feature", "research"]
+EVENT_TYPES = ["task_started", "task_completed", "task_failed", "tool_called", "tool_result",
+               "llm_request", "llm_response", "error", "info", "tool_span"]
+
+
+# ========== SYNTHETIC DATA ==========
+
+def generate_tasks(path: Path, count: int, seed: int = 0) -> List[str]:
+    """Write `count` synthetic tasks to a JSONL file and return their ids."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    ids = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            task_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            status = rng.choice(TASK_STATUSES)
+            stamp = (start + timedelta(seconds=i * 7)).isoformat()
+            record = {  # Field order as written by Task.to_dict() (blobs last)
+                "id": task_id,
+                "type": rng.choice(TASK_TYPES),
+                "status": status,
+                "created_at": stamp,
+                "updated_at": stamp,
+                "error": "synthetic failure" if status == "failed" else None,
+                "title": f"Task {i}",
+                "tags": rng.sample(TAGS, rng.randint(0, 3)),
+                "payload": {"prompt": f"Synthetic task {i}: " + "lorem ipsum " * rng.randint(1, 20)},
+                "result": {"summary": "ok", "steps": rng.randint(1, 8)} if status == "done" else None,
+            }
+            f.write(json.dumps(record) + "\n")
+            ids.append(task_id)
+    return ids
+
+
+def generate_events(path: Path, count: int, task_ids: List[str], seed: int = 0):
+    """Write `count` synthetic events (spread over `task_ids`) to a JSONL file."""
+    rng = random.Random(seed + 1)
+    start = datetime(2024, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            event_type = rng.choice(EVENT_TYPES)
+            record = {
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "event_type": event_type,
+                "timestamp": (start + timedelta(seconds=i)).isoformat(),
+                "task_id": rng.choice(task_ids) if task_ids and rng.random() < 0.9 else None,
+                "data": {"message": f"{event_type} #{i}", "duration_ms": round(rng.random() * 100, 3)},
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+# ========== TIMING ==========
+
+def measure(func: Callable[[], Any], repeat: int, max_seconds: float,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Time `func` up to `repeat` times (stopping early once `max_seconds` is spent).
+
+    Returns:
+        Dict with runs, min_ms, median_ms, mean_ms, max_ms and error (first exception, if any)
+    """
+    timings = []
+    error = None
+    budget_start = time.perf_counter()
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as exc:
+            error = error or f"{type(exc).__name__}: {exc}"
+        timings.append((time.perf_counter() - start) * 1000)
+        if time.perf_counter() - budget_start > max_seconds:
+            break
+    return {
+        "runs": len(timings),
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "max_ms": round(max(timings), 4),
+        "error": error,
+    }
+
+
+def measure_footprint(func: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Memory held by `func`'s return value, traced with tracemalloc.
+
+    Returns:
+        Dict with retained_bytes (still allocated when func returns), peak_bytes and bytes_per_item
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    count = len(value) if hasattr(value, "__len__") else 0
+    return {
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "bytes_per_item": round(retained / count, 1) if count else None,
+    }
+
+
+# ========== SUITES ==========
+
+def bench_task_store(workdir: Path, size: int, repeat: int, max_seconds: float) -> Dict[str, Any]:
+    from src.tasks import TaskStore
+
+    path = workdir / f"tasks_{size}.jsonl"
+    ids = generate_tasks(path, size)
+    store = TaskStore(filepath=path)
+    middle_id = ids[len(ids) // 2]
+    existing = store.get_task_by_id(middle_id)
+
+    cases = {
+        "load_all_tasks": lambda: store.load_all_tasks(),
+        "load_task_records": lambda: store.load_task_records(),
+        "get_next_pending_task": lambda: store.get_next_pending_task(),
+        "get_task_by_id": lambda: store.get_task_by_id(middle_id),
+        "get_task_by_id_missing": lambda: store.get_task_by_id("missing"),
+        "get_recent_tasks": lambda: store.get_recent_tasks(limit=10),
+        "get_tasks_by_status": lambda: store.get_tasks_by_status("pending"),
+        "get_tasks_by_type": lambda: store.get_tasks_by_type("shell"),
+        "get_tasks_by_tag": lambda: store.get_tasks_by_tag("urgent"),
+        "get_tasks_filtered": lambda: store.get_tasks_filtered(status="done", task_type="shell", tag="bug", limit=20),
+        "create_task": lambda: store.create_task("generic_llm", {"prompt": "bench"}, title="bench", tags=["bench"]),
+        "create_task_x1000": lambda: [store.create_task("generic_llm", {"prompt": "bench"}, title="bench", tags=["bench"])
+                                      for _ in range(1000)],
+        "create_tasks_x1000": lambda: store.create_tasks([{"type": "generic_llm", "payload": {"prompt": "bench"},
+                                                           "title": "bench", "tags": ["bench"]}] * 1000),
+        "update_task": lambda: store.update_task(existing),
+    }
+    results = {name: measure(func, repeat, max_seconds) for name, func in cases.items()}
+    results["memory"] = {name: measure_footprint(cases[name]) for name in ("load_all_tasks", "load_task_records")}
+    return results
+
+
+def bench_memory_store(workdir: Path, size: int, repeat: int, max_seconds: float) -> Dict[str, Any]:
+    from src.memory import MemoryStore, EventType
+
+    path = workdir / f"events_{size}.jsonl"
+    task_ids = [str(uuid.UUID(int=i, version=4)) for i in range(max(1, size // 20))]
+    generate_events(path, size, task_ids)
+    store = MemoryStore(filepath=path)
+    task_id = task_ids[len(task_ids) // 2]
+
+    cases = {
+        "load_all_events": lambda: store.load_all_events(),
+        "load_event_records": lambda: store.load_event_records(),
+        "get_events_for_task": lambda: store.get_events_for_task(task_id),
+        "get_recent_events": lambda: store.get_recent_events(limit=50),
+        "get_events_by_type": lambda: store.get_events_by_type("tool_called", limit=100),
+        "get_recent_events_for_task": lambda: store.get_recent_events_for_task(task_id, limit=20),
+        "tail_events": lambda: store.tail_events(limit=10),
+        "format_events_for_context": lambda: store.format_events_for_context(task_id),
+        "log_event": lambda: store.log_event(EventType.INFO, {"message": "bench"}, task_id=task_id),
+        "log_event_async_x100": lambda: [store.log_event_async(EventType.INFO, {"message": "bench"}) for _ in range(100)],
+        "log_event_async_x100+flush": lambda: ([store.log_event_async(EventType.INFO, {"message": "bench"})
+                                                for _ in range(100)], store.flush()),
+    }
+    results = {name: measure(func, repeat, max_seconds) for name, func in cases.items()}
+    results["memory"] = {name: measure_footprint(cases[name]) for name in ("load_all_events", "load_event_records")}
+    return results
+
+
+def _make_tree(root: Path, files: int = 200):
+    """A small source tree for tools, browsing and analysis benchmarks."""
+    rng = random.Random(42)
+    for i in range(files):
+        sub = root / "project" / f"pkg{i % 10}"
+        sub.mkdir(parents=True, exist_ok=True)
+        body = "\n".join(
+            f"def func_{i}_{j}(value):\n    \"\"\"Compute step {j}.\"\"\"\n    return value * {rng.randint(1, 99)}\n"
+            for j in range(20)
+        )
+        (sub / f"module_{i}.py").write_text(f'"""Module {i}."""\nimport os\n\n{body}', encoding="utf-8")
+
+
+def bench_tools(workdir: Path, repeat: int, max_seconds: float) -> Dict[str, Any]:
+    from src.tools import get_tool, list_tools
+    from src.tools.memo import tool_memo
+
+    root = workdir / "tools"
+    _make_tree(root, files=50)
+    sample = root / "project" / "pkg0" / "module_0.py"
+    scratch = root / "scratch.txt"
+    script = root / "hello.py"
+    script.write_text("print('hello')\n", encoding="utf-8")
+    shell_command = "echo hello"
+
+    cases = {
+        "read_file": (lambda: get_tool("read_file")(filepath=str(sample)), None),
+        "read_file_uncached": (lambda: get_tool("read_file")(filepath=str(sample)), tool_memo.clear),
+        "list_directory": (lambda: get_tool("list_directory")(dirpath=str(sample.parent)), None),
+        "list_directory_uncached": (lambda: get_tool("list_directory")(dirpath=str(sample.parent)), tool_memo.clear),
+        "write_file": (lambda: get_tool("write_file")(filepath=str(scratch), content="x" * 4096), None),
+        "append_file": (lambda: get_tool("append_file")(filepath=str(scratch), content="y" * 128), None),
+        "run_python_script": (lambda: get_tool("run_python_script")(script_path=str(script)), None),
+        "run_shell_command": (lambda: get_tool("run_shell_command")(command=shell_command), None),
+    }
+    results = {}
+    for name, (func, setup) in cases.items():
+        # Tools report failure in their result rather than raising; surface it the same way
+        def checked(func=func):
+            result = func()
+            if isinstance(result, dict) and not result.get("success", True):
+                raise RuntimeError(result.get("error") or result.get("stderr") or "tool failed")
+        results[name] = measure(checked, repeat, max_seconds, setup=setup)
+    results["_tools_listed"] = list_tools()
+    return results
+
+
+def bench_runner(workdir: Path, repeat: int, max_seconds: float) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    import runner
+
+    sandbox = Path(runner.SANDBOX_DIR)
+    _make_tree(sandbox)
+    (sandbox / "notes.txt").write_text("line\n" * 2000, encoding="utf-8")
+    client = TestClient(runner.app)
+
+    def expect_ok(method: str, url: str, **kwargs) -> Callable[[], Any]:
+        def call():
+            response = client.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+            if isinstance(body, dict) and body.get("ok") is False:
+                raise RuntimeError(body.get("error") or "ok=false")
+            return response
+        return call
+
+    module = "project/pkg1/module_1.py"
+    cases = {
+        "GET /health": expect_ok("GET", "/health"),
+        "GET /ngrok-url": expect_ok("GET", "/ngrok-url"),
+        "POST /run-task": expect_ok("POST", "/run-task", json={
+            "task_id": "bench", "title": "Benchmark", "payload": {"prompt": "Say hello"}}),
+        "GET /sandbox/list": expect_ok("GET", "/sandbox/list", params={"path": "project/pkg1"}),
+        "GET /sandbox/tree": expect_ok("GET", "/sandbox/tree", params={"path": "project"}),
+        "GET /sandbox/tree?hashes": expect_ok("GET", "/sandbox/tree", params={"path": "project", "hashes": "true"}),
+        "GET /sandbox/read": expect_ok("GET", "/sandbox/read", params={"path": module}),
+        "GET /sandbox/read?lines": expect_ok("GET", "/sandbox/read", params={
+            "path": "notes.txt", "start_line": 100, "num_lines": 50}),
+        "GET /sandbox/download": expect_ok("GET", "/sandbox/download", params={"path": "notes.txt"}),
+        "POST /sandbox/write": expect_ok("POST", "/sandbox/write", json={"path": "bench/out.txt", "content": "x" * 4096}),
+        "PUT /sandbox/upload": expect_ok("PUT", "/sandbox/upload", params={"path": "bench/upload.bin"},
+                                         content=os.urandom(256 * 1024)),
+        "POST /sandbox/batch": expect_ok("POST", "/sandbox/batch", json={"ops": [
+            {"op": "read", "path": f"project/pkg{i}/module_{i}.py"} for i in range(10)]}),
+        "POST /sandbox/gc": expect_ok("POST", "/sandbox/gc"),
+        "GET /sandbox/archive": expect_ok("GET", "/sandbox/archive", params={"path": "project/pkg2"}),
+        "POST /shell": expect_ok("POST", "/shell", json={"command": "echo hello"}),
+        "GET /browse": expect_ok("GET", "/browse", params={"path": str(sandbox / "project")}),
+        "GET /browse?recursive": expect_ok("GET", "/browse", params={"path": str(sandbox / "project"), "recursive": "true"}),
+        "GET /browse/read": expect_ok("GET", "/browse/read", params={"path": str(sandbox / module)}),
+        "GET /analyze/outline": expect_ok("GET", "/analyze/outline", params={"path": module}),
+        "POST /analyze": expect_ok("POST", "/analyze", json={"files": [module], "prompt": "Review this"}),
+        "POST /analyze?outline": expect_ok("POST", "/analyze", json={
+            "files": [module], "prompt": "Review this", "mode": "outline"}),
+        "POST /analyze?directory": expect_ok("POST", "/analyze", json={
+            "directory": "project", "prompt": "Where is func_3_7 computed?"}),
+    }
+    return {name: measure(func, repeat, max_seconds) for name, func in cases.items()}
+
+
+# ========== REPORTING ==========
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent.parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _iter_medians(results: Dict[str, Any]):
+    """Yield (benchmark key, median_ms) for every timed case in a results document."""
+    for suite in SUITES:
+        section = results.get(suite) or {}
+        for key, value in section.items():
+            if isinstance(value, dict) and "median_ms" in value:
+                yield f"{suite}/{key}", value["median_ms"]
+            elif isinstance(value, dict):
+                for name, stats in value.items():
+                    if isinstance(stats, dict) and "median_ms" in stats:
+                        yield f"{suite}/{key}/{name}", stats["median_ms"]
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Median timings of two runs side by side (ratio > 1 means slower than the baseline)."""
+    before = dict(_iter_medians(baseline))
+    rows = []
+    for key, median in _iter_medians(current):
+        if key in before:
+            ratio = median / before[key] if before[key] else None
+            rows.append({"benchmark": key, "baseline_ms": before[key], "current_ms": median,
+                         "ratio": round(ratio, 3) if ratio is not None else None})
+    return rows
+
+
+def isolate(stub: StubLLMServer, workdir: Path):
+    """
+    Point the LLM client, runner and global event log at the stub and `workdir`.
+
+    Must run before src/runner are first imported: both read these settings
+    at import time.
+    """
+    os.environ["LM_STUDIO_BASE_URL"] = stub.base_url
+    os.environ["LM_ENDPOINT"] = stub.chat_endpoint
+    os.environ["SANDBOX_DIR"] = str(workdir / "sandbox")
+    os.environ.setdefault("RUNNER_LOG_LEVEL", "WARNING")
+    from src.memory import memory
+    memory.flush()
+    memory.filepath = workdir / "events_global.jsonl"  # Tool spans and LLM events land here
+
+
+def run(sizes: List[int], suites: List[str], repeat: int, max_seconds: float,
+        stub: StubLLMServer, workdir: Optional[Path] = None) -> Dict[str, Any]:
+    """Run the selected suites (with LM Studio replaced by `stub`) and return the results document."""
+    own_workdir = workdir is None
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="project_me_bench_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    stub.start()
+    isolate(stub, workdir)
+    from src.memory import memory
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "max_seconds": max_seconds,
+            "stub": stub.settings(),
+        }
+    }
+    try:
+        for suite in suites:
+            print(f"[Bench] {suite}...", file=sys.stderr)
+            if suite == "task_store":
+                results[suite] = {str(n): bench_task_store(workdir, n, repeat, max_seconds) for n in sizes}
+            elif suite == "memory_store":
+                results[suite] = {str(n): bench_memory_store(workdir, n, repeat, max_seconds) for n in sizes}
+            elif suite == "tools":
+                results[suite] = bench_tools(workdir, repeat, max_seconds)
+            elif suite == "runner":
+                results[suite] = bench_runner(workdir, repeat, max_seconds)
+        memory.flush()
+        results["meta"]["stub_stats"] = stub.stats()
+    finally:
+        stub.stop()
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _parse_sizes(text: str) -> List[int]:
+    return [int(float(part)) for part in text.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Project ME benchmark suite")
+    parser.add_argument("--sizes", default="1e3,1e4,1e5", help="Comma-separated log sizes (e.g. 1e3,1e4,1e5,1e6)")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Stop repeating a benchmark after this long")
+    parser.add_argument("--workdir", help="Keep generated data here instead of a temporary directory")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+    results = run(_parse_sizes(args.sizes), suites, args.repeat, args.max_seconds, stub_from_args(args),
+                  Path(args.workdir) if args.workdir else None)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            results["comparison"] = {"baseline": args.compare, "rows": compare(results, json.load(f))}
+        for row in results["comparison"]["rows"]:
+            print(f"{row['benchmark']:<60} {row['baseline_ms']:>10.3f} -> {row['current_ms']:>10.3f} ms"
+                  f"  x{row['ratio']}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"[Bench] Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
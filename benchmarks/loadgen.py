@@ -0,0 +1,283 @@
+"""
+Load generator for Project ME v0
+Pushes concurrent work through the agent and runner against the stub LLM.
+
+Each target is driven by a pool of `concurrency` threads until `tasks`
+requests have completed:
+
+- agent:    Agent.process_task on generic_llm tasks (each worker thread has
+            its own Agent and task file, since TaskStore.update_task
+            rewrites the whole file and is not safe across threads)
+- run-task: POST /run-task
+- analyze:  POST /analyze on a generated source file
+- stream:   streamed chat completions straight to the stub (reports TTFT)
+
+Runner targets go through FastAPI's in-process TestClient unless
+--runner-url points at a running runner (start it with LM_ENDPOINT set to
+the stub's URL so it does not call a real model).
+
+Throughput and latency percentiles are printed and written as JSON:
+    python -m benchmarks.loadgen --tasks 200 --concurrency 16 --ttft 0.2 --tokens-per-second 40
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from .bench import isolate
+from .stub_llm import StubLLMServer, add_stub_arguments, stub_from_args
+
+TARGETS = ("agent", "run-task", "analyze", "stream")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {
+        "p50": round(percentile(ordered, 50), 3),
+        "p90": round(percentile(ordered, 90), 3),
+        "p99": round(percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3),
+        "mean": round(statistics.fmean(ordered), 3),
+    }
+
+
+def run_load(request: Callable[[int], Optional[float]], count: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Call `request(i)` for i in range(count) on `concurrency` threads.
+
+    `request` raises on failure and may return a time-to-first-token in
+    seconds (reported separately from the full latency).
+
+    Returns:
+        Dict with requests, ok, errors, error_samples, wall_seconds, throughput_rps,
+        latency_ms (p50/p90/p99/max/mean) and, if reported, ttft_ms
+    """
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            ttft = request(i)
+        except Exception as exc:
+            with lock:
+                errors.append(f"{type(exc).__name__}: {exc}")
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed * 1000)
+            if ttft is not None:
+                ttfts.append(ttft * 1000)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="load") as pool:
+        list(pool.map(one, range(count)))
+    wall = time.perf_counter() - wall_start
+
+    report = {
+        "requests": count,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": list(dict.fromkeys(errors))[:3],
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": _latency_summary(latencies),
+    }
+    if ttfts:
+        report["ttft_ms"] = _latency_summary(ttfts)
+    return report
+
+
+# ========== TARGETS ==========
+
+def _agent_request(workdir: Path) -> Callable[[int], None]:
+    from src.agent import Agent
+    from src.tasks import TaskStore
+
+    local = threading.local()
+
+    def request(i: int):
+        if not hasattr(local, "agent"):
+            local.agent = Agent()
+            local.agent.task_store = TaskStore(filepath=workdir / f"tasks_{threading.get_ident()}.jsonl")
+        task = local.agent.task_store.create_task("generic_llm", {"prompt": f"Load test request {i}"},
+                                                  title=f"load {i}", tags=["loadgen"])
+        result = local.agent.process_task(task)
+        if not result.get("success", True):
+            raise RuntimeError(result.get("error") or "task failed")
+
+    return request
+
+
+def _runner_client(runner_url: Optional[str]):
+    """Something with .post(path, json=...) returning a response: TestClient or a requests session."""
+    if runner_url:
+        local = threading.local()
+
+        class _Remote:
+            def post(self, path: str, **kwargs):
+                if not hasattr(local, "session"):
+                    local.session = requests.Session()
+                return local.session.post(runner_url.rstrip("/") + path, timeout=300, **kwargs)
+
+        return _Remote()
+
+    from fastapi.testclient import TestClient
+    import runner
+    return TestClient(runner.app)
+
+
+def _runner_request(client, path: str, body: Callable[[int], Dict[str, Any]]) -> Callable[[int], None]:
+    def request(i: int):
+        response = client.post(path, json=body(i))
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        data = response.json()
+        if data.get("ok") is False:
+            raise RuntimeError(data.get("error") or "ok=false")
+
+    return request
+
+
+def _stream_request(stub: StubLLMServer) -> Callable[[int], float]:
+    local = threading.local()
+
+    def request(i: int) -> float:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        first = None
+        payload = {"model": "stub", "stream": True, "messages": [{"role": "user", "content": f"Stream {i}"}]}
+        with local.session.post(stub.chat_endpoint, json=payload, stream=True, timeout=300) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                if first is None:
+                    first = time.perf_counter() - start
+                if line == b"data: [DONE]":
+                    break
+        if first is None:
+            raise RuntimeError("Stream ended without any chunk")
+        return first
+
+    return request
+
+
+def _sample_source(workdir: Path) -> Path:
+    path = workdir / "sample" / "service.py"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(
+        f"def handler_{i}(request):\n    \"\"\"Handle request kind {i}.\"\"\"\n    return {{'kind': {i}}}\n"
+        for i in range(40)
+    ), encoding="utf-8")
+    return path
+
+
+def run(targets: List[str], count: int, concurrency: int, stub: StubLLMServer,
+        runner_url: Optional[str] = None, workdir: Optional[Path] = None) -> Dict[str, Any]:
+    """Drive each target with `count` requests on `concurrency` threads and return the report."""
+    own_workdir = workdir is None
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="project_me_load_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    stub.start()
+    isolate(stub, workdir)
+    from src.memory import memory
+
+    report: Dict[str, Any] = {
+        "meta": {"tasks": count, "concurrency": concurrency, "runner_url": runner_url, "stub": stub.settings()},
+        "targets": {},
+    }
+    try:
+        for target in targets:
+            if target == "agent":
+                request = _agent_request(workdir)
+            elif target == "run-task":
+                request = _runner_request(_runner_client(runner_url), "/run-task", lambda i: {
+                    "task_id": f"load-{i}", "title": f"Load test {i}", "payload": {"prompt": "Say hello"}})
+            elif target == "analyze":
+                source = str(_sample_source(workdir))
+                request = _runner_request(_runner_client(runner_url), "/analyze", lambda i: {
+                    "files": [source], "prompt": f"Review handler_{i % 40}"})
+            else:
+                request = _stream_request(stub)
+
+            print(f"[Load] {target}: {count} requests, concurrency {concurrency}...", file=sys.stderr)
+            # The agent prints a banner per task; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    request(-1)  # Warm-up (imports, connection setup), not timed
+                except Exception:
+                    pass
+                report["targets"][target] = run_load(request, count, concurrency)
+        memory.flush()
+        report["meta"]["stub_stats"] = stub.stats()
+    finally:
+        stub.stop()
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Project ME load generator (against the stub LLM)")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"Comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument("--tasks", type=int, default=100, help="Requests per target")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--runner-url", help="Load a running runner instead of the in-process app")
+    parser.add_argument("--workdir", help="Keep generated files here instead of a temporary directory")
+    parser.add_argument("--output", help="Write the report JSON here (default: stdout)")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(sorted(unknown))}")
+
+    report = run(targets, args.tasks, args.concurrency, stub_from_args(args), args.runner_url,
+                 Path(args.workdir) if args.workdir else None)
+
+    for target, result in report["targets"].items():
+        latency = result["latency_ms"]
+        line = (f"{target:<10} {result['ok']:>5}/{result['requests']:<5} ok  {result['throughput_rps']:>8.2f} req/s"
+                f"  p50 {latency.get('p50', 0):>9.1f}  p90 {latency.get('p90', 0):>9.1f}"
+                f"  p99 {latency.get('p99', 0):>9.1f} ms")
+        if "ttft_ms" in result:
+            line += f"  ttft p50 {result['ttft_ms']['p50']:.1f} ms"
+        print(line, file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"[Load] Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Stub LLM server for Project ME v0
+A local stand-in for LM Studio's OpenAI-compatible endpoint.
+
+Answers POST /v1/chat/completions with a canned completion. The reply is
+shaped like a real model's: the first token arrives after `ttft` seconds
+and the rest at `tokens_per_second`, either all at once or, when the
+request sets "stream": true, as server-sent event chunks. A fraction of
+requests can be failed on purpose (`error_rate`), and `max_concurrency`
+caps how many requests are generated at once (extra requests either queue,
+like LM Studio does, or are rejected with 429).
+
+Run standalone with:
+    python -m benchmarks.stub_llm --port 1234 --ttft 0.2 --tokens-per-second 50
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "_StubHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # Keep benchmark output clean
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.stub.model, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as exc:
+            self._send_json(400, {"error": {"message": f"Invalid JSON: {exc}"}})
+            return
+        stub = self.server.stub
+        with stub.slot() as admitted:
+            if not admitted:
+                self._send_json(429, {"error": {"message": "Too many concurrent requests"}})
+                return
+            error = stub.injected_error()
+            if error is not None:
+                time.sleep(stub.ttft)
+                self._send_json(error, {"error": {"message": f"Injected error ({error})"}})
+                return
+            if payload.get("stream"):
+                self._stream(stub, payload)
+            else:
+                status, body = stub.complete(payload)
+                self._send_json(status, body)
+
+    def _stream(self, stub: "StubLLMServer", payload: Dict[str, Any]):
+        """Send the completion as OpenAI-style SSE chunks, paced like a real model."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = payload.get("model") or stub.model
+        n_tokens = stub.completion_length(payload)
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None):
+            body = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(body)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            time.sleep(stub.ttft)
+            chunk({"role": "assistant", "content": "stub"})
+            for _ in range(n_tokens - 1):
+                if stub.tokens_per_second > 0:
+                    time.sleep(1.0 / stub.tokens_per_second)
+                chunk({"content": " stub"})
+            chunk({}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return  # Client went away mid-stream
+        stub.count_request()
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubLLMServer"
+
+
+class StubLLMServer:
+    """
+    OpenAI-compatible chat completions stub running on a background thread.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        ttft: Seconds before the first token of each reply
+        tokens_per_second: Simulated generation speed after the first token (0 = instant)
+        completion_tokens: Tokens in every reply (capped by the request's max_tokens)
+        model: Model name reported back
+        error_rate: Fraction of requests answered with `error_status` instead (0..1)
+        error_status: HTTP status used for injected errors
+        max_concurrency: Requests generated at once (0 = unlimited)
+        overload: What happens past max_concurrency: "queue" (wait for a slot) or "reject" (429)
+        seed: Seed for error injection, for reproducible runs
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ttft: float = 0.0,
+                 tokens_per_second: float = 0.0, completion_tokens: int = 32, model: str = "stub",
+                 error_rate: float = 0.0, error_status: int = 500, max_concurrency: int = 0,
+                 overload: str = "queue", seed: Optional[int] = None):
+        if overload not in ("queue", "reject"):
+            raise ValueError(f"Unknown overload policy: {overload}")
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.model = model
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_concurrency = max_concurrency
+        self.overload = overload
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.rejected = 0
+        self.peak_concurrency = 0
+        self._active = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._httpd = _StubHTTPServer((host, port), _StubHandler)
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for config.LM_STUDIO_BASE_URL."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def chat_endpoint(self) -> str:
+        """Value for runner.LM_ENDPOINT."""
+        return f"{self.base_url}/chat/completions"
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "ttft": self.ttft,
+            "tokens_per_second": self.tokens_per_second,
+            "completion_tokens": self.completion_tokens,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status,
+            "max_concurrency": self.max_concurrency,
+            "overload": self.overload,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests_served": self.requests_served,
+                "errors_injected": self.errors_injected,
+                "rejected": self.rejected,
+                "peak_concurrency": self.peak_concurrency,
+            }
+
+    @contextmanager
+    def slot(self):
+        """Hold one generation slot for the duration of a request (yields False if rejected)."""
+        if self._slots is not None and not self._slots.acquire(blocking=self.overload == "queue"):
+            with self._lock:
+                self.rejected += 1
+            yield False
+            return
+        with self._lock:
+            self._active += 1
+            self.peak_concurrency = max(self.peak_concurrency, self._active)
+        try:
+            yield True
+        finally:
+            with self._lock:
+                self._active -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def injected_error(self) -> Optional[int]:
+        """HTTP status to fail this request with, or None to answer normally."""
+        with self._lock:
+            if self.error_rate > 0 and self._rng.random() < self.error_rate:
+                self.errors_injected += 1
+                return self.error_status
+        return None
+
+    def completion_length(self, payload: Dict[str, Any]) -> int:
+        return max(1, min(self.completion_tokens, int(payload.get("max_tokens") or self.completion_tokens)))
+
+    def count_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+    def complete(self, payload: Dict[str, Any]):
+        """Build the (status, body) answer for one non-streamed chat completion request."""
+        n_tokens = self.completion_length(payload)
+        delay = self.ttft + ((n_tokens - 1) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in payload.get("messages", []))
+        self.count_request()
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model") or self.model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(["stub"] * n_tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": n_tokens,
+                "total_tokens": prompt_chars // 4 + n_tokens,
+            },
+        }
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """Add the stub's behaviour options to a command-line parser (shared with bench/loadgen)."""
+    group = parser.add_argument_group("stub LLM")
+    group.add_argument("--ttft", "--latency", dest="ttft", type=float, default=0.0,
+                       help="Seconds before the first token of each reply")
+    group.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated generation speed (0 = instant)")
+    group.add_argument("--completion-tokens", type=int, default=32, help="Tokens in every reply")
+    group.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failed on purpose")
+    group.add_argument("--error-status", type=int, default=500, help="HTTP status for injected errors")
+    group.add_argument("--max-concurrency", type=int, default=0, help="Requests generated at once (0 = unlimited)")
+    group.add_argument("--overload", choices=("queue", "reject"), default="queue",
+                       help="Past --max-concurrency: wait for a slot or answer 429")
+    group.add_argument("--seed", type=int, default=None, help="Seed for error injection")
+
+
+def stub_from_args(args: argparse.Namespace, host: str = "127.0.0.1", port: int = 0) -> StubLLMServer:
+    return StubLLMServer(host, port, ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                         completion_tokens=args.completion_tokens, error_rate=args.error_rate,
+                         error_status=args.error_status, max_concurrency=args.max_concurrency,
+                         overload=args.overload, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = stub_from_args(args, host=args.host, port=args.port)
+    print(f"[Stub] Serving {server.chat_endpoint} ({server.settings()})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Stub] Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,21 @@
 Project ME v0.1 - Main CLI entrypoint
 Local automation and orchestration system.
 """
+import os
 import sys
+import csv
 import json
+import time
+import atexit
+import argparse
+import collections
 
 from src.tasks import TaskStore
-from src.agent import agent
-from src.memory import memory
-from src.tools import list_tools
+from src.memory import Event, memory
+from src import profiler, tracing
+
+# The agent (and with it the tools and `requests`) is imported by the menu
+# actions that run tasks, so startup and read-only views stay fast.
 
 
 def print_banner():
@@ -35,6 +43,7 @@ def print_menu():
     print("  8. List available tools")
     print("  9. Create LLM session task (v0.2)")
     print(" 10. Inspect session (v0.2)")
+    print(" 11. Export task trace (Chrome trace JSON)")
     print("  0. Exit")
     print()
 
@@ -48,9 +57,10 @@ def create_task_interactive(task_store: TaskStore):
     print("  3. filesystem - File operations (read/write/list)")
     print("  4. code_analysis - Analyze code with LLM")
     print("  5. llm_session - Conversational LLM session (v0.2)")
+    print("  6. agent - Multi-step goal using tools")
     print()
 
-    choice = input("Select task type (1-5): ").strip()
+    choice = input("Select task type (1-6): ").strip()
 
     # Common fields for all tasks (v0.1)
     title = input("Task title (press Enter to skip): ").strip() or None
@@ -106,9 +116,9 @@ def create_task_interactive(task_store: TaskStore):
         print(f"\n✓ Filesystem task created with ID: {task.id}")
 
     elif choice == "4":
-        filepath = input("Enter code file path: ").strip()
+        filepath = input("Enter code file or directory path: ").strip()
         question = input("Enter your question (press Enter for default analysis): ").strip()
-        payload = {"filepath": filepath}
+        payload = {"directory": filepath} if os.path.isdir(filepath) else {"filepath": filepath}
         if question:
             payload["question"] = question
         task = task_store.create_task("code_analysis", payload, title=title, tags=tags)
@@ -142,6 +152,15 @@ def create_task_interactive(task_store: TaskStore):
         print(f"\n✓ LLM session task created with ID: {task.id}")
         print(f"   Session: {session_id}")
 
+    elif choice == "6":
+        goal = input("Describe the goal: ").strip()
+        tools_input = input("Tools to allow (comma-separated, press Enter for all): ").strip()
+        payload = {"goal": goal}
+        if tools_input:
+            payload["tools"] = [t.strip() for t in tools_input.split(",")]
+        task = task_store.create_task("agent", payload, title=title, tags=tags)
+        print(f"\n✓ Agent task created with ID: {task.id}")
+
     else:
         print("Invalid task type choice")
 
@@ -159,6 +178,7 @@ def run_next_task(task_store: TaskStore):
     confirm = input("Execute this task? (y/n): ").strip().lower()
 
     if confirm == 'y':
+        from src.agent import agent
         result = agent.process_task(task)
         print("\nTask execution complete.")
         print(f"Result: {json.dumps(result, indent=2)}")
@@ -197,7 +217,7 @@ def list_tasks_filtered(task_store: TaskStore):
     # Ask for filters
     print("\nAvailable filters (press Enter to skip any):")
     status = input("  Status (pending/running/done/failed): ").strip() or None
-    task_type = input("  Type (shell/generic_llm/filesystem/code_analysis): ").strip() or None
+    task_type = input("  Type (shell/generic_llm/filesystem/code_analysis/agent): ").strip() or None
     tag = input("  Tag: ").strip() or None
     limit_str = input("  Limit (default 20): ").strip()
     limit = int(limit_str) if limit_str else 20
@@ -227,23 +247,38 @@ def show_task_details(task_store: TaskStore):
         return
 
     # Try to find task by full ID or partial ID
-    task = task_store.get_task_by_id(task_id_input)
+    task, matches = find_task(task_store, task_id_input)
     if not task:
-        # Try partial match
-        all_tasks = task_store.load_all_tasks()
-        matches = [t for t in all_tasks if t.id.startswith(task_id_input)]
-        if len(matches) == 1:
-            task = matches[0]
-        elif len(matches) > 1:
+        if len(matches) > 1:
             print(f"\nAmbiguous ID - found {len(matches)} matches:")
             for t in matches:
                 print(f"  {t.id[:8]}... | {t.type} | {t.status}")
-            return
         else:
             print(f"\nTask not found: {task_id_input}")
-            return
+        return
+
+    print_task_details(task)
+
+
+def find_task(task_store: TaskStore, task_id: str):
+    """
+    Find a task by full ID (indexed) or unique ID prefix (one streaming pass).
 
-    # Display full task details
+    Returns:
+        (task or None, tasks whose ID starts with task_id)
+    """
+    task = task_store.get_task_by_id(task_id)
+    if task:
+        return task, [task]
+    matches = []
+    for task in task_store.iter_tasks():
+        if task_id and task.id.startswith(task_id):
+            matches.append(task)
+    return (matches[0] if len(matches) == 1 else None), matches
+
+
+def print_task_details(task):
+    """Print a task with its result, phase timings and related events."""
     print(f"\n{'='*60}")
     print(f"Task ID: {task.id}")
     if task.title:
@@ -264,6 +299,11 @@ def show_task_details(task_store: TaskStore):
     if task.error:
         print(f"\nError: {task.error}")
 
+    if task.trace:
+        print(f"\nPhase timings ({task.trace.get('duration_ms', 0):.1f} ms total):")
+        for name, ms in sorted(task.trace.get("phases", {}).items(), key=lambda item: -item[1]):
+            print(f"  {name:30s} {ms:10.1f} ms")
+
     # Show related events
     print(f"\n{'='*60}")
     print("Related Events:")
@@ -285,6 +325,42 @@ def show_task_details(task_store: TaskStore):
     print(f"\n{'='*60}")
 
 
+def export_task_trace(task_store: TaskStore):
+    """Write a task's trace as Chrome trace-event JSON (open in chrome://tracing or Perfetto)."""
+    print("\n--- Export Task Trace ---")
+
+    task_id_input = input("Enter task ID (or first 8 characters): ").strip()
+    task, _ = find_task(task_store, task_id_input)
+    if not task:
+        print(f"\nTask not found (or ambiguous): {task_id_input}")
+        return
+    if not task.trace:
+        print("\nThis task has no trace (it has not been run since tracing was added).")
+        return
+
+    path = input(f"Output file (default: trace_{task.id[:8]}.json): ").strip() or f"trace_{task.id[:8]}.json"
+    tracing.write_chrome_trace([task.trace], path)
+    print(f"\n✓ Wrote {len(task.trace.get('spans', []))} spans to {path}")
+
+
+def profile_task(task_store: TaskStore, task_id: str, output: str = None) -> int:
+    """Run one task under the sampling profiler and write its collapsed stacks (for flamegraphs)."""
+    task, _ = find_task(task_store, task_id)
+    if not task:
+        print(f"Task not found (or ambiguous): {task_id}")
+        return 1
+
+    from src.agent import agent
+
+    output = output or f"profile_{task.id[:8]}.folded"
+    with profiler.profiling() as prof:
+        result = agent.process_task(task)
+    profiler.write_collapsed(prof.result(), output)
+    print(f"\nResult: {json.dumps(result, indent=2)}")
+    print(f"\n✓ Wrote {len(prof.stacks)} stacks ({prof.samples} samples, {prof.mode}) to {output}")
+    return 0
+
+
 def tail_events_display():
     """Display the most recent events (tail-like view). (v0.1)"""
     print("\n--- Recent Events (Tail) ---")
@@ -339,6 +415,8 @@ def view_recent_events():
 def list_available_tools():
     """List all registered tools."""
     print("\n--- Available Tools ---")
+    from src.tools import list_tools
+
     tools = list_tools()
     for i, tool_name in enumerate(tools, 1):
         print(f"  {i}. {tool_name}")
@@ -446,6 +524,234 @@ def inspect_session(task_store: TaskStore):
     print()
 
 
+# ========== BATCH COMMANDS ==========
+# Non-interactive subcommands (python main.py submit|run|ls|show|tail|stats).
+# Queries stream the JSONL files instead of loading them whole.
+
+TASK_FIELDS = ("type", "title", "tags", "payload")
+
+
+def _spec_from_record(record: dict, default_type: str = None, extra_tags=None) -> dict:
+    """Turn a submitted record into a TaskStore.create_tasks spec; keys other than TASK_FIELDS become the payload."""
+    task_type = record.get("type") or default_type
+    if not task_type:
+        raise ValueError("missing task type (add a 'type' field or pass --type)")
+    payload = record.get("payload")
+    if payload is None:
+        payload = {k: v for k, v in record.items() if k not in TASK_FIELDS}
+    elif isinstance(payload, str):
+        payload = json.loads(payload)
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be a JSON object")
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(";") if t.strip()]
+    return {
+        "type": task_type,
+        "payload": payload,
+        "title": record.get("title") or None,
+        "tags": list(tags) + list(extra_tags or []),
+    }
+
+
+def read_task_records(stream, fmt: str):
+    """
+    Yield (line number, record dict) from JSONL or CSV input.
+
+    CSV needs a header row; `tags` are ';'-separated, `payload` (if present)
+    is a JSON object, and any other column becomes a payload field.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            row.pop(None, None)  # Cells past the header
+            yield reader.line_num, {k: v for k, v in row.items() if v not in (None, "")}
+        return
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            yield line_no, json.loads(line)
+
+
+def cmd_submit(args, task_store: TaskStore) -> int:
+    """Create tasks from JSONL/CSV records with one write and one fsync (TaskStore.create_tasks)."""
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    stream = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    specs = []
+    try:
+        for line_no, record in read_task_records(stream, fmt):
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("record must be a JSON object")
+                specs.append(_spec_from_record(record, args.type, args.tag))
+            except (ValueError, json.JSONDecodeError) as e:
+                print(f"✗ {args.input}:{line_no}: {e} (nothing was submitted)", file=sys.stderr)
+                return 1
+    except (json.JSONDecodeError, csv.Error) as e:
+        print(f"✗ Could not parse {args.input}: {e} (nothing was submitted)", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    tasks = task_store.create_tasks(specs)
+    if args.print_ids:
+        for task in tasks:
+            print(task.id)
+    print(f"✓ Submitted {len(tasks)} task(s) to {task_store.filepath}", file=sys.stderr)
+    return 0
+
+
+def cmd_run(args, task_store: TaskStore) -> int:
+    """Run the given tasks, the next pending task, or (--all) every pending task."""
+    from src.agent import agent
+
+    if args.task_ids:
+        tasks = []
+        for task_id in args.task_ids:
+            task, _ = find_task(task_store, task_id)
+            if not task:
+                print(f"✗ Task not found (or ambiguous): {task_id}", file=sys.stderr)
+                return 1
+            tasks.append(task)
+    elif args.all:
+        tasks = list(task_store.iter_tasks_filtered(status="pending"))
+    else:
+        task = task_store.get_next_pending_task()
+        tasks = [task] if task else []
+
+    if not tasks:
+        print("No pending tasks found.", file=sys.stderr)
+        return 0
+
+    failed = 0
+    for task in tasks[:args.limit] if args.limit else tasks:
+        result = agent.process_task(task)
+        ok = result.get("success", True) is not False and task.status != "failed"
+        failed += not ok
+        print(json.dumps({"id": task.id, "status": task.status, "result": result}, default=str))
+    return 1 if failed else 0
+
+
+def cmd_ls(args, task_store: TaskStore) -> int:
+    """Print matching tasks as they are found (file order; --last keeps only the newest N)."""
+    tasks = task_store.iter_task_records(status=args.status, task_type=args.type, tag=args.tag)
+    if args.last:
+        tasks = collections.deque(tasks, maxlen=args.last)
+    shown = 0
+    for task in tasks:
+        if args.limit and shown >= args.limit:
+            break
+        if args.json:
+            print(json.dumps(task.to_dict(), default=str))
+        else:
+            title_display = f" | {task.title}" if task.title else ""
+            tags_display = f" | tags: {','.join(task.tags)}" if task.tags else ""
+            print(f"{task.id} | {task.status:8s} | {task.type:15s}{title_display}{tags_display}")
+        shown += 1
+    return 0
+
+
+def cmd_show(args, task_store: TaskStore) -> int:
+    """Show one task (by ID or unique prefix)."""
+    task, matches = find_task(task_store, args.task_id)
+    if not task:
+        reason = f"ambiguous ({len(matches)} matches)" if matches else "not found"
+        print(f"✗ Task {reason}: {args.task_id}", file=sys.stderr)
+        return 1
+    if args.json:
+        data = task.to_dict()
+        if args.events:
+            data["events"] = [e.to_dict() for e in memory.iter_events_filtered(task_id=task.id)]
+        print(json.dumps(data, indent=2, default=str))
+    else:
+        print_task_details(task)
+    return 0
+
+
+def _print_event(event, as_json: bool):
+    if as_json:
+        print(json.dumps(event.to_dict(), default=str), flush=True)
+    else:
+        task_ref = event.task_id[:8] if event.task_id else "-"
+        data = json.dumps(event.data, default=str)
+        print(f"{event.timestamp} | {event.event_type:20s} | {task_ref:8s} | {data[:120]}", flush=True)
+
+
+def cmd_tail(args, task_store: TaskStore) -> int:
+    """Print the last N events (optionally filtered), then follow new ones with -f."""
+    def wanted(event) -> bool:
+        return ((not args.task or (event.task_id or "").startswith(args.task))
+                and (not args.type or event.event_type == args.type))
+
+    records = memory.iter_event_records(event_type=args.type or None)
+    for event in collections.deque((e for e in records if wanted(e)), maxlen=args.n):
+        _print_event(event, args.json)
+    if not args.follow:
+        return 0
+
+    with open(memory.filepath, "r", encoding="utf-8") as f:
+        f.seek(0, os.SEEK_END)
+        pending = ""
+        try:
+            while True:
+                chunk = f.readline()
+                if not chunk:
+                    time.sleep(args.interval)
+                    continue
+                pending += chunk
+                if not pending.endswith("\n"):
+                    continue  # Partial line; wait for the writer to finish it
+                line, pending = pending.strip(), ""
+                if not line:
+                    continue
+                try:
+                    event = Event.from_dict(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                if wanted(event):
+                    _print_event(event, args.json)
+        except KeyboardInterrupt:
+            return 0
+
+
+def cmd_stats(args, task_store: TaskStore) -> int:
+    """Count tasks by status/type and events by type in one streaming pass over each file."""
+    by_status, by_type, by_event = collections.Counter(), collections.Counter(), collections.Counter()
+    for task in task_store.iter_task_records():
+        by_status[task.status] += 1
+        by_type[task.type] += 1
+    for event in memory.iter_event_records():
+        by_event[event.event_type] += 1
+
+    stats = {
+        "tasks": {"total": sum(by_status.values()), "by_status": dict(by_status), "by_type": dict(by_type),
+                  "file": str(task_store.filepath), "bytes": task_store.filepath.stat().st_size},
+        "events": {"total": sum(by_event.values()), "by_type": dict(by_event),
+                   "file": str(memory.filepath), "bytes": memory.filepath.stat().st_size},
+    }
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    for section in ("tasks", "events"):
+        data = stats[section]
+        print(f"{section.capitalize()}: {data['total']} ({data['bytes']:,} bytes in {data['file']})")
+        for group in ("by_status", "by_type"):
+            for name, count in sorted(data.get(group, {}).items(), key=lambda item: -item[1]):
+                print(f"  {group[3:]:6s} {name:20s} {count:>8}")
+    return 0
+
+
+COMMANDS = {
+    "submit": cmd_submit,
+    "run": cmd_run,
+    "ls": cmd_ls,
+    "show": cmd_show,
+    "tail": cmd_tail,
+    "stats": cmd_stats,
+}
+
+
 def main():
     """Main CLI loop."""
     print_banner()
@@ -476,6 +782,8 @@ def main():
             create_llm_session_task(task_store)
         elif choice == "10":
             inspect_session(task_store)
+        elif choice == "11":
+            export_task_trace(task_store)
         elif choice == "0":
             print("\nExiting Project ME v0.2. Goodbye!")
             break
@@ -483,9 +791,83 @@ def main():
             print("\nInvalid choice. Please try again.")
 
 
+def start_session_profile(path: str, seconds: float = None):
+    """Sample the whole session; the collapsed stacks are written to `path` at exit."""
+    session = profiler.Profiler().start(seconds=seconds)
+
+    def write_profile():
+        session.stop()
+        profiler.write_collapsed(session.result(), path)
+        print(f"[Profiler] Wrote {session.samples} samples ({session.mode}) to {path}")
+
+    atexit.register(write_profile)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Project ME CLI (interactive menu without a command)")
+    parser.add_argument("--api", action="store_true", help="Start the API server instead of the menu")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Sample the session (or --profile-task) and write collapsed stacks to PATH")
+    parser.add_argument("--profile-seconds", type=float, metavar="N",
+                        help="With --profile: stop sampling after N seconds instead of at exit")
+    parser.add_argument("--profile-task", metavar="TASK_ID",
+                        help="Run this task under the profiler and exit")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    submit = commands.add_parser("submit", help="Create tasks from JSONL/CSV (file or - for stdin)")
+    submit.add_argument("input", nargs="?", default="-", help="Input file (default: stdin)")
+    submit.add_argument("--format", choices=("jsonl", "csv"), help="Input format (default: from extension, else jsonl)")
+    submit.add_argument("--type", help="Task type for records without one")
+    submit.add_argument("--tag", action="append", default=[], help="Extra tag for every task (repeatable)")
+    submit.add_argument("--print-ids", action="store_true", help="Print the new task IDs")
+
+    run = commands.add_parser("run", help="Run tasks (default: the next pending one)")
+    run.add_argument("task_ids", nargs="*", metavar="TASK_ID", help="Tasks to run (ID or unique prefix)")
+    run.add_argument("--all", action="store_true", help="Run every pending task")
+    run.add_argument("--limit", type=int, help="Run at most N tasks")
+
+    ls = commands.add_parser("ls", help="List tasks as they are found")
+    ls.add_argument("--status", help="pending/running/done/failed")
+    ls.add_argument("--type", help="Task type")
+    ls.add_argument("--tag", help="Tag")
+    ls.add_argument("--limit", type=int, help="Stop after N tasks")
+    ls.add_argument("--last", type=int, metavar="N", help="Only the newest N matches")
+    ls.add_argument("--json", action="store_true", help="One JSON object per line")
+
+    show = commands.add_parser("show", help="Show one task")
+    show.add_argument("task_id", help="Task ID or unique prefix")
+    show.add_argument("--json", action="store_true", help="Print JSON")
+    show.add_argument("--events", action="store_true", help="With --json: include the task's events")
+
+    tail = commands.add_parser("tail", help="Print recent events (and follow with -f)")
+    tail.add_argument("-n", type=int, default=20, help="Events to print first (default 20)")
+    tail.add_argument("-f", "--follow", action="store_true", help="Keep printing new events")
+    tail.add_argument("--task", help="Only events for this task (ID or prefix)")
+    tail.add_argument("--type", help="Only this event type")
+    tail.add_argument("--interval", type=float, default=0.5, help="Polling interval for --follow (seconds)")
+    tail.add_argument("--json", action="store_true", help="One JSON object per line")
+
+    stats = commands.add_parser("stats", help="Task and event counts")
+    stats.add_argument("--json", action="store_true", help="Print JSON")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profile or args.profile_task:
+        profiler.install_signal_handler()
+
+    if args.profile_task:
+        sys.exit(profile_task(TaskStore(), args.profile_task, args.profile))
+
+    if args.profile:
+        start_session_profile(args.profile, args.profile_seconds)
+
+    if args.command:
+        sys.exit(COMMANDS[args.command](args, TaskStore()))
+
     # Check if --api flag is passed
-    if len(sys.argv) > 1 and sys.argv[1] == "--api":
+    if args.api:
         print("\n🚀 Starting API server mode...\n")
         try:
             from api_server import start_server
@@ -510,4 +892,3 @@ if __name__ == "__main__":
             import traceback
             traceback.print_exc()
             sys.exit(1)
-
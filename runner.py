@@ -10,27 +10,38 @@ Features:
 - System file browser (browse any folder)
 - Code analysis (send files to LLM)
 - Shell command execution (with optional admin)
+- Prometheus metrics at /metrics
 """
 from __future__ import annotations
 
 import atexit
 import datetime as _dt
-import fnmatch
 import json
 import logging
 import os
+import shutil
 import signal
 import string
 import subprocess
 import sys
+import tarfile
+import tempfile
 import threading
 import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import requests
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field
+from starlette.concurrency import run_in_threadpool
+
+from src import (archive, blobstore, browse, code_search, config, file_io, fs_index, metrics, outline, profiler,
+                 sandbox_tree, uploads)
 
 
 logger = logging.getLogger("project_me.runner")
@@ -147,10 +158,13 @@ def cleanup():
 # Register cleanup handlers
 atexit.register(cleanup)
 
-# Sandbox directory - absolute path
-SANDBOX_DIR = Path(r"C:\Users\matin\moi\docs\sandbox")
+# Sandbox directory - absolute path (SANDBOX_DIR overrides it, e.g. for benchmarks)
+SANDBOX_DIR = Path(os.getenv("SANDBOX_DIR", r"C:\Users\matin\moi\docs\sandbox"))
 SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
 
+# Runner bookkeeping directories inside the sandbox, hidden from listings
+SANDBOX_INTERNAL_DIRS = {".uploads", ".blobs", ".batch"}
+
 
 class RunTaskRequest(BaseModel):
     taskId: str = Field(..., alias="task_id")
@@ -169,6 +183,7 @@ class RunnerResponse(BaseModel):
     finishedAt: Optional[str] = None
     raw: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    profile: Optional[str] = None  # Collapsed stacks, when run with ?profile=true
 
 
 class SandboxListResponse(BaseModel):
@@ -181,6 +196,12 @@ class SandboxReadResponse(BaseModel):
     ok: bool
     content: Optional[str] = None
     error: Optional[str] = None
+    encoding: Optional[str] = None
+    size: Optional[int] = None
+    offset: Optional[int] = None
+    next_offset: Optional[int] = None  # Set when more bytes follow (byte reads, or a line cut mid-page)
+    next_line: Optional[int] = None  # Set when more lines follow (line-range reads)
+    truncated: bool = False  # True when content is one page, not the whole file
 
 
 class SandboxWriteRequest(BaseModel):
@@ -199,6 +220,44 @@ class SandboxDeleteRequest(BaseModel):
     path: str
 
 
+class SandboxUploadStartRequest(BaseModel):
+    path: str
+    size: Optional[int] = None  # Expected total size in bytes
+    sha256: Optional[str] = None  # Expected SHA-256 hex digest
+
+
+class SandboxUploadCompleteRequest(BaseModel):
+    sha256: Optional[str] = None
+
+
+class SandboxSyncPlanRequest(BaseModel):
+    path: str
+    size: int  # Size of the new file
+    sha256: str  # SHA-256 of the new file
+    block_size: int = blobstore.DEFAULT_BLOCK_SIZE
+    blocks: List[Dict[str, Any]]  # [{"weak": int, "strong": str}] per block, see src/blobstore.py
+
+
+class SandboxBatchOp(BaseModel):
+    op: str  # "list" | "read" | "write" | "rename" | "delete"
+    path: Optional[str] = None
+    content: Optional[str] = None  # write
+    from_path: Optional[str] = Field(None, alias="from")  # rename
+    to_path: Optional[str] = Field(None, alias="to")  # rename
+    offset: Optional[int] = None  # read
+    length: Optional[int] = None  # read
+    start_line: Optional[int] = None  # read
+    num_lines: Optional[int] = None  # read
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class SandboxBatchRequest(BaseModel):
+    ops: List[SandboxBatchOp]
+    atomic: bool = False  # Roll back every mutation if any operation fails
+    max_parallel: int = 8  # Concurrency for runs of consecutive list/read ops
+
+
 class ShellRequest(BaseModel):
     command: str
     cwd: Optional[str] = None
@@ -212,10 +271,19 @@ class ShellResponse(BaseModel):
     error: Optional[str] = None
 
 
+class ProfileStartRequest(BaseModel):
+    seconds: Optional[float] = None  # Stop automatically after this long (None = until /admin/profile/stop)
+    interval_ms: float = config.PROFILER_INTERVAL_SECONDS * 1000
+    mode: str = "auto"  # "signal" (CPU time, Linux), "thread" (wall time) or "auto"
+
+
 # New: Code Analysis Request
 class CodeAnalysisRequest(BaseModel):
-    files: List[str]  # List of file paths (relative to sandbox or absolute)
+    files: List[str] = []  # List of file paths (relative to sandbox or absolute)
     prompt: str  # What to analyze/do with the files
+    directory: Optional[str] = None  # Analyze a whole tree: only the most relevant chunks are sent
+    mode: str = "full"  # "full" file contents or "outline" (signatures, classes, imports, docstrings)
+    expand: List[str] = []  # Outline mode: "file::Symbol" entries to include in full
     include_content: bool = True  # Include file content in LLM context
 
 
@@ -238,6 +306,146 @@ LM_ENDPOINT = os.getenv("LM_ENDPOINT", "http://127.0.0.1:1234/v1/chat/completion
 LM_MODEL = os.getenv("LM_MODEL", "gpt-oss:20b")
 
 
+# ========== METRICS ==========
+_HTTP_DURATION = metrics.histogram("http_request_duration_seconds", "Runner request latency",
+                                   ["method", "route", "status"])
+_HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Runner requests being handled")
+_SANDBOX_WRITE_BYTES = metrics.FILE_WRITE_BYTES.labels("sandbox")
+
+
+class RequestMetricsMiddleware:
+    """
+    Time every request, labelled by route template (not raw path) to keep label sets small.
+
+    A plain ASGI middleware, so a request stays in flight until the last body
+    chunk is sent and streamed responses are timed in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            _HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            _HTTP_DURATION.labels(scope["method"], route, status).observe(time.perf_counter() - started)
+
+        async def send_and_record(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        _HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            finish()  # Failed or disconnected before the last chunk
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+
+@app.get("/metrics")
+def metrics_endpoint() -> Response:
+    """Prometheus metrics: request latency, LLM calls, caches, file I/O (text format 0.0.4)."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+# ========== PROFILER ==========
+# The SIGPROF handler has to be installed from the main thread (uvicorn imports
+# the app there); until a profile is started it costs nothing.
+profiler.install_signal_handler()
+_last_profile: Optional[profiler.Profiler] = None
+
+
+def _profile_response(prof: profiler.Profiler, format: str):
+    if format == "json":
+        return {"ok": True, **prof.result()}
+    return Response(prof.collapsed(), media_type="text/plain; charset=utf-8")
+
+
+def _new_profiler(interval_ms: float, mode: str) -> profiler.Profiler:
+    try:
+        return profiler.Profiler(interval=interval_ms / 1000, mode=mode)
+    except (ValueError, RuntimeError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.post("/admin/profile/start")
+def admin_profile_start(req: ProfileStartRequest) -> Dict[str, Any]:
+    """Start sampling the whole runner; fetch the stacks with /admin/profile or /admin/profile/stop."""
+    global _last_profile
+    if req.seconds is not None and not 0 < req.seconds <= config.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {config.PROFILER_MAX_SECONDS}]")
+    prof = _new_profiler(req.interval_ms, req.mode)
+    try:
+        prof.start(seconds=req.seconds)
+    except profiler.ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    _last_profile = prof
+    logger.info("[Runner] Profiler started (%s, %.1f ms, %s s)", prof.mode, req.interval_ms, req.seconds or "open")
+    return {"ok": True, "mode": prof.mode, "interval": prof.interval, "seconds": req.seconds}
+
+
+@app.post("/admin/profile/stop")
+def admin_profile_stop(format: str = "text"):
+    """Stop the running profile and return its collapsed stacks ("text") or a JSON summary ("json")."""
+    if _last_profile is None:
+        raise HTTPException(status_code=404, detail="No profile has been started")
+    _last_profile.stop()
+    logger.info("[Runner] Profiler stopped (%d samples)", _last_profile.samples)
+    return _profile_response(_last_profile, format)
+
+
+@app.get("/admin/profile")
+def admin_profile(format: str = "text"):
+    """Collapsed stacks of the running or most recent profile."""
+    if _last_profile is None:
+        raise HTTPException(status_code=404, detail="No profile has been started")
+    return _profile_response(_last_profile, format)
+
+
+@app.post("/admin/profile/run")
+def admin_profile_run(seconds: float = 10.0, interval_ms: float = config.PROFILER_INTERVAL_SECONDS * 1000,
+                      mode: str = "auto", format: str = "text"):
+    """Profile the runner for `seconds` (blocking) and return the collapsed stacks."""
+    global _last_profile
+    if not 0 < seconds <= config.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {config.PROFILER_MAX_SECONDS}]")
+    prof = _new_profiler(interval_ms, mode)
+    try:
+        prof.start()
+    except profiler.ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    _last_profile = prof
+    try:
+        time.sleep(seconds)
+    finally:
+        prof.stop()
+    return _profile_response(prof, format)
+
+
+@app.on_event("startup")
+def start_background_indexer():
+    """Start the opt-in filesystem indexer used by /browse/search."""
+    fs_index.get_indexer().start()
+
+
 @app.get("/health")
 def health() -> Dict[str, Any]:
     return {
@@ -261,7 +469,23 @@ def get_ngrok_status() -> Dict[str, Any]:
 
 
 @app.post("/run-task", response_model=RunnerResponse)
-def run_task(req: RunTaskRequest) -> RunnerResponse:
+def run_task(req: RunTaskRequest, profile: bool = False) -> RunnerResponse:
+    """Run one task through the LLM (with ?profile=true, also return the process-wide collapsed stacks)."""
+    if not profile:
+        return _run_task(req)
+    try:
+        prof = profiler.Profiler().start()
+    except profiler.ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    try:
+        response = _run_task(req)
+    finally:
+        prof.stop()
+    response.profile = prof.collapsed()
+    return response
+
+
+def _run_task(req: RunTaskRequest) -> RunnerResponse:
     logger.info("[Runner] Received task %s - %s (type: %s)", req.taskId, req.title, req.type)
 
     # Extract the actual prompt from payload
@@ -301,12 +525,15 @@ def run_task(req: RunTaskRequest) -> RunnerResponse:
         ],
     }
 
+    lm_started = time.perf_counter()
     try:
         logger.debug("[Runner] Calling LM Studio at %s", LM_ENDPOINT)
         lm_res = requests.post(LM_ENDPOINT, json=lm_payload, timeout=60)
         lm_res.raise_for_status()
         lm_json = lm_res.json()
+        metrics.record_llm_call("runner", time.perf_counter() - lm_started, usage=lm_json.get("usage"))
     except requests.RequestException as exc:
+        metrics.record_llm_call("runner", time.perf_counter() - lm_started, ok=False)
         logger.exception("[Runner] LM Studio error")
         raise HTTPException(status_code=502, detail=f"LM Studio error: {exc}") from exc
 
@@ -332,6 +559,8 @@ def sandbox_list(path: str = "") -> SandboxListResponse:
 
         entries = []
         for item in target_path.iterdir():
+            if item.name in SANDBOX_INTERNAL_DIRS:
+                continue
             entries.append({
                 "name": item.name,
                 "type": "dir" if item.is_dir() else "file"
@@ -345,9 +574,95 @@ def sandbox_list(path: str = "") -> SandboxListResponse:
         return SandboxListResponse(ok=False, entries=[], error=str(exc))
 
 
+_tree_listers: Dict[Path, sandbox_tree.TreeLister] = {}
+
+
+def _sandbox_tree() -> sandbox_tree.TreeLister:
+    """Return the tree lister for the current sandbox (its caches live across requests)."""
+    if SANDBOX_DIR not in _tree_listers:
+        _tree_listers[SANDBOX_DIR] = sandbox_tree.TreeLister(SANDBOX_DIR, skip_names=SANDBOX_INTERNAL_DIRS)
+    return _tree_listers[SANDBOX_DIR]
+
+
+@app.get("/sandbox/tree")
+def sandbox_tree_listing(request: Request, path: str = "", hashes: bool = False, since: Optional[str] = None):
+    """Recursive listing with size/mtime (and sha256 with hashes=true).
+
+    The response carries an ETag; send it back as If-None-Match to get a 304
+    when nothing changed, or as ?since= to receive only changed entries plus
+    a list of removed paths.
+    """
+    try:
+        target_path = SANDBOX_DIR / path if path else SANDBOX_DIR
+        if not target_path.is_dir():
+            return {"ok": False, "entries": [], "error": f"Path is not a directory: {path}"}
+
+        lister = _sandbox_tree()
+        scanned = lister.scan(path)  # One walk serves both the ETag check and the listing
+        header_etag = f'"{scanned[0]}{"-h" if hashes else ""}"'
+        if_none_match = request.headers.get("if-none-match", "")
+        if since is None and header_etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers={"ETag": header_etag})
+
+        result = lister.listing(path, hashes=hashes, since=since, scanned=scanned)
+        logger.info("[Sandbox] Tree of %s: %d entries (full=%s)", path or "/", len(result["entries"]), result["full"])
+        return JSONResponse({"ok": True, **result}, headers={"ETag": f'"{result["etag"]}{"-h" if hashes else ""}"'})
+
+    except sandbox_tree.TreeTooLargeError as exc:
+        return {"ok": False, "entries": [], "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Tree error")
+        return {"ok": False, "entries": [], "error": str(exc)}
+
+
+def _read_text_range(
+    file_path: Path,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    num_lines: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Read one page of a text file by line range, byte range, or from the start."""
+    if start_line is not None or num_lines is not None:
+        return file_io.read_line_range(str(file_path), start_line or 1, num_lines or 1000)
+    return file_io.read_byte_range(str(file_path), offset or 0, length)
+
+
+def _file_stream_response(file_path: Path, request: Request):
+    """Stream a file, honouring a single-range Range header with a 206 response."""
+    size = file_path.stat().st_size
+    byte_range = file_io.parse_range_header(request.headers.get("range"), size)
+    if byte_range is None:
+        return FileResponse(str(file_path), filename=file_path.name, headers={"Accept-Ranges": "bytes"})
+
+    start, end = byte_range
+    return StreamingResponse(
+        file_io.iter_file(str(file_path), start, end),
+        status_code=206,
+        media_type="application/octet-stream",
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end - 1}/{size}",
+            "Content-Length": str(end - start),
+        },
+    )
+
+
 @app.get("/sandbox/read")
-def sandbox_read(path: str) -> SandboxReadResponse:
-    """Read file content from sandbox."""
+def sandbox_read(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    num_lines: Optional[int] = None,
+) -> SandboxReadResponse:
+    """Read file content from sandbox.
+
+    Without range parameters the whole file is returned, as the editor loads
+    and saves complete files. With offset/length (bytes) or
+    start_line/num_lines (1-based lines) one page of at most
+    config.READ_PAGE_BYTES is returned and `truncated` says whether more follows.
+    """
     try:
         file_path = SANDBOX_DIR / path
 
@@ -357,33 +672,239 @@ def sandbox_read(path: str) -> SandboxReadResponse:
         if not file_path.is_file():
             return SandboxReadResponse(ok=False, error=f"Path is not a file: {path}")
 
-        content = file_path.read_text(encoding="utf-8")
-        logger.info("[Sandbox] Read file %s (%d bytes)", path, len(content))
-        return SandboxReadResponse(ok=True, content=content)
+        if offset is None and length is None and start_line is None and num_lines is None:
+            text_file = file_io.read_text(str(file_path))
+            page = {"content": text_file.text, "encoding": text_file.encoding, "size": text_file.size, "offset": 0}
+        else:
+            page = _read_text_range(file_path, offset, length, start_line, num_lines)
+        logger.info("[Sandbox] Read file %s (%d bytes)", path, len(page["content"]))
+        return SandboxReadResponse(
+            ok=True,
+            content=page["content"],
+            encoding=page["encoding"],
+            size=page["size"],
+            offset=page["offset"],
+            next_offset=page.get("next_offset"),
+            next_line=page.get("next_line"),
+            truncated=page.get("next_offset") is not None or page.get("next_line") is not None,
+        )
 
     except Exception as exc:
         logger.exception("[Sandbox] Read error")
         return SandboxReadResponse(ok=False, error=str(exc))
 
 
+@app.get("/sandbox/download")
+def sandbox_download(path: str, request: Request):
+    """Stream a sandbox file as raw bytes (supports HTTP Range)."""
+    file_path = SANDBOX_DIR / path
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail=f"File does not exist: {path}")
+    return _file_stream_response(file_path, request)
+
+
+_blob_stores: Dict[Path, blobstore.BlobStore] = {}
+
+
+def _sandbox_blobs() -> blobstore.BlobStore:
+    """One store per sandbox, so reflinks are probed once and its lock covers every request."""
+    if SANDBOX_DIR not in _blob_stores:
+        _blob_stores[SANDBOX_DIR] = blobstore.BlobStore(SANDBOX_DIR)
+    return _blob_stores[SANDBOX_DIR]
+
+
+_delta_syncs: Dict[Path, blobstore.DeltaSync] = {}
+
+
+def _sandbox_delta_sync() -> blobstore.DeltaSync:
+    """DeltaSync keeps pending plans in memory, so reuse one per sandbox."""
+    if SANDBOX_DIR not in _delta_syncs:
+        _delta_syncs[SANDBOX_DIR] = blobstore.DeltaSync(_sandbox_blobs())
+    return _delta_syncs[SANDBOX_DIR]
+
+
 @app.post("/sandbox/write")
 def sandbox_write(req: SandboxWriteRequest) -> Dict[str, Any]:
-    """Write content to a file in sandbox."""
+    """Write content to a file in sandbox.
+
+    The file is replaced atomically. Identical contents are deduplicated only
+    where the sandbox filesystem supports reflinks (btrfs, XFS); only then is
+    the content hashed and `sha256` returned.
+    """
     try:
         file_path = SANDBOX_DIR / req.path
 
-        # Create parent directories if needed
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        file_path.write_text(req.content, encoding="utf-8")
+        data = req.content.encode("utf-8")
+        digest = _sandbox_blobs().write(file_path, data)
+        _SANDBOX_WRITE_BYTES.inc(len(data))
         logger.info("[Sandbox] Wrote file %s (%d bytes)", req.path, len(req.content))
-        return {"ok": True}
+        result = {"ok": True}
+        if digest is not None:
+            result["sha256"] = digest
+        return result
 
     except Exception as exc:
         logger.exception("[Sandbox] Write error")
         return {"ok": False, "error": str(exc)}
 
 
+# ----- Chunked uploads -----
+# Large or binary files are streamed as raw request bodies into a staged
+# file, then verified and atomically moved into place:
+#   POST /sandbox/upload/start            -> upload_id
+#   PUT  /sandbox/upload/{id}?offset=N    raw body chunk (resume from "received")
+#   GET  /sandbox/upload/{id}             -> received bytes
+#   POST /sandbox/upload/{id}/complete    verify sha256, fsync, rename
+#   PUT  /sandbox/upload?path=...         single-request streamed upload
+# The streaming handlers are async, so their disk work (chunk writes,
+# hashing, fsync) runs in the threadpool to keep the event loop free.
+# Uploads left unfinished are discarded by /sandbox/gc after a day.
+
+
+def _sandbox_uploads() -> uploads.UploadManager:
+    return uploads.UploadManager(SANDBOX_DIR, blob_store=_sandbox_blobs())
+
+
+async def _receive_upload(manager: uploads.UploadManager, upload_id: str, offset: int, request: Request):
+    """Write a streamed request body into an upload from `offset`."""
+    with manager.open_writer(upload_id, offset) as writer:
+        async for chunk in request.stream():
+            await run_in_threadpool(writer.write, chunk)
+            _SANDBOX_WRITE_BYTES.inc(len(chunk))
+
+
+@app.post("/sandbox/upload/start")
+def sandbox_upload_start(req: SandboxUploadStartRequest) -> Dict[str, Any]:
+    """Begin a chunked upload into the sandbox."""
+    try:
+        status = _sandbox_uploads().start(req.path, size=req.size, sha256=req.sha256)
+        logger.info("[Sandbox] Upload %s started for %s", status["upload_id"], req.path)
+        return {"ok": True, **status}
+    except uploads.UploadError as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Upload start error")
+        return {"ok": False, "error": str(exc)}
+
+
+@app.get("/sandbox/upload/{upload_id}")
+def sandbox_upload_status(upload_id: str) -> Dict[str, Any]:
+    """Report how many bytes of an upload have been received."""
+    try:
+        return {"ok": True, **_sandbox_uploads().status(upload_id)}
+    except uploads.UploadError as exc:
+        return {"ok": False, "error": str(exc)}
+
+
+@app.put("/sandbox/upload/{upload_id}")
+async def sandbox_upload_chunk(upload_id: str, request: Request, offset: int = 0) -> Dict[str, Any]:
+    """Stream a raw request body into an upload starting at `offset`."""
+    manager = _sandbox_uploads()
+    try:
+        await _receive_upload(manager, upload_id, offset, request)
+        return {"ok": True, **await run_in_threadpool(manager.status, upload_id)}
+    except uploads.UploadError as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Upload chunk error")
+        return {"ok": False, "error": str(exc)}
+
+
+@app.post("/sandbox/upload/{upload_id}/complete")
+def sandbox_upload_complete(upload_id: str, req: SandboxUploadCompleteRequest) -> Dict[str, Any]:
+    """Verify an upload's checksum and move it into place atomically."""
+    try:
+        result = _sandbox_uploads().complete(upload_id, sha256=req.sha256)
+        logger.info("[Sandbox] Upload %s completed: %s (%d bytes)", upload_id, result["path"], result["size"])
+        return {"ok": True, **result}
+    except uploads.UploadError as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Upload complete error")
+        return {"ok": False, "error": str(exc)}
+
+
+@app.delete("/sandbox/upload/{upload_id}")
+def sandbox_upload_abort(upload_id: str) -> Dict[str, Any]:
+    """Discard a staged upload."""
+    try:
+        _sandbox_uploads().abort(upload_id)
+        return {"ok": True}
+    except uploads.UploadError as exc:
+        return {"ok": False, "error": str(exc)}
+
+
+@app.put("/sandbox/upload")
+async def sandbox_upload(path: str, request: Request, sha256: Optional[str] = None,
+                         size: Optional[int] = None) -> Dict[str, Any]:
+    """Upload a whole file as one streamed raw request body."""
+    manager = _sandbox_uploads()
+    upload_id = None
+    try:
+        upload_id = (await run_in_threadpool(manager.start, path, size=size, sha256=sha256))["upload_id"]
+        await _receive_upload(manager, upload_id, 0, request)
+        result = await run_in_threadpool(manager.complete, upload_id)
+        logger.info("[Sandbox] Uploaded %s (%d bytes)", path, result["size"])
+        return {"ok": True, **result}
+    except Exception as exc:
+        if upload_id:
+            await run_in_threadpool(manager.abort, upload_id)
+        if not isinstance(exc, uploads.UploadError):
+            logger.exception("[Sandbox] Upload error")
+        return {"ok": False, "error": str(exc)}
+
+
+# ----- Delta sync -----
+# Edit-save loops send block hashes first and upload only changed blocks:
+#   POST /sandbox/sync/plan     block hashes -> sync_id + missing block indexes
+#   POST /sandbox/sync/{id}     raw body: missing blocks concatenated in order
+
+
+@app.post("/sandbox/sync/plan")
+def sandbox_sync_plan(req: SandboxSyncPlanRequest) -> Dict[str, Any]:
+    """Find which blocks of a new file version the sandbox already has."""
+    try:
+        plan = _sandbox_delta_sync().plan(req.path, req.size, req.sha256, req.block_size, req.blocks)
+        logger.info("[Sandbox] Sync plan for %s: %d/%d blocks missing",
+                    req.path, len(plan["missing"]), len(req.blocks))
+        return {"ok": True, **plan}
+    except (blobstore.SyncError, uploads.UploadError) as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Sync plan error")
+        return {"ok": False, "error": str(exc)}
+
+
+@app.post("/sandbox/sync/{sync_id}")
+async def sandbox_sync_apply(sync_id: str, request: Request) -> Dict[str, Any]:
+    """Upload the missing blocks for a planned sync and commit the new version."""
+    try:
+        payload = await request.body()
+        result = _sandbox_delta_sync().apply(sync_id, payload)
+        logger.info("[Sandbox] Synced %s (%d bytes uploaded, %d reused)",
+                    result["path"], result["uploaded_bytes"], result["reused_bytes"])
+        return {"ok": True, **result}
+    except (blobstore.SyncError, uploads.UploadError) as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Sync apply error")
+        return {"ok": False, "error": str(exc)}
+
+
+@app.post("/sandbox/gc")
+def sandbox_gc() -> Dict[str, Any]:
+    """Remove stale unfinished uploads and blobs no sandbox file refers to anymore (and split legacy hardlinks)."""
+    try:
+        expired = _sandbox_uploads().expire()
+        store = _sandbox_blobs()
+        removed = store.gc()
+        logger.info("[Sandbox] GC removed %d blobs and %d stale uploads", removed, expired)
+        return {"ok": True, "removed": removed, "expired_uploads": expired, **store.stats()}
+    except Exception as exc:
+        logger.exception("[Sandbox] GC error")
+        return {"ok": False, "error": str(exc)}
+
+
 @app.post("/sandbox/rename")
 def sandbox_rename(req: SandboxRenameRequest) -> Dict[str, Any]:
     """Rename a file or directory in sandbox."""
@@ -425,6 +946,227 @@ def sandbox_delete(req: SandboxDeleteRequest) -> Dict[str, Any]:
         return {"ok": False, "error": str(exc)}
 
 
+# ----- Batch operations -----
+
+_BATCH_READ_OPS = {"list", "read"}
+_BATCH_WRITE_OPS = {"write", "rename", "delete"}
+
+
+class _SandboxTransaction:
+    """Undo log for an atomic batch.
+
+    Before a mutation touches a path, the current file is hardlinked into a
+    staging directory (sandbox writes replace files rather than modifying
+    them, so the link keeps the old content). Rolling back replays the undo
+    log in reverse.
+    """
+
+    def __init__(self):
+        self.staging_dir = SANDBOX_DIR / ".batch" / uuid.uuid4().hex
+        self._undo: List[Any] = []
+
+    def _backup(self, path: Path):
+        """Remember how to restore `path` to its current state."""
+        if path.is_file():
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            saved = self.staging_dir / uuid.uuid4().hex
+            try:
+                os.link(path, saved)
+            except OSError:
+                shutil.copy2(path, saved)
+            self._undo.append(lambda: os.replace(saved, path))
+        elif path.is_dir():
+            self._undo.append(lambda: path.mkdir(parents=True, exist_ok=True))
+        else:
+            self._undo.append(lambda: path.unlink() if path.is_file() else None)
+
+    def before(self, op: SandboxBatchOp):
+        """Record undo steps for a mutation that is about to run."""
+        if op.op in ("write", "delete") and op.path:
+            self._backup(SANDBOX_DIR / op.path)
+        elif op.op == "rename" and op.from_path and op.to_path:
+            from_path = SANDBOX_DIR / op.from_path
+            to_path = SANDBOX_DIR / op.to_path
+            self._backup(to_path)
+
+            def rename_back():
+                if to_path.exists() and not from_path.exists():
+                    to_path.rename(from_path)
+
+            self._undo.append(rename_back)
+
+    def rollback(self):
+        for undo in reversed(self._undo):
+            try:
+                undo()
+            except OSError:
+                logger.exception("[Sandbox] Batch rollback step failed")
+        self._undo.clear()
+
+    def close(self):
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def _batch_op_error(op: SandboxBatchOp) -> Optional[str]:
+    """Why `op` cannot run (missing arguments, unknown operation), or None."""
+    if op.op not in _BATCH_READ_OPS and op.op not in _BATCH_WRITE_OPS:
+        return f"Unknown operation: {op.op}"
+    if op.op in ("read", "write", "delete") and not op.path:
+        return f"'{op.op}' needs a path"
+    if op.op == "rename" and not (op.from_path and op.to_path):
+        return "'rename' needs from and to"
+    return None
+
+
+def _run_batch_op(op: SandboxBatchOp) -> Dict[str, Any]:
+    """Run one batch operation through the regular sandbox handler (errors become results)."""
+    try:
+        return _dispatch_batch_op(op)
+    except HTTPException as exc:
+        return {"ok": False, "error": str(exc.detail)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Batch %s failed", op.op)
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _dispatch_batch_op(op: SandboxBatchOp) -> Dict[str, Any]:
+    if op.op == "list":
+        result = sandbox_list(op.path or "").model_dump()
+    elif op.op == "read":
+        result = sandbox_read(op.path, op.offset, op.length, op.start_line, op.num_lines).model_dump()
+    elif op.op == "write":
+        result = sandbox_write(SandboxWriteRequest(path=op.path, content=op.content or ""))
+    elif op.op == "rename":
+        result = sandbox_rename(SandboxRenameRequest(from_path=op.from_path, to_path=op.to_path))
+    elif op.op == "delete":
+        result = sandbox_delete(SandboxDeleteRequest(path=op.path))
+    else:
+        result = {"ok": False, "error": f"Unknown operation: {op.op}"}
+    return {k: v for k, v in result.items() if v is not None}
+
+
+@app.post("/sandbox/batch")
+def sandbox_batch(req: SandboxBatchRequest) -> Dict[str, Any]:
+    """Run an ordered list of sandbox operations in one request.
+
+    Consecutive list/read operations run concurrently (up to max_parallel);
+    mutations run one at a time in order. Every operation is checked for
+    missing arguments first; an atomic batch with an invalid operation is
+    rejected before anything runs. With atomic=true the batch also stops at
+    the first failure and every mutation already applied is rolled back.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(req.ops)
+    errors: Dict[int, str] = {}
+    for index, op in enumerate(req.ops):
+        error = _batch_op_error(op)
+        if error:
+            errors[index] = error
+    if errors and req.atomic:
+        # Nothing has run yet: reject the whole batch
+        results = [{"index": i, "op": op.op, "ok": False,
+                    "error": errors.get(i, "Skipped: the batch has invalid operations")}
+                   for i, op in enumerate(req.ops)]
+        logger.info("[Sandbox] Atomic batch of %d ops rejected (%d invalid)", len(req.ops), len(errors))
+        return {"ok": False, "rolled_back": False, "results": results}
+    for index, error in errors.items():
+        results[index] = {"ok": False, "error": error}
+
+    txn = _SandboxTransaction() if req.atomic else None
+    failed = False
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, req.max_parallel)) as executor:
+            i = 0
+            while i < len(req.ops) and not failed:
+                # Gather a run of read-only operations and execute them together
+                if results[i] is not None:  # Invalid, already reported (non-atomic batches only)
+                    i += 1
+                    continue
+                j = i
+                while j < len(req.ops) and req.ops[j].op in _BATCH_READ_OPS and results[j] is None:
+                    j += 1
+                if j > i:
+                    for k, result in enumerate(executor.map(_run_batch_op, req.ops[i:j]), start=i):
+                        results[k] = result
+                    failed = txn is not None and not all(r.get("ok") for r in results[i:j])
+                    i = j
+                    continue
+
+                op = req.ops[i]
+                if txn and op.op in _BATCH_WRITE_OPS:
+                    try:
+                        txn.before(op)
+                    except OSError as exc:
+                        results[i] = {"ok": False, "error": f"Could not save the current state: {exc}"}
+                        failed = True
+                        break
+                results[i] = _run_batch_op(op)
+                failed = txn is not None and not results[i].get("ok")
+                i += 1
+
+        if failed:
+            txn.rollback()
+    except BaseException:
+        if txn:
+            txn.rollback()  # Before close() removes the saved copies
+        raise
+    finally:
+        if txn:
+            txn.close()
+
+    for index, op in enumerate(req.ops):
+        if results[index] is None:
+            results[index] = {"ok": False, "error": "Skipped after an earlier failure"}
+        results[index] = {"index": index, "op": op.op, **results[index]}
+
+    ok = all(r["ok"] for r in results)
+    logger.info("[Sandbox] Batch of %d ops finished (ok=%s, rolled_back=%s)", len(req.ops), ok, failed)
+    return {"ok": ok, "rolled_back": failed, "results": results}
+
+
+# ----- Archives -----
+
+@app.get("/sandbox/archive")
+def sandbox_archive_download(path: str = "", format: str = "tar"):
+    """Stream a sandbox subtree (or file) as tar, tar.gz or zip."""
+    target = SANDBOX_DIR / path if path else SANDBOX_DIR
+    if not target.exists():
+        raise HTTPException(status_code=404, detail=f"Path does not exist: {path}")
+    if format not in archive.ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported archive format: {format}")
+
+    name = (target.name or "sandbox") + "." + format
+    media_type = "application/zip" if format == "zip" else "application/x-tar"
+    logger.info("[Sandbox] Streaming %s archive of %s", format, path or "/")
+    return StreamingResponse(
+        archive.iter_archive(target, format, skip_names=SANDBOX_INTERNAL_DIRS),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
+
+@app.post("/sandbox/archive")
+async def sandbox_archive_upload(request: Request, path: str = "", format: str = "tar") -> Dict[str, Any]:
+    """Unpack a tar, tar.gz or zip request body into a sandbox directory."""
+    spool = tempfile.NamedTemporaryFile(delete=False, suffix=".archive")
+    try:
+        with spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+
+        dest = SANDBOX_DIR / path if path else SANDBOX_DIR
+        files = archive.extract_archive(Path(spool.name), dest, format, blob_store=_sandbox_blobs())
+        logger.info("[Sandbox] Extracted %d files into %s", len(files), path or "/")
+        return {"ok": True, "files": files}
+    except (archive.ArchiveError, tarfile.TarError, zipfile.BadZipFile) as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception as exc:
+        logger.exception("[Sandbox] Archive upload error")
+        return {"ok": False, "error": str(exc)}
+    finally:
+        os.unlink(spool.name)
+
+
 # ========== SHELL ENDPOINT ==========
 
 @app.post("/shell")
@@ -477,19 +1219,30 @@ def shell(req: ShellRequest) -> ShellResponse:
 # ========== SYSTEM FILE BROWSER ==========
 
 @app.get("/browse")
-def browse_system(path: str = "", recursive: bool = False, pattern: Optional[str] = None) -> Dict[str, Any]:
+def browse_system(
+    path: str = "",
+    recursive: bool = False,
+    pattern: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    max_depth: int = config.BROWSE_MAX_DEPTH,
+    max_entries: int = config.BROWSE_MAX_ENTRIES,
+) -> Dict[str, Any]:
     """Browse any directory on the system (not limited to sandbox).
 
     Args:
         path: Absolute path to browse. Empty string = list drives on Windows
-        recursive: If true, include subdirectories
+        recursive: With a pattern, search subdirectories for matching names
         pattern: Glob pattern to filter files (e.g., "*.py", "*.txt")
+        cursor: Opaque cursor from a previous response's next_cursor
+        limit: Maximum entries per page (e.g. config.BROWSE_PAGE_SIZE); omitted = whole listing
+        max_depth: Maximum directory depth for recursive walks
+        max_entries: Maximum entries collected by a recursive walk
     """
     try:
         # If no path, list drives on Windows or root on Unix
         if not path or path == "":
             if sys.platform == "win32":
-                import string
                 drives = []
                 for letter in string.ascii_uppercase:
                     drive = f"{letter}:\\"
@@ -517,52 +1270,29 @@ def browse_system(path: str = "", recursive: bool = False, pattern: Optional[str
                 "path": str(target_path.parent)
             }
 
-        entries = []
+        page = browse.browse(
+            str(target_path),
+            recursive=recursive,
+            pattern=pattern,
+            cursor=cursor,
+            limit=limit,
+            max_depth=max_depth,
+            max_entries=max_entries,
+        )
+        entries = page["entries"]
 
-        # Add parent directory link
-        if target_path.parent != target_path:
-            entries.append({"name": "..", "type": "dir", "path": str(target_path.parent)})
-
-        if recursive and pattern:
-            # Recursive with pattern
-            for item in target_path.rglob(pattern):
-                try:
-                    entries.append({
-                        "name": item.name,
-                        "type": "dir" if item.is_dir() else "file",
-                        "path": str(item),
-                        "relative": str(item.relative_to(target_path))
-                    })
-                except:
-                    pass
-        else:
-            # Non-recursive listing
-            for item in target_path.iterdir():
-                try:
-                    if pattern and not item.is_dir():
-                        import fnmatch
-                        if not fnmatch.fnmatch(item.name, pattern):
-                            continue
-
-                    entry = {
-                        "name": item.name,
-                        "type": "dir" if item.is_dir() else "file",
-                        "path": str(item)
-                    }
-
-                    if item.is_file():
-                        try:
-                            entry["size"] = item.stat().st_size
-                        except:
-                            pass
-
-                    entries.append(entry)
-                except PermissionError:
-                    # Skip files/dirs we can't access
-                    pass
+        # Add parent directory link on the first page
+        if not cursor and target_path.parent != target_path:
+            entries.insert(0, {"name": "..", "type": "dir", "path": str(target_path.parent)})
 
         logger.info("[Browse] Listed %d entries in %s", len(entries), path)
-        return {"ok": True, "entries": entries, "path": str(target_path)}
+        return {
+            "ok": True,
+            "entries": entries,
+            "path": str(target_path),
+            "next_cursor": page["next_cursor"],
+            "truncated": page["truncated"],
+        }
 
     except PermissionError:
         return {"ok": False, "entries": [], "error": f"Permission denied: {path}"}
@@ -571,9 +1301,49 @@ def browse_system(path: str = "", recursive: bool = False, pattern: Optional[str
         return {"ok": False, "entries": [], "error": str(exc)}
 
 
+@app.get("/browse/search")
+def browse_search(q: str, mode: str = "auto", root: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+    """Search file and directory names in the background filesystem index.
+
+    Args:
+        q: Glob ("*.py"), substring ("config") or extension (".md")
+        mode: "glob", "substring", "ext" or "auto"
+        root: Optional directory to restrict results to
+        limit: Maximum number of results
+    """
+    indexer = fs_index.get_indexer()
+    if not indexer.enabled:
+        return {
+            "ok": False,
+            "entries": [],
+            "error": "Filesystem index is disabled. Set BROWSE_INDEX_ROOTS to enable it."
+        }
+
+    try:
+        entries = indexer.search(q, mode=mode, root=root, limit=limit)
+        logger.info("[Browse] Search %r matched %d entries", q, len(entries))
+        return {"ok": True, "entries": entries, "indexes": indexer.status()}
+    except Exception as exc:
+        logger.exception("[Browse] Search error")
+        return {"ok": False, "entries": [], "error": str(exc)}
+
+
 @app.get("/browse/read")
-def browse_read_file(path: str) -> Dict[str, Any]:
-    """Read a file from anywhere on the system."""
+def browse_read_file(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    num_lines: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Read a file from anywhere on the system.
+
+    Returns at most config.READ_PAGE_BYTES (1MB) per call. Larger files are
+    paged through with offset/length (bytes) or start_line/num_lines (1-based
+    lines); next_offset/next_line point at the following page. A line
+    longer than one page is cut: next_offset continues it by bytes and
+    next_line is the line after it.
+    """
     try:
         file_path = Path(path)
 
@@ -583,28 +1353,18 @@ def browse_read_file(path: str) -> Dict[str, Any]:
         if not file_path.is_file():
             return {"ok": False, "error": f"Path is not a file: {path}"}
 
-        # Check file size (limit to 1MB for safety)
-        size = file_path.stat().st_size
-        if size > 1024 * 1024:
-            return {"ok": False, "error": f"File too large ({size} bytes). Max 1MB."}
-
-        # Try to read as text
         try:
-            content = file_path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            # Try with different encoding
-            try:
-                content = file_path.read_text(encoding="latin-1")
-            except:
-                return {"ok": False, "error": "File is not text or has unsupported encoding"}
+            page = _read_text_range(file_path, offset, length, start_line, num_lines)
+        except file_io.BinaryFileError as exc:
+            return {"ok": False, "error": str(exc)}
 
-        logger.info("[Browse] Read file %s (%d bytes)", path, len(content))
+        logger.info("[Browse] Read file %s (%d bytes)", path, len(page["content"]))
         return {
             "ok": True,
-            "content": content,
             "path": str(file_path),
-            "size": size,
-            "name": file_path.name
+            "name": file_path.name,
+            "truncated": page.get("next_offset") is not None or page.get("next_line") is not None,
+            **page,
         }
 
     except PermissionError:
@@ -614,14 +1374,53 @@ def browse_read_file(path: str) -> Dict[str, Any]:
         return {"ok": False, "error": str(exc)}
 
 
+@app.get("/browse/download")
+def browse_download(path: str, request: Request):
+    """Stream any file as raw bytes (supports HTTP Range), with no size cap."""
+    file_path = Path(path)
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail=f"File does not exist: {path}")
+    try:
+        return _file_stream_response(file_path, request)
+    except PermissionError:
+        raise HTTPException(status_code=403, detail=f"Permission denied: {path}")
+
+
 # ========== CODE ANALYSIS ==========
 
+def _outline_with_expansions(path: str, requested_as: str, expand: List[str]) -> str:
+    """Outline of a file plus the full source of any symbols requested for it."""
+    names = []
+    for spec in expand:
+        file_part, _, symbol = spec.rpartition("::")
+        if file_part in (requested_as, path) and symbol:
+            names.append(symbol)
+
+    text = outline.format_outline(outline.outline_file(path))
+    for name, source in outline.expand_symbols(path, names).items():
+        text += f"\n--- {name} ---\n{source}\n"
+    return text
+
+
+@app.get("/analyze/outline")
+def analyze_outline(path: str) -> Dict[str, Any]:
+    """Structural outline of a file (symbols with line ranges), for outline-first analysis."""
+    file_path = Path(path) if Path(path).is_absolute() else SANDBOX_DIR / path
+    try:
+        return {"ok": True, **outline.outline_file(str(file_path))}
+    except (OSError, file_io.BinaryFileError) as exc:
+        return {"ok": False, "error": str(exc)}
+
+
 @app.post("/analyze")
 def analyze_code(req: CodeAnalysisRequest) -> CodeAnalysisResponse:
     """Send files to LLM for code analysis.
 
     This endpoint:
-    1. Reads the specified files
+    1. Reads the specified files (or, with `directory`, picks the chunks of
+       that tree most relevant to the prompt using a BM25 index). With
+       mode="outline" each file is sent as an outline, plus the full source
+       of any symbols listed in `expand`
     2. Builds a context with file contents
     3. Sends to LLM with your prompt
     4. Returns the analysis
@@ -635,62 +1434,72 @@ def analyze_code(req: CodeAnalysisRequest) -> CodeAnalysisResponse:
         files_analyzed = []
         total_size = 0
 
-        for file_path_str in req.files:
-            try:
-                # Support both absolute paths and sandbox-relative paths
-                if Path(file_path_str).is_absolute():
-                    file_path = Path(file_path_str)
-                else:
-                    file_path = SANDBOX_DIR / file_path_str
-
-                if not file_path.exists():
-                    logger.warning("[Analyze] File not found: %s", file_path_str)
-                    continue
-
-                if not file_path.is_file():
-                    logger.warning("[Analyze] Not a file: %s", file_path_str)
-                    continue
-
-                # Read file content
-                try:
-                    content = file_path.read_text(encoding="utf-8")
-                except UnicodeDecodeError:
-                    content = file_path.read_text(encoding="latin-1")
-
-                original_size = len(content)
-                truncated = False
-
-                # Truncate large files
-                if len(content) > MAX_FILE_SIZE:
-                    content = content[:MAX_FILE_SIZE] + f"\n\n... [TRUNCATED - file is {original_size} bytes, showing first {MAX_FILE_SIZE}] ..."
+        if req.directory is not None:
+            root = Path(req.directory) if Path(req.directory).is_absolute() else SANDBOX_DIR / req.directory
+            if not root.is_dir():
+                return CodeAnalysisResponse(ok=False, error=f"Not a directory: {req.directory}")
+
+            # Rank chunks of the tree against the prompt and send only the best ones
+            sections = code_search.select_context(str(root), req.prompt, MAX_TOTAL_SIZE)
+            files_content.append(code_search.format_context(sections))
+            total_size = sum(len(section["text"]) for section in sections)
+            for section in sections:
+                path_str = str(root / section["path"])
+                if path_str not in files_analyzed:
+                    files_analyzed.append(path_str)
+            logger.info("[Analyze] Selected %d chunks from %d files in %s", len(sections), len(files_analyzed), root)
+
+        # Support both absolute paths and sandbox-relative paths
+        resolved = [
+            str(Path(p)) if Path(p).is_absolute() else str(SANDBOX_DIR / p)
+            for p in req.files
+        ]
+        loaded = file_io.load_text_files(resolved)
+
+        for file_path_str, item in zip(req.files, loaded):
+            if item["file"] is None:
+                logger.warning("[Analyze] Skipping %s: %s", file_path_str, item["error"])
+                continue
+            if item["duplicate_of"]:
+                logger.info("[Analyze] Skipping %s: identical to %s", file_path_str, item["duplicate_of"])
+                continue
+
+            file_path = Path(item["path"])
+            if req.mode == "outline":
+                content = _outline_with_expansions(item["path"], file_path_str, req.expand)
+            else:
+                content = item["file"].text
+            original_size = len(content)
+            truncated = False
+
+            # Truncate large files
+            if len(content) > MAX_FILE_SIZE:
+                content = content[:MAX_FILE_SIZE] + f"\n\n... [TRUNCATED - file is {original_size} bytes, showing first {MAX_FILE_SIZE}] ..."
+                truncated = True
+                logger.info("[Analyze] Truncated file: %s (%d -> %d bytes)", file_path.name, original_size, MAX_FILE_SIZE)
+
+            # Check total size limit
+            if total_size + len(content) > MAX_TOTAL_SIZE:
+                remaining = MAX_TOTAL_SIZE - total_size
+                if remaining > 1000:
+                    content = content[:remaining] + f"\n\n... [TRUNCATED due to total size limit] ..."
                     truncated = True
-                    logger.info("[Analyze] Truncated file: %s (%d -> %d bytes)", file_path.name, original_size, MAX_FILE_SIZE)
-
-                # Check total size limit
-                if total_size + len(content) > MAX_TOTAL_SIZE:
-                    remaining = MAX_TOTAL_SIZE - total_size
-                    if remaining > 1000:
-                        content = content[:remaining] + f"\n\n... [TRUNCATED due to total size limit] ..."
-                        truncated = True
-                    else:
-                        logger.warning("[Analyze] Skipping file %s - total size limit reached", file_path.name)
-                        continue
-
-                if req.include_content:
-                    file_header = f"=== File: {file_path.name}"
-                    if truncated:
-                        file_header += f" (TRUNCATED from {original_size} bytes)"
-                    file_header += " ===\n"
-                    files_content.append(f"{file_header}```\n{content}\n```\n")
                 else:
-                    files_content.append(f"=== File: {file_path.name} (path: {file_path}) ===\n")
+                    logger.warning("[Analyze] Skipping file %s - total size limit reached", file_path.name)
+                    continue
 
-                total_size += len(content)
-                files_analyzed.append(str(file_path))
-                logger.info("[Analyze] Loaded file: %s (%d bytes%s)", file_path.name, len(content), ", truncated" if truncated else "")
+            if req.include_content:
+                file_header = f"=== File: {file_path.name}"
+                if truncated:
+                    file_header += f" (TRUNCATED from {original_size} bytes)"
+                file_header += " ===\n"
+                files_content.append(f"{file_header}```\n{content}\n```\n")
+            else:
+                files_content.append(f"=== File: {file_path.name} (path: {file_path}) ===\n")
 
-            except Exception as e:
-                logger.warning("[Analyze] Error reading %s: %s", file_path_str, e)
+            total_size += len(content)
+            files_analyzed.append(str(file_path))
+            logger.info("[Analyze] Loaded file: %s (%d bytes%s)", file_path.name, len(content), ", truncated" if truncated else "")
 
         if not files_analyzed:
             return CodeAnalysisResponse(
@@ -726,11 +1535,13 @@ Provide a clear, helpful response."""
 
         logger.info("[Analyze] Sending %d files to LLM (total context: %d chars)", len(files_analyzed), total_size)
 
+        lm_started = time.perf_counter()
         try:
             # Use longer timeout for code analysis (5 minutes)
             lm_res = requests.post(LM_ENDPOINT, json=lm_payload, timeout=300)
             lm_res.raise_for_status()
             lm_json = lm_res.json()
+            metrics.record_llm_call("analyze", time.perf_counter() - lm_started, usage=lm_json.get("usage"))
 
             # Extract the response text
             analysis = lm_json.get("choices", [{}])[0].get("message", {}).get("content", "No response")
@@ -743,6 +1554,7 @@ Provide a clear, helpful response."""
             )
 
         except requests.exceptions.ReadTimeout:
+            metrics.record_llm_call("analyze", time.perf_counter() - lm_started, ok=False)
             logger.error("[Analyze] LM Studio timeout after 5 minutes")
             return CodeAnalysisResponse(
                 ok=False,
@@ -751,6 +1563,7 @@ Provide a clear, helpful response."""
             )
 
         except requests.HTTPError as exc:
+            metrics.record_llm_call("analyze", time.perf_counter() - lm_started, ok=False)
             status_code = exc.response.status_code if exc.response else 0
             error_text = exc.response.text[:500] if exc.response else str(exc)
             logger.error("[Analyze] LM Studio HTTP error %d: %s", status_code, error_text)
@@ -769,6 +1582,7 @@ Provide a clear, helpful response."""
             )
 
         except requests.RequestException as exc:
+            metrics.record_llm_call("analyze", time.perf_counter() - lm_started, ok=False)
             logger.exception("[Analyze] LM Studio error")
             return CodeAnalysisResponse(
                 ok=False,
@@ -808,8 +1622,11 @@ if __name__ == "__main__":
     print(f"   /run-task     - Execute task with LLM")
     print(f"   /analyze      - Code analysis with LLM")
     print(f"   /browse       - System file browser")
-    print(f"   /browse/read  - Read any file")
+    print(f"   /browse/read  - Read any file (paged)")
+    print(f"   /browse/download - Stream any file (Range supported)")
+    print(f"   /browse/search - Indexed name search (BROWSE_INDEX_ROOTS)")
     print(f"   /shell        - Execute commands (admin optional)")
+    print(f"   /admin/profile - Sampling profiler (collapsed stacks)")
     print(f"   /sandbox/*    - Sandbox file operations")
     print(f"{'='*60}\n")
 
@@ -6,12 +6,45 @@ Main package initialization
 __version__ = "0.1.0"
 __author__ = "MatinDeevv"
 
-from .agent import Agent, agent
-from .tasks import Task, TaskStore, TaskStatus, TaskType
-from .memory import MemoryStore, Event, EventType, memory
-from .llm_client import LMStudioClient, llm
+import importlib
+
 from .config import *
 
+# Public names -> defining submodule. They are imported on first access
+# (PEP 562), so `import src.tasks` does not pull in the agent, the tools
+# and `requests`.
+_LAZY_EXPORTS = {
+    "Agent": "agent",
+    "agent": "agent",
+    "Task": "tasks",
+    "TaskStore": "tasks",
+    "TaskStatus": "tasks",
+    "TaskType": "tasks",
+    "MemoryStore": "memory",
+    "Event": "memory",
+    "EventType": "memory",
+    "memory": "memory",
+    "LMStudioClient": "llm_client",
+    "llm": "llm_client",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # `agent` and `memory` name both a submodule and its singleton. Resolved
+    # here the singleton wins, but a submodule imported directly beforehand
+    # (`import src.memory`) is already bound: import singletons from their
+    # modules (`from src.memory import memory`).
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 __all__ = [
     "Agent",
     "agent",
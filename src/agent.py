@@ -3,12 +3,21 @@ Agent orchestrator for Project ME v0
 Core logic for processing tasks with LLM planning and tool execution.
 """
 import json
+import time
 from typing import Dict, Any, List, Optional
 
 from .tasks import Task, TaskStore, TaskStatus
 from .memory import memory, EventType
 from .llm_client import llm
-from .tools import get_tool, list_tools
+from .tools import executor_for, get_tool, get_tool_spec, list_tools, tool_schemas
+from .tools.memo import tool_memo
+from .code_search import select_context, format_context
+from .outline import outline_file, format_outline, expand_symbols
+from . import config, metrics, tracing
+from .lazy import LazyObject
+
+_TASK_DURATION = metrics.histogram("agent_task_duration_seconds", "Task processing time", ["type", "outcome"])
+_TASKS_IN_FLIGHT = metrics.gauge("agent_tasks_in_flight", "Tasks currently being processed")
 
 
 class Agent:
@@ -29,6 +38,9 @@ class Agent:
         4. Generate summary
         5. Update task status
 
+        The phases are traced (see tracing.py); the trace is stored on the
+        task as task.trace.
+
         Returns a result dict with success status and summary.
         """
         print(f"\n{'='*60}")
@@ -37,60 +49,80 @@ class Agent:
         print(f"Payload: {json.dumps(task.payload, indent=2)}")
         print(f"{'='*60}\n")
 
-        # Update task to RUNNING
-        task.update_status(TaskStatus.RUNNING)
-        self.task_store.update_task(task)
-
-        # Log task start
-        memory.log_event(
-            EventType.TASK_STARTED,
-            data={"task_type": task.type, "payload": task.payload},
-            task_id=task.id
-        )
-
-        try:
-            # Route to appropriate handler based on task type
-            if task.type == "shell":
-                result = self._handle_shell_task(task)
-            elif task.type == "generic_llm":
-                result = self._handle_generic_llm_task(task)
-            elif task.type == "filesystem":
-                result = self._handle_filesystem_task(task)
-            elif task.type == "code_analysis":
-                result = self._handle_code_analysis_task(task)
-            else:
-                raise ValueError(f"Unknown task type: {task.type}")
-
-            # Mark as done
-            task.update_status(TaskStatus.DONE, result=result)
-            self.task_store.update_task(task)
-
-            memory.log_event(
-                EventType.TASK_COMPLETED,
-                data={"result": result},
-                task_id=task.id
-            )
-
-            print(f"\n✓ Task completed successfully")
-            return result
-
-        except Exception as e:
-            error_msg = f"Task failed: {str(e)}"
-            print(f"\n✗ {error_msg}")
-
-            task.update_status(TaskStatus.FAILED, error=error_msg)
-            self.task_store.update_task(task)
-
-            memory.log_event(
-                EventType.TASK_FAILED,
-                data={"error": error_msg},
-                task_id=task.id
-            )
+        started = time.perf_counter()
+        outcome = "done"
+
+        with tracing.start_trace(f"task:{task.type}", task_id=task.id) as trace:
+            with tracing.span("claim"):
+                # Update task to RUNNING
+                task.update_status(TaskStatus.RUNNING)
+                self.task_store.update_task(task)
+
+                # Log task start
+                memory.log_event(
+                    EventType.TASK_STARTED,
+                    data={"task_type": task.type, "payload": task.payload},
+                    task_id=task.id
+                )
+
+            _TASKS_IN_FLIGHT.inc()
+            try:
+                with tracing.span("execute", type=task.type):
+                    # Route to appropriate handler based on task type
+                    if task.type == "shell":
+                        result = self._handle_shell_task(task)
+                    elif task.type == "generic_llm":
+                        result = self._handle_generic_llm_task(task)
+                    elif task.type == "filesystem":
+                        result = self._handle_filesystem_task(task)
+                    elif task.type == "code_analysis":
+                        result = self._handle_code_analysis_task(task)
+                    elif task.type == "agent":
+                        result = self._handle_agent_task(task)
+                    else:
+                        raise ValueError(f"Unknown task type: {task.type}")
+
+                # Mark as done (the stored trace covers everything up to this write)
+                with tracing.span("final_persist"):
+                    task.update_status(TaskStatus.DONE, result=result)
+                    task.trace = trace.to_dict()
+                    self.task_store.update_task(task)
+
+                memory.log_event(
+                    EventType.TASK_COMPLETED,
+                    data={"result": result, "phases_ms": trace.phases()},
+                    task_id=task.id
+                )
+
+                print(f"\n✓ Task completed successfully")
+                return result
+
+            except Exception as e:
+                error_msg = f"Task failed: {str(e)}"
+                print(f"\n✗ {error_msg}")
+                outcome = "failed"
+
+                with tracing.span("final_persist"):
+                    task.update_status(TaskStatus.FAILED, error=error_msg)
+                    task.trace = trace.to_dict()
+                    self.task_store.update_task(task)
+
+                memory.log_event(
+                    EventType.TASK_FAILED,
+                    data={"error": error_msg, "phases_ms": trace.phases()},
+                    task_id=task.id
+                )
+
+                return {
+                    "success": False,
+                    "error": error_msg
+                }
 
-            return {
-                "success": False,
-                "error": error_msg
-            }
+            finally:
+                tool_memo.clear_task(task.id)
+                _TASKS_IN_FLIGHT.dec()
+                _TASK_DURATION.labels(task.type, outcome).observe(time.perf_counter() - started)
+                task.trace = trace.to_dict()  # In-memory copy also includes the final write
 
     def _handle_shell_task(self, task: Task) -> Dict[str, Any]:
         """Handle a shell command task."""
@@ -203,51 +235,222 @@ class Agent:
         return result
 
     def _handle_code_analysis_task(self, task: Task) -> Dict[str, Any]:
-        """Handle code analysis with LLM assistance."""
+        """
+        Handle code analysis with LLM assistance.
+
+        Payload takes either 'filepath' (one file) or 'directory' (a tree:
+        only the chunks most relevant to the question are sent). With
+        mode "outline", a file is sent as an outline and the model may ask
+        for the full source of specific symbols.
+        """
         filepath = task.payload.get("filepath")
+        directory = task.payload.get("directory")
+        mode = task.payload.get("mode", "full")
         question = task.payload.get("question", "Analyze this code and provide insights.")
 
-        if not filepath:
-            raise ValueError("code_analysis task requires 'filepath'")
+        if not filepath and not directory:
+            raise ValueError("code_analysis task requires 'filepath' or 'directory'")
 
-        print(f"Analyzing code file: {filepath}")
+        if filepath and mode == "outline":
+            print(f"Outlining code file: {filepath}")
+            code_content = format_outline(outline_file(filepath))
+        elif filepath:
+            print(f"Analyzing code file: {filepath}")
 
-        # Read the file
-        read_tool = get_tool("read_file")
-        read_result = read_tool(filepath=filepath, task_id=task.id)
+            # Read the file
+            read_tool = get_tool("read_file")
+            read_result = read_tool(filepath=filepath, task_id=task.id)
 
-        if not read_result["success"]:
-            raise ValueError(f"Failed to read file: {read_result['error']}")
+            if not read_result["success"]:
+                raise ValueError(f"Failed to read file: {read_result['error']}")
 
-        code_content = read_result["content"]
+            code_content = f"```\n{read_result['content']}\n```"
+        else:
+            print(f"Analyzing directory: {directory}")
+            sections = select_context(directory, question)
+            if not sections:
+                raise ValueError(f"No files in {directory} match the question")
+            print(f"Selected {len(sections)} relevant sections from {len({s['path'] for s in sections})} files")
+            code_content = format_context(sections)
 
         # Ask LLM to analyze
         print(f"Asking LLM: {question}")
 
-        analysis = llm.chat(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert code analyzer. Provide clear, actionable insights."
-                },
-                {
-                    "role": "user",
-                    "content": f"Question: {question}\n\nCode:\n```\n{code_content}\n```"
-                }
-            ],
-            task_id=task.id
-        )
+        system_prompt = "You are an expert code analyzer. Provide clear, actionable insights."
+        if filepath and mode == "outline":
+            system_prompt += (
+                " You are given an outline of the file. If you need the full source of some"
+                " symbols to answer, reply with only a line 'EXPAND: name1, name2' using the"
+                " names from the outline (e.g. Class.method)."
+            )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Question: {question}\n\nCode:\n{code_content}"}
+        ]
+        analysis = llm.chat(messages=messages, task_id=task.id)
+
+        expanded: List[str] = []
+        for _ in range(config.OUTLINE_MAX_EXPAND_ROUNDS if mode == "outline" and filepath else 0):
+            if not analysis.strip().upper().startswith("EXPAND:"):
+                break
+            names = [n.strip() for n in analysis.strip()[len("EXPAND:"):].split(",") if n.strip()]
+            sources = expand_symbols(filepath, names)
+            print(f"Expanding symbols: {', '.join(sources) or '(none found)'}")
+            expanded.extend(sources)
+            reply = "\n\n".join(f"--- {name} ---\n{src}" for name, src in sources.items())
+            messages += [
+                {"role": "assistant", "content": analysis},
+                {"role": "user", "content": reply or "None of those symbols exist; answer from the outline."}
+            ]
+            analysis = llm.chat(messages=messages, task_id=task.id)
 
         print(f"\nAnalysis:\n{analysis}")
 
         return {
             "success": True,
             "analysis": analysis,
-            "filepath": filepath
+            "filepath": filepath,
+            "directory": directory,
+            "expanded_symbols": expanded
+        }
+
+    def _handle_agent_task(self, task: Task) -> Dict[str, Any]:
+        """
+        Plan/act loop: the LLM calls tools until it can answer the goal.
+
+        Each model turn may request several tool calls; they are executed
+        concurrently and all results are sent back in the next turn. The loop
+        stops when the model answers without tool calls or a budget (steps,
+        tokens, wall time) runs out.
+
+        Payload:
+            goal: What to accomplish
+            tools: Optional list of tool names to expose (default: all)
+            max_steps / max_tokens / max_seconds: Optional budget overrides
+        """
+        goal = task.payload.get("goal")
+        if not goal:
+            raise ValueError("agent task requires 'goal' in payload")
+
+        tool_names = task.payload.get("tools") or list_tools()
+        max_steps = int(task.payload.get("max_steps", config.AGENT_MAX_STEPS))
+        max_tokens = int(task.payload.get("max_tokens", config.AGENT_MAX_TOKENS))
+        max_seconds = float(task.payload.get("max_seconds", config.AGENT_MAX_WALL_SECONDS))
+        schemas = tool_schemas(tool_names)
+
+        print(f"Agent goal: {goal}")
+        print(f"Tools: {', '.join(tool_names)}")
+
+        messages: List[Dict[str, Any]] = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an autonomous assistant on the user's machine. Plan briefly, then use "
+                    "the provided tools to accomplish the goal. Request every independent tool call "
+                    "you need in the same turn; they run in parallel. When the goal is done, reply "
+                    "with the final answer and no tool calls."
+                )
+            },
+            {"role": "user", "content": goal}
+        ]
+
+        started = time.monotonic()
+        tokens_used = 0
+        calls_made = 0
+        answer = ""
+        stopped = "max_steps"
+        steps = 0
+
+        for steps in range(1, max_steps + 1):
+            reply = llm.chat_with_tools(messages, schemas, task_id=task.id)
+            tokens_used += reply["usage"].get("total_tokens", 0)
+            answer = reply["content"]
+
+            if not reply["tool_calls"]:
+                stopped = "done"
+                break
+
+            messages.append({"role": "assistant", "content": reply["content"], "tool_calls": reply["tool_calls"]})
+            print(f"\nStep {steps}: {len(reply['tool_calls'])} tool call(s)")
+            for call, result in zip(reply["tool_calls"], self._run_tool_calls(reply["tool_calls"], tool_names, task.id)):
+                calls_made += 1
+                content = json.dumps(result, default=str)
+                if len(content) > config.MAX_TOOL_OUTPUT_LENGTH:
+                    content = content[:config.MAX_TOOL_OUTPUT_LENGTH] + "... [truncated]"
+                messages.append({"role": "tool", "tool_call_id": call.get("id", ""), "content": content})
+
+            if tokens_used >= max_tokens:
+                stopped = "max_tokens"
+                break
+            if time.monotonic() - started >= max_seconds:
+                stopped = "max_seconds"
+                break
+
+        print(f"\nAgent stopped ({stopped}) after {steps} step(s), {calls_made} tool call(s), {tokens_used} tokens")
+        if answer:
+            print(f"\nAnswer:\n{answer}")
+
+        return {
+            "success": stopped == "done",
+            "answer": answer,
+            "stopped_reason": stopped,
+            "steps": steps,
+            "tool_calls": calls_made,
+            "tokens_used": tokens_used,
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+            "error": None if stopped == "done" else f"Budget exhausted: {stopped}"
         }
 
+    def _run_tool_calls(self, calls: List[Dict[str, Any]], allowed: List[str], task_id: str) -> List[Dict[str, Any]]:
+        """
+        Execute the tool calls from one model turn; results keep call order.
 
+        Consecutive read-only calls run concurrently, each on the executor for
+        its cost class. Calls with side effects run one at a time, in order.
+        """
 
-# Global agent instance
-agent = Agent()
+        def run(call):
+            function = call.get("function", {})
+            name = function.get("name", "")
+            if name not in allowed:
+                return {"success": False, "error": f"Tool not available: {name}"}
+            try:
+                args = json.loads(function.get("arguments") or "{}")
+            except json.JSONDecodeError as e:
+                return {"success": False, "error": f"Invalid JSON arguments: {e}"}
+            if not isinstance(args, dict):
+                return {"success": False, "error": "Arguments must be a JSON object"}
+            print(f"  -> {name}({', '.join(f'{k}={v!r}'[:80] for k, v in args.items())})")
+            try:
+                return get_tool(name)(**args, task_id=task_id)
+            except TypeError as e:
+                return {"success": False, "error": f"Bad arguments for {name}: {e}"}
+            except Exception as e:
+                # Any tool failure goes back to the model as the call's result; the loop continues
+                return {"success": False, "error": f"{name} failed: {type(e).__name__}: {e}"}
+
+        def spec_of(call):
+            try:
+                return get_tool_spec(call.get("function", {}).get("name", ""))
+            except ValueError:
+                return None
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        pending = []  # (index, future) for the current run of read-only calls
+        for i, call in enumerate(calls):
+            spec = spec_of(call)
+            if spec is not None and spec.read_only:
+                pending.append((i, executor_for(spec).submit(tracing.bind(run), call)))
+                continue
+            for j, future in pending:
+                results[j] = future.result()
+            pending = []
+            results[i] = run(call)
+        for j, future in pending:
+            results[j] = future.result()
+        return results
+
+
+# Global agent instance (built on first use)
+agent = LazyObject(Agent)
 
@@ -0,0 +1,215 @@
+"""
+Archive streaming for Project ME v0
+Stream a directory tree out as tar/tar.gz/zip, and unpack uploaded archives safely.
+
+Archives are produced on a background thread that writes into a bounded
+queue, so a request handler can stream an arbitrarily large subtree with
+constant memory. Extraction rejects members that would land outside the
+destination, as well as links and device files.
+"""
+import hashlib
+import os
+import queue
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+ARCHIVE_FORMATS = ("tar", "tar.gz", "zip")
+_QUEUE_CHUNKS = 16
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class ArchiveError(ValueError):
+    """Raised for unsupported formats or unsafe archive members."""
+
+
+class _QueueWriter:
+    """File-like sink that hands written bytes to a consumer thread via a bounded queue."""
+
+    def __init__(self):
+        self.queue: "queue.Queue" = queue.Queue(maxsize=_QUEUE_CHUNKS)
+        self.cancelled = threading.Event()
+        self._pending = bytearray()
+
+    def write(self, data) -> int:
+        self._pending += data
+        if len(self._pending) >= 64 * 1024:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._pending:
+            self._put(bytes(self._pending))
+            self._pending.clear()
+
+    def _put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise ArchiveError("Archive stream cancelled by the client")
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Signal the consumer that the archive is complete (or failed)."""
+        try:
+            if error is None:
+                self.flush()
+            else:
+                self._put(error)
+            self._put(StopIteration)
+        except ArchiveError:
+            pass  # Consumer is gone
+
+
+def _walk_files(root: Path, skip_names: Iterable[str]) -> Iterator[Path]:
+    skip = set(skip_names)
+    if root.is_file():
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in skip)
+        for name in sorted(filenames):
+            yield Path(dirpath) / name
+
+
+def _add_tar_file(tf: tarfile.TarFile, path: Path, arcname: str):
+    """Add a file as a regular member (hardlinked files are stored in full, not as links)."""
+    info = tf.gettarinfo(str(path), arcname=arcname)
+    if not info.isreg() and not info.islnk():
+        return
+    info.type = tarfile.REGTYPE
+    info.linkname = ""
+    info.size = path.stat().st_size
+    with open(path, "rb") as f:
+        tf.addfile(info, f)
+
+
+def iter_archive(root: Path, fmt: str = "tar", skip_names: Iterable[str] = ()) -> Iterator[bytes]:
+    """
+    Yield an archive of `root` (file or directory) in chunks.
+
+    Args:
+        root: File or directory to archive; member names are relative to it
+        fmt: "tar", "tar.gz" or "zip"
+        skip_names: Directory names to leave out (e.g. internal bookkeeping dirs)
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ArchiveError(f"Unsupported archive format: {fmt}")
+
+    root = Path(root)
+    base = root.parent if root.is_file() else root
+    writer = _QueueWriter()
+
+    def produce():
+        try:
+            if fmt == "zip":
+                with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                    for path in _walk_files(root, skip_names):
+                        zf.write(path, arcname=path.relative_to(base).as_posix())
+            else:
+                mode = "w|gz" if fmt == "tar.gz" else "w|"
+                with tarfile.open(fileobj=writer, mode=mode) as tf:
+                    for path in _walk_files(root, skip_names):
+                        _add_tar_file(tf, path, path.relative_to(base).as_posix())
+            writer.finish()
+        except BaseException as exc:
+            writer.finish(exc)
+
+    thread = threading.Thread(target=produce, name="archive-writer", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = writer.queue.get()
+            if item is StopIteration:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        writer.cancelled.set()
+
+
+def _safe_target(dest: Path, name: str) -> Path:
+    target = (dest / name).resolve()
+    if target == dest or dest not in target.parents:
+        raise ArchiveError(f"Unsafe archive member: {name}")
+    return target
+
+
+def _extract_stream(src, target: Path, blob_store, tmp_dir: Path):
+    """Copy one member to `target`, through the blob store when given."""
+    if blob_store is None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as out:
+            while True:
+                chunk = src.read(_COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                out.write(chunk)
+        return
+
+    # Staged next to the blobs, then renamed (or cloned) into place atomically
+    tmp = tmp_dir / f"extract-{os.getpid()}-{threading.get_ident()}"
+    digest = hashlib.sha256() if blob_store.reflinks else None  # Only deduplicated stores need it
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = src.read(_COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            if digest is not None:
+                digest.update(chunk)
+            out.write(chunk)
+    blob_store.place(tmp, target, digest.hexdigest() if digest is not None else None)
+
+
+def extract_archive(archive_path: Path, dest: Path, fmt: str = "tar", blob_store=None) -> List[str]:
+    """
+    Extract an archive file into `dest`.
+
+    Regular files and directories are extracted; links, devices and members
+    that would escape `dest` raise ArchiveError before anything is written
+    for that member.
+
+    Returns:
+        List of extracted file paths relative to `dest`
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ArchiveError(f"Unsupported archive format: {fmt}")
+
+    dest = Path(dest).resolve()
+    dest.mkdir(parents=True, exist_ok=True)
+    tmp_dir = None
+    if blob_store is not None:
+        tmp_dir = blob_store.tmp_dir
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    extracted = []
+    if fmt == "zip":
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                target = _safe_target(dest, info.filename)
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                with zf.open(info) as src:
+                    _extract_stream(src, target, blob_store, tmp_dir)
+                extracted.append(target.relative_to(dest).as_posix())
+    else:
+        with tarfile.open(archive_path, mode="r:*") as tf:
+            for member in tf:
+                target = _safe_target(dest, member.name)
+                if member.isdir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                if not member.isfile():
+                    raise ArchiveError(f"Unsupported archive member type: {member.name}")
+                src = tf.extractfile(member)
+                _extract_stream(src, target, blob_store, tmp_dir)
+                extracted.append(target.relative_to(dest).as_posix())
+    return extracted
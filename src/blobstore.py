@@ -0,0 +1,476 @@
+"""
+Content-addressed blob storage for Project ME v0
+Deduplicated sandbox files (SHA-256 blobs + reflinks) and rsync-style delta sync.
+
+Deduplication only happens where the sandbox filesystem supports
+copy-on-write clones (btrfs, XFS, ...): there every file written through
+the store is kept once under `<base>/.blobs/<aa>/<sha256>` and cloned onto
+its visible path, so rewriting identical content costs a hash and a clone
+instead of a write. Clones share storage but not inodes: editing one file
+in place never changes another. On other filesystems (ext4, NTFS, any
+Windows host) the store keeps no blobs and hashes nothing it is not
+asked to; files are just written. Either way, files are replaced
+atomically (temp name, then rename).
+
+Delta sync works like zsync: the client splits the new version of a file
+into fixed-size blocks and sends their hashes; the server slides a rolling
+checksum over its current version to find which blocks it already has,
+and the client uploads only the missing ones.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks
+    fcntl = None
+
+from .uploads import fsync_dir, resolve_within, sha256_file
+
+DEFAULT_BLOCK_SIZE = 8 * 1024
+_MOD = 1 << 16
+_SYNC_PLAN_TTL_SECONDS = 600
+_FICLONE = 0x40049409  # linux/fs.h
+
+
+class SyncError(ValueError):
+    """Raised for invalid or stale delta-sync requests."""
+
+
+# ---------- block hashing (shared with clients) ----------
+
+def weak_checksum(block: bytes) -> int:
+    """rsync-style rolling checksum of a block: a | (b << 16)."""
+    length = len(block)
+    a = sum(block) % _MOD
+    b = sum((length - i) * x for i, x in enumerate(block)) % _MOD
+    return a | (b << 16)
+
+
+def strong_checksum(block: bytes) -> str:
+    """Strong block hash (first 128 bits of SHA-256, hex)."""
+    return hashlib.sha256(block).hexdigest()[:32]
+
+
+def compute_block_hashes(data: bytes, block_size: int = DEFAULT_BLOCK_SIZE) -> List[Dict[str, Any]]:
+    """Split data into blocks and hash them, as a sync client would."""
+    return [
+        {"weak": weak_checksum(data[i:i + block_size]),
+         "strong": strong_checksum(data[i:i + block_size])}
+        for i in range(0, len(data), block_size)
+    ]
+
+
+def find_matching_blocks(old: bytes, block_size: int, blocks: List[Dict[str, Any]],
+                         last_len: Optional[int] = None) -> Dict[int, int]:
+    """
+    Locate the client's blocks anywhere in `old` using a rolling checksum.
+
+    Args:
+        old: Current content on the server
+        block_size: Client block size
+        blocks: Client block hashes ({"weak", "strong"}) in file order
+        last_len: Length of the final block (defaults to block_size)
+
+    Returns:
+        Mapping of client block index -> byte offset in `old`
+    """
+    if not blocks or block_size <= 0:
+        return {}
+
+    found: Dict[int, int] = {}
+    by_weak: Dict[int, List[int]] = {}
+    last = len(blocks) - 1
+    last_len = block_size if last_len is None else last_len
+    rolling = blocks if last_len == block_size else blocks[:last]
+    for idx, block in enumerate(rolling):
+        by_weak.setdefault(block["weak"], []).append(idx)
+
+    # A short final block can only be reused from the very end of old
+    if last_len != block_size and 0 < last_len <= len(old):
+        candidate = old[len(old) - last_len:]
+        tail = blocks[last]
+        if weak_checksum(candidate) == tail["weak"] and strong_checksum(candidate) == tail["strong"]:
+            found[last] = len(old) - last_len
+
+    n = len(old)
+    pos = 0
+    a = b = None
+    while pos + block_size <= n and len(found) < len(blocks):
+        if a is None:
+            window = old[pos:pos + block_size]
+            a = sum(window) % _MOD
+            b = sum((block_size - i) * x for i, x in enumerate(window)) % _MOD
+
+        candidates = by_weak.get(a | (b << 16))
+        if candidates:
+            strong = strong_checksum(old[pos:pos + block_size])
+            hits = [idx for idx in candidates if idx not in found and blocks[idx]["strong"] == strong]
+            if hits:
+                for idx in hits:
+                    found[idx] = pos
+                pos += block_size
+                a = None
+                continue
+
+        if pos + block_size >= n:
+            break
+        out_byte = old[pos]
+        in_byte = old[pos + block_size]
+        a = (a - out_byte + in_byte) % _MOD
+        b = (b - block_size * out_byte + a) % _MOD
+        pos += 1
+
+    return found
+
+
+# ---------- blob store ----------
+
+def reflink(src: Path, dst: Path) -> bool:
+    """
+    Create `dst` as a copy-on-write clone of `src` (Linux FICLONE: btrfs, XFS, ...).
+
+    Returns:
+        False (and leaves no `dst`) where the platform or filesystem cannot clone
+    """
+    if fcntl is None:
+        return False
+    with open(src, "rb") as fsrc:
+        try:
+            with open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return True
+        except OSError:
+            Path(dst).unlink(missing_ok=True)
+            return False
+
+
+class BlobStore:
+    """
+    SHA-256 addressed blobs under `<base_dir>/.blobs`, cloned into place.
+
+    Visible files never share an inode with a blob or with each other: an
+    in-place write to one must not change any other path. Where the
+    filesystem supports reflinks, each file is a copy-on-write clone of its
+    blob, so identical content is stored once. Elsewhere no blob is kept and
+    a finished file is simply renamed into place.
+
+    Every clone is appended to `.blobs/refs.jsonl` (path, digest, size,
+    mtime); gc() keeps the blobs of paths that still match their entry.
+    Use one instance per base directory: it probes reflink support once and
+    its lock keeps placements and gc() from interleaving.
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.blobs_dir = self.base_dir / ".blobs"
+        self.tmp_dir = self.blobs_dir / "tmp"
+        self.refs_file = self.blobs_dir / "refs.jsonl"
+        self._reflinks: Optional[bool] = None
+        self._lock = threading.RLock()  # Blob placement/refs.jsonl vs. gc()
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    def _new_tmp(self) -> Path:
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / uuid.uuid4().hex
+
+    @property
+    def reflinks(self) -> bool:
+        """Whether the sandbox filesystem can clone files (probed once)."""
+        if self._reflinks is None:
+            probe = self._new_tmp()
+            probe.write_bytes(b"probe")
+            clone = self._new_tmp()
+            try:
+                self._reflinks = reflink(probe, clone)
+            finally:
+                probe.unlink(missing_ok=True)
+                clone.unlink(missing_ok=True)
+        return self._reflinks
+
+    def _has_blob(self, digest: str, size: int) -> bool:
+        """True if a blob of the right size exists (contents are checked by verify())."""
+        try:
+            return self.blob_path(digest).stat().st_size == size
+        except OSError:
+            return False
+
+    def verify(self, digest: str) -> bool:
+        """Re-hash a blob; a blob that no longer matches its name is deleted."""
+        path = self.blob_path(digest)
+        if not path.exists():
+            return False
+        if sha256_file(path) == digest:
+            return True
+        path.unlink(missing_ok=True)
+        return False
+
+    def place(self, path: Path, target: Path, digest: Optional[str] = None) -> Optional[str]:
+        """
+        Move a finished private file onto `target` atomically, deduplicating it where possible.
+
+        Args:
+            path: File to consume (not linked anywhere else)
+            target: Visible destination
+            digest: SHA-256 of the file, if already known
+
+        Returns:
+            The file's digest (None without reflinks if it was not passed in)
+        """
+        path, target = Path(path), Path(target)
+        if not self.reflinks:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+            fsync_dir(target.parent)
+            return digest
+        digest = digest or sha256_file(path)
+        with self._lock:
+            if self._has_blob(digest, path.stat().st_size):
+                path.unlink()
+            else:
+                blob = self.blob_path(digest)
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, blob)
+            return self._clone_to(digest, target)
+
+    def write(self, target: Path, data: bytes) -> Optional[str]:
+        """Store data at `target` (atomically replacing it); returns the digest (None without reflinks)."""
+        digest = None
+        if self.reflinks:
+            digest = hashlib.sha256(data).hexdigest()
+            with self._lock:
+                if self._has_blob(digest, len(data)):
+                    return self._clone_to(digest, Path(target))  # Known content: nothing to write
+        tmp = self._new_tmp()
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return self.place(tmp, target, digest)
+
+    def _clone_to(self, digest: str, target: Path) -> str:
+        """Replace `target` with a clone of a blob and record the reference. Caller holds the lock."""
+        blob = self.blob_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.parent / f".{target.name}.{uuid.uuid4().hex[:8]}.tmp"
+        if not reflink(blob, tmp):
+            shutil.copyfile(blob, tmp)  # The filesystem stopped cloning (e.g. across a mount)
+        os.replace(tmp, target)
+        fsync_dir(target.parent)
+        self._add_ref(target, digest)
+        return digest
+
+    def _add_ref(self, target: Path, digest: str):
+        st = target.stat()
+        line = json.dumps({"path": target.relative_to(self.base_dir).as_posix(), "sha256": digest,
+                           "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+        with self._lock, open(self.refs_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _live_refs(self) -> Dict[str, Dict[str, Any]]:
+        """Latest ref per path, for paths not modified since they were placed."""
+        refs: Dict[str, Dict[str, Any]] = {}
+        if self.refs_file.exists():
+            with open(self.refs_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ref = json.loads(line)
+                        refs[ref["path"]] = ref
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        live = {}
+        for rel, ref in refs.items():
+            try:
+                st = (self.base_dir / rel).stat()
+            except OSError:
+                continue
+            if st.st_size == ref["size"] and st.st_mtime_ns == ref["mtime_ns"]:
+                live[rel] = ref
+        return live
+
+    def _iter_blobs(self) -> Iterator[Path]:
+        if not self.blobs_dir.exists():
+            return
+        for shard in self.blobs_dir.iterdir():
+            if shard != self.tmp_dir and shard.is_dir():
+                yield from shard.iterdir()
+
+    def unshare(self) -> int:
+        """
+        Give sandbox files that still hardlink a blob (older stores did that) their own copy.
+
+        Returns:
+            Number of files copied
+        """
+        blob_inodes = set()
+        for blob in self._iter_blobs():
+            st = blob.stat()
+            if st.st_nlink > 1:
+                blob_inodes.add((st.st_dev, st.st_ino))
+        if not blob_inodes:
+            return 0
+        copied = 0
+        for root, dirs, files in os.walk(self.base_dir):
+            if Path(root) == self.base_dir:
+                dirs[:] = [d for d in dirs if d != self.blobs_dir.name]
+            for name in files:
+                path = Path(root) / name
+                st = path.lstat()
+                if (st.st_dev, st.st_ino) in blob_inodes:
+                    tmp = path.parent / f".{name}.{uuid.uuid4().hex[:8]}.tmp"
+                    shutil.copy2(path, tmp)
+                    os.replace(tmp, path)
+                    copied += 1
+        return copied
+
+    def gc(self) -> int:
+        """Delete blobs no sandbox path still refers to (and corrupted ones); returns the count."""
+        self.unshare()
+        removed = 0
+        with self._lock:  # A blob must not go between a placement finding it and recording its ref
+            live = self._live_refs()
+            if self.blobs_dir.exists():
+                tmp = self.refs_file.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(ref) + "\n" for ref in live.values())
+                os.replace(tmp, self.refs_file)
+            wanted = {ref["sha256"] for ref in live.values()}
+            for blob in list(self._iter_blobs()):
+                if blob.name not in wanted or not self.verify(blob.name):
+                    blob.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        blobs = 0
+        total = 0
+        for blob in self._iter_blobs():
+            blobs += 1
+            total += blob.stat().st_size
+        return {"blobs": blobs, "bytes": total, "reflinks": self.reflinks}
+
+
+# ---------- delta sync ----------
+
+class DeltaSync:
+    """
+    Two-step block sync into a BlobStore.
+
+    1. plan(): client sends the new file's block hashes; the server answers
+       with the indexes of blocks it does not already have.
+    2. apply(): client uploads just those blocks (concatenated in index
+       order); the server assembles, verifies SHA-256 and links the result.
+    """
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self._plans: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.monotonic()
+        for sync_id in [k for k, v in self._plans.items() if v["expires"] < now]:
+            del self._plans[sync_id]
+
+    def plan(self, path: str, size: int, sha256: str, block_size: int,
+             blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Work out which blocks of the new file the server is missing.
+
+        Returns:
+            Dict with keys: sync_id, missing (list of block indexes), reused_bytes
+        """
+        if block_size <= 0:
+            raise SyncError("block_size must be positive")
+        if len(blocks) != (size + block_size - 1) // block_size:
+            raise SyncError("Block count does not match file size")
+
+        target = resolve_within(self.store.base_dir, path)
+        old_stat = None
+        found: Dict[int, int] = {}
+        if target.is_file():
+            old_stat = target.stat()
+            last_len = size - (len(blocks) - 1) * block_size if blocks else 0
+            found = find_matching_blocks(target.read_bytes(), block_size, blocks, last_len)
+
+        missing = [i for i in range(len(blocks)) if i not in found]
+        sync_id = uuid.uuid4().hex
+
+        with self._lock:
+            self._expire()
+            self._plans[sync_id] = {
+                "path": path,
+                "size": size,
+                "sha256": sha256.lower(),
+                "block_size": block_size,
+                "found": found,
+                "missing": missing,
+                "old_mtime_ns": old_stat.st_mtime_ns if old_stat else None,
+                "expires": time.monotonic() + _SYNC_PLAN_TTL_SECONDS,
+            }
+
+        reused = sum(min(block_size, size - i * block_size) for i in found)
+        return {"sync_id": sync_id, "missing": missing, "reused_bytes": reused}
+
+    def apply(self, sync_id: str, payload: bytes) -> Dict[str, Any]:
+        """
+        Assemble the new file from reused blocks plus `payload` (missing blocks in order).
+
+        Returns:
+            Dict with keys: path, size, sha256, uploaded_bytes, reused_bytes
+        """
+        with self._lock:
+            plan = self._plans.pop(sync_id, None)
+        if plan is None:
+            raise SyncError(f"Unknown or expired sync: {sync_id}")
+
+        target = resolve_within(self.store.base_dir, plan["path"])
+        size, block_size = plan["size"], plan["block_size"]
+        old = b""
+        if plan["found"]:
+            if not target.is_file() or target.stat().st_mtime_ns != plan["old_mtime_ns"]:
+                raise SyncError("File changed since the sync was planned; plan again")
+            old = target.read_bytes()
+
+        expected_payload = sum(min(block_size, size - i * block_size) for i in plan["missing"])
+        if len(payload) != expected_payload:
+            raise SyncError(f"Expected {expected_payload} bytes of block data, got {len(payload)}")
+
+        tmp = self.store._new_tmp()
+        digest = hashlib.sha256()
+        cursor = 0
+        with open(tmp, "wb") as f:
+            for idx in range(len(plan["found"]) + len(plan["missing"])):
+                length = min(block_size, size - idx * block_size)
+                if idx in plan["found"]:
+                    offset = plan["found"][idx]
+                    block = old[offset:offset + length]
+                else:
+                    block = payload[cursor:cursor + length]
+                    cursor += length
+                digest.update(block)
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if digest.hexdigest() != plan["sha256"]:
+            tmp.unlink(missing_ok=True)
+            raise SyncError(f"Checksum mismatch: expected {plan['sha256']}, got {digest.hexdigest()}")
+
+        self.store.place(tmp, target, plan["sha256"])
+        return {
+            "path": plan["path"],
+            "size": size,
+            "sha256": plan["sha256"],
+            "uploaded_bytes": len(payload),
+            "reused_bytes": size - len(payload),
+        }
@@ -0,0 +1,262 @@
+"""
+Directory browsing engine for Project ME v0
+os.scandir-based listings with pagination, depth/entry limits and a short-TTL cache.
+
+Used by the runner's /browse endpoint. Listings reuse the type information
+cached on each DirEntry, so a directory costs one scandir call plus one stat
+per file (for its size) instead of several syscalls per entry.
+"""
+import fnmatch
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from . import config
+
+
+class DirItem(NamedTuple):
+    """One directory entry as stored in the listing cache."""
+    name: str
+    is_dir: bool
+    is_link: bool
+    size: Optional[int]
+
+
+def scan_directory(path: str) -> List[DirItem]:
+    """List a single directory with os.scandir (uncached).
+
+    Broken symlinks are listed as links with no size; entries that vanish
+    mid-scan are skipped. Results are sorted with directories first, then by name.
+    """
+    items = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                is_link = entry.is_symlink()
+                size = None if is_dir else entry.stat().st_size
+            except OSError:
+                try:
+                    entry.stat(follow_symlinks=False)  # Broken symlink, or gone?
+                except OSError:
+                    continue
+                is_dir, is_link, size = False, True, None
+            items.append(DirItem(entry.name, is_dir, is_link, size))
+
+    items.sort(key=lambda item: (not item.is_dir, item.name.lower()))
+    return items
+
+
+class ListingCache:
+    """
+    Short-lived cache of directory listings.
+
+    An entry is reused only while it is younger than `ttl` seconds and the
+    directory's mtime has not changed, so creates/deletes/renames show up
+    immediately and in-place size changes show up within `ttl`.
+    """
+
+    def __init__(self, ttl: float = config.BROWSE_CACHE_TTL_SECONDS,
+                 max_dirs: int = config.BROWSE_CACHE_MAX_DIRS):
+        self.ttl = ttl
+        self.max_dirs = max_dirs
+        self._entries: "OrderedDict[str, Tuple[int, float, List[DirItem]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> List[DirItem]:
+        """Return the listing for `path`, scanning it if the cached copy is stale."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached and cached[0] == mtime_ns and now - cached[1] < self.ttl:
+                self._entries.move_to_end(path)
+                return cached[2]
+
+        items = scan_directory(path)
+
+        with self._lock:
+            self._entries[path] = (mtime_ns, now, items)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_dirs:
+                self._entries.popitem(last=False)
+        return items
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+listing_cache = ListingCache()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.BROWSE_WORKERS,
+                                           thread_name_prefix="browse")
+        return _executor
+
+
+def _entry_dict(item: DirItem, parent: str, root: Optional[str] = None) -> Dict[str, Any]:
+    full_path = os.path.join(parent, item.name)
+    entry = {
+        "name": item.name,
+        "type": "dir" if item.is_dir else "symlink" if item.is_link and item.size is None else "file",
+        "path": full_path
+    }
+    if item.size is not None:
+        entry["size"] = item.size
+    if root is not None:
+        entry["relative"] = os.path.relpath(full_path, root)
+    return entry
+
+
+def _safe_listing(path: str) -> List[DirItem]:
+    try:
+        return listing_cache.get(path)
+    except OSError:
+        return []  # Unreadable subdirectory
+
+
+def walk_directory(
+    root: str,
+    pattern: Optional[str] = None,
+    max_depth: int = config.BROWSE_MAX_DEPTH,
+    max_entries: int = config.BROWSE_MAX_ENTRIES,
+    time_limit: float = config.BROWSE_TIME_LIMIT_SECONDS
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Walk a tree breadth-first, scanning each level's directories in parallel.
+
+    Symlinked directories are listed but not descended into. Output order is
+    deterministic (level by level, sorted within each directory), which keeps
+    cursor-based pages stable between calls.
+
+    Args:
+        root: Directory to walk
+        pattern: Optional glob matched against entry names (files and dirs)
+        max_depth: Maximum directory depth below root to descend (1 = root only)
+        max_entries: Stop after collecting this many entries
+        time_limit: Stop after this many seconds
+
+    Returns:
+        (entries, truncated) where truncated is True if a limit was hit
+    """
+    deadline = time.monotonic() + time_limit
+    entries: List[Dict[str, Any]] = []
+    level = [root]
+    depth = 0
+    executor = _get_executor()
+
+    # The root listing is fetched directly so permission errors reach the caller
+    listings = [listing_cache.get(root)]
+
+    while level:
+        depth += 1
+        next_level = []
+
+        for parent, items in zip(level, listings):
+            for item in items:
+                if pattern is None or fnmatch.fnmatch(item.name, pattern):
+                    entries.append(_entry_dict(item, parent, root))
+                    if len(entries) >= max_entries:
+                        return entries, True
+                if item.is_dir and not item.is_link:
+                    next_level.append(os.path.join(parent, item.name))
+
+        if not next_level:
+            break
+        if depth >= max_depth or time.monotonic() > deadline:
+            return entries, True
+
+        level = next_level
+        listings = list(executor.map(_safe_listing, level))
+
+    return entries, False
+
+
+class _WalkCache:
+    """Keeps recent recursive walk results so later pages don't re-walk the tree."""
+
+    def __init__(self, ttl: float = config.BROWSE_CACHE_TTL_SECONDS * 15, max_walks: int = 16):
+        self.ttl = ttl
+        self.max_walks = max_walks
+        self._walks: "OrderedDict[tuple, Tuple[float, List[Dict[str, Any]], bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        with self._lock:
+            cached = self._walks.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1], cached[2]
+            return None
+
+    def put(self, key: tuple, entries: List[Dict[str, Any]], truncated: bool):
+        with self._lock:
+            self._walks[key] = (time.monotonic(), entries, truncated)
+            while len(self._walks) > self.max_walks:
+                self._walks.popitem(last=False)
+
+
+_walk_cache = _WalkCache()
+
+
+def _parse_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return max(0, int(cursor))
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def browse(
+    path: str,
+    recursive: bool = False,
+    pattern: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    max_depth: int = config.BROWSE_MAX_DEPTH,
+    max_entries: int = config.BROWSE_MAX_ENTRIES
+) -> Dict[str, Any]:
+    """
+    Return one page of a directory listing (all of it when `limit` is None).
+
+    Non-recursive listings filter files (not directories) by `pattern`.
+    Recursive walks need a pattern, which they match against every entry
+    name like rglob; without one, `recursive` lists the directory itself.
+
+    Returns:
+        Dict with keys: entries (list), next_cursor (str or None), truncated (bool)
+    """
+    offset = _parse_cursor(cursor)
+
+    if recursive and pattern:
+        key = (path, pattern, max_depth, max_entries)
+        walked = _walk_cache.get(key) if offset else None
+        if walked is None:
+            walked = walk_directory(path, pattern, max_depth=max_depth, max_entries=max_entries)
+            _walk_cache.put(key, *walked)
+        all_entries, truncated = walked
+    else:
+        truncated = False
+        all_entries = [
+            _entry_dict(item, path)
+            for item in listing_cache.get(path)
+            if item.is_dir or not pattern or fnmatch.fnmatch(item.name, pattern)
+        ]
+
+    page = all_entries[offset:] if limit is None else all_entries[offset:offset + max(1, limit)]
+    end = offset + len(page)
+    next_cursor = str(end) if end < len(all_entries) else None
+
+    return {"entries": page, "next_cursor": next_cursor, "truncated": truncated}
@@ -0,0 +1,239 @@
+"""
+Code search for Project ME v0
+Local BM25 index over source files, used to pick what goes into an analysis prompt.
+
+Files are split into fixed-size line chunks and tokenized into identifiers
+(with camelCase/snake_case parts split out), so words from names, comments
+and docstrings all count. A question is ranked against the chunks, and only
+the best chunks are packed into the model's context budget.
+
+Indexes are cached per directory; re-indexing only re-reads files whose
+size or mtime changed.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config, file_io
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "is", "it", "for", "on", "this", "that",
+    "with", "as", "be", "are", "by", "at", "from", "what", "how", "does", "do", "where", "which",
+    "self", "return", "import", "def", "class", "if", "else", "none", "true", "false",
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms (identifiers plus their word parts)."""
+    terms = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        parts = [p.lower() for p in _CAMEL_RE.findall(word.replace("_", " "))]
+        if len(parts) > 1 or (parts and parts[0] != lower):
+            if len(lower) > 1 and lower not in _STOPWORDS:
+                terms.append(lower)
+            terms.extend(p for p in parts if len(p) > 1 and p not in _STOPWORDS)
+        elif len(lower) > 1 and lower not in _STOPWORDS:
+            terms.append(lower)
+    return terms
+
+
+def _chunk_lines(text: str, chunk_lines: int) -> List[Tuple[int, int, str]]:
+    """Split text into (start_line, end_line, text) chunks of about chunk_lines lines."""
+    lines = text.splitlines(keepends=True)
+    chunks = []
+    for start in range(0, len(lines), chunk_lines):
+        end = min(start + chunk_lines, len(lines))
+        chunks.append((start + 1, end, "".join(lines[start:end])))
+    return chunks
+
+
+class _FileEntry:
+    __slots__ = ("rel", "stamp", "chunks", "term_counts", "lengths")
+
+    def __init__(self, rel: str, stamp: Tuple[int, int], text: str, chunk_lines: int):
+        self.rel = rel
+        self.stamp = stamp
+        self.chunks = _chunk_lines(text, chunk_lines)
+        path_terms = tokenize(rel)
+        self.term_counts: List[Counter] = []
+        self.lengths: List[int] = []
+        for _, _, chunk in self.chunks:
+            terms = tokenize(chunk) + path_terms
+            self.term_counts.append(Counter(terms))
+            self.lengths.append(len(terms))
+
+
+class CodeIndex:
+    """BM25 index of the text files under one directory."""
+
+    def __init__(self, root: str, chunk_lines: int = config.CODE_SEARCH_CHUNK_LINES):
+        self.root = os.path.abspath(root)
+        self.chunk_lines = chunk_lines
+        self._files: Dict[str, _FileEntry] = {}
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}  # term -> [(chunk id, tf)]
+        self._chunk_refs: List[Tuple[_FileEntry, int]] = []
+        self._avg_len = 0.0
+        self._lock = threading.Lock()
+
+    def _candidate_files(self) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in config.CODE_SEARCH_SKIP_DIRS and not d.startswith(".")]
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() not in config.CODE_SEARCH_EXTENSIONS:
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                if st.st_size <= config.CODE_SEARCH_MAX_FILE_BYTES:
+                    found[os.path.relpath(full, self.root)] = (st.st_size, st.st_mtime_ns)
+                if len(found) >= config.CODE_SEARCH_MAX_FILES:
+                    return found
+        return found
+
+    def refresh(self) -> int:
+        """
+        Bring the index up to date with the directory.
+
+        Returns:
+            Number of files (re)indexed
+        """
+        with self._lock:
+            current = self._candidate_files()
+            stale = [rel for rel, stamp in current.items()
+                     if rel not in self._files or self._files[rel].stamp != stamp]
+            removed = [rel for rel in self._files if rel not in current]
+            if not stale and not removed:
+                return 0
+
+            for rel in removed:
+                del self._files[rel]
+            loaded = file_io.load_text_files([os.path.join(self.root, rel) for rel in stale])
+            for rel, item in zip(stale, loaded):
+                if item["file"] is None:
+                    self._files.pop(rel, None)
+                    continue
+                self._files[rel] = _FileEntry(rel, current[rel], item["file"].text, self.chunk_lines)
+
+            self._rebuild()
+            return len(stale)
+
+    def _rebuild(self):
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        refs: List[Tuple[_FileEntry, int]] = []
+        total = 0
+        for rel in sorted(self._files):
+            entry = self._files[rel]
+            for i, counts in enumerate(entry.term_counts):
+                chunk_id = len(refs)
+                refs.append((entry, i))
+                total += entry.lengths[i]
+                for term, tf in counts.items():
+                    postings.setdefault(term, []).append((chunk_id, tf))
+        self._postings = postings
+        self._chunk_refs = refs
+        self._avg_len = total / len(refs) if refs else 0.0
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Rank chunks against a natural-language query.
+
+        Returns:
+            Chunk dicts (path, start_line, end_line, text, score), best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._chunk_refs)
+            if not n or not terms:
+                return []
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings:
+                    entry, i = self._chunk_refs[chunk_id]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * entry.lengths[i] / self._avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            best = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+            results = []
+            for chunk_id, score in best:
+                entry, i = self._chunk_refs[chunk_id]
+                start, end, text = entry.chunks[i]
+                results.append({"path": entry.rel, "start_line": start, "end_line": end,
+                                "text": text, "score": round(score, 3)})
+            return results
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+_indexes: Dict[str, CodeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root: str) -> CodeIndex:
+    """Return the (refreshed) cached index for a directory."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = CodeIndex(root)
+    index.refresh()
+    return index
+
+
+def select_context(root: str, query: str, budget_chars: int = config.CODE_SEARCH_CONTEXT_CHARS,
+                   max_chunks: int = 40) -> List[Dict[str, Any]]:
+    """
+    Pick the chunks of a directory most relevant to `query`, within a character budget.
+
+    Chunks are ranked by BM25, taken best-first until the budget is spent,
+    then merged per file (adjacent chunks joined) and returned in file/line
+    order so the prompt reads naturally.
+
+    Returns:
+        List of dicts with keys: path, start_line, end_line, text, score
+    """
+    index = get_index(root)
+    chosen = []
+    used = 0
+    for hit in index.search(query, limit=max_chunks):
+        if used + len(hit["text"]) > budget_chars:
+            continue
+        chosen.append(hit)
+        used += len(hit["text"])
+
+    chosen.sort(key=lambda hit: (hit["path"], hit["start_line"]))
+    merged: List[Dict[str, Any]] = []
+    for hit in chosen:
+        last = merged[-1] if merged else None
+        if last and last["path"] == hit["path"] and last["end_line"] + 1 == hit["start_line"]:
+            last["end_line"] = hit["end_line"]
+            last["text"] += hit["text"]
+            last["score"] = max(last["score"], hit["score"])
+        else:
+            merged.append(dict(hit))
+    return merged
+
+
+def format_context(sections: List[Dict[str, Any]]) -> str:
+    """Render selected chunks as prompt text."""
+    parts = []
+    for section in sections:
+        parts.append(f"=== File: {section['path']} (lines {section['start_line']}-{section['end_line']}) ===\n"
+                     f"```\n{section['text']}\n```\n")
+    return "\n".join(parts)
@@ -0,0 +1,210 @@
+"""
+Record codec for Project ME v0
+Fast JSONL encoding/decoding for task and event records.
+
+The JSON backend is picked once at import: orjson if installed, then
+msgspec, then the standard library. All three read each other's output.
+Every encoder produces one UTF-8 line per record; values the fast backends
+refuse (e.g. integers past 64 bits) fall back to the json module for that
+record only.
+
+Records are written with their scalar fields first and their large JSON
+blobs (task payload/result/trace, event data) last. split_line() exploits
+that: it decodes only the scalar "header" of a line and keeps the blobs as
+raw bytes in a LazyBlobs object, decoded on first access. A JSON string can
+never contain an unescaped `"key":` sequence, so the first occurrence of
+the first blob key marks where the blobs begin. Lines in another layout
+(older files), and lines short enough that one full decode is cheaper than
+splitting, are decoded in full instead.
+
+Filtered scans can also skip lines without decoding them at all: needle()
+gives the exact bytes a plain string value must appear as, so a line that
+does not contain them cannot match.
+
+pack_timestamp()/unpack_timestamp() let bulk record classes hold ISO
+timestamps as integers (microseconds since the epoch) instead of strings.
+"""
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # Optional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # Optional
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=str)
+    _msgspec_decoder = msgspec.json.Decoder()
+else:
+    BACKEND = "json"
+
+# Lines shorter than this are decoded in one call: splitting costs a few
+# microseconds of Python, which only pays off when the blobs are large
+# relative to the backend's parsing speed.
+LAZY_MIN_BYTES = 512 if BACKEND == "json" else 4096
+
+# What loads() raises for malformed input, whichever backend is active
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=str, ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes (non-JSON values are stringified)."""
+    try:
+        if BACKEND == "orjson":
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+        if BACKEND == "msgspec":
+            return _msgspec_encoder.encode(obj)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return _json_dumps(obj)
+
+
+def loads(data) -> Any:
+    """Parse JSON from bytes or str."""
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        return _msgspec_decoder.decode(data)
+    return json.loads(data)
+
+
+def encode_line(record: Dict[str, Any]) -> bytes:
+    """One JSONL line (record + newline)."""
+    return dumps(record) + b"\n"
+
+
+# b'"name":' per blob field name, for split_line()
+_KEY_MARKERS: Dict[str, bytes] = {}
+
+
+class LazyBlobs:
+    """
+    The blob fields of one record, kept as raw JSON until first read.
+
+    Args:
+        raw: JSON object text holding only the blob fields (None if `values` is given)
+        values: Already decoded blob fields
+    """
+
+    __slots__ = ("_raw", "_values")
+
+    def __init__(self, raw: Optional[bytes] = None, values: Optional[Dict[str, Any]] = None):
+        self._raw = raw
+        self._values = values
+
+    @property
+    def decoded(self) -> bool:
+        return self._values is not None
+
+    def values(self) -> Dict[str, Any]:
+        """All blob fields, decoding them on first call."""
+        if self._values is None:
+            self._values = loads(self._raw) if self._raw else {}
+            self._raw = None
+        return self._values
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values().get(name, default)
+
+    def raw(self) -> bytes:
+        """The blob fields as JSON object bytes (re-encoded if they were already decoded)."""
+        if self._raw is not None:
+            return self._raw
+        return dumps(self._values) if self._values else b""
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the raw JSON still waiting to be decoded (0 once decoded)."""
+        return len(self._raw) if self._raw is not None else 0
+
+
+def split_line(line: bytes, blob_fields: Sequence[str], required: Sequence[str] = (),
+               min_bytes: int = LAZY_MIN_BYTES) -> Tuple[Dict[str, Any], LazyBlobs]:
+    """
+    Decode a record's scalar fields and defer its blob fields.
+
+    Args:
+        line: One JSONL line
+        blob_fields: Field names kept raw; the first one must be the first blob written
+        required: Scalar fields the header must contain for the split to be trusted
+        min_bytes: Shorter lines are decoded in full (0 always splits)
+
+    Returns:
+        (header dict without the blob fields, LazyBlobs)
+
+    Raises:
+        One of DECODE_ERRORS if the line is not valid JSON
+    """
+    if len(line) >= min_bytes:
+        marker = _KEY_MARKERS.get(blob_fields[0]) or _KEY_MARKERS.setdefault(
+            blob_fields[0], b'"' + blob_fields[0].encode() + b'":')
+        start = line.find(marker)
+        body = line.rstrip()
+        if start > 0 and body[-1:] == b"}":
+            cut = line.rfind(b",", 0, start)
+            if cut > 0:
+                header = loads(line[:cut] + b"}")
+                for name in required:
+                    if name not in header:
+                        break
+                else:
+                    return header, LazyBlobs(raw=b"{" + body[start:])
+    # Short line or different layout: decode everything and separate afterwards
+    data = loads(line)
+    blobs = {name: data.pop(name) for name in blob_fields if name in data}
+    return data, LazyBlobs(values=blobs)
+
+
+def needle(value: Optional[str]) -> Optional[bytes]:
+    """
+    The bytes a string value appears as in every backend's output, for pre-filtering raw lines.
+
+    Returns None when there is no single encoding (non-ASCII or characters that
+    need escaping), or for an empty value; the caller then has to decode.
+    """
+    if not value or not value.isascii() or not value.isprintable() or '"' in value or "\\" in value:
+        return None
+    return b'"' + value.encode("ascii") + b'"'
+
+
+# The two shapes datetime.isoformat() gives for naive values
+_ISO_NAIVE = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{6})?\Z")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def pack_timestamp(value: Any) -> Any:
+    """
+    A naive ISO timestamp as int microseconds since the epoch, when that converts back exactly.
+
+    Anything else (None, other formats, time zones) is returned unchanged.
+    """
+    if type(value) is str and _ISO_NAIVE.match(value):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if moment.microsecond or len(value) == 19:  # ".000000" would not come back
+            return (moment - _EPOCH) // _MICROSECOND
+    return value
+
+
+def unpack_timestamp(value: Union[int, Any]) -> Any:
+    """Inverse of pack_timestamp(): the original ISO string."""
+    if type(value) is int:
+        return (_EPOCH + timedelta(microseconds=value)).isoformat()
+    return value
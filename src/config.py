@@ -5,8 +5,8 @@ All settings for the local orchestration system.
 import os
 from pathlib import Path
 
-# LM Studio endpoint
-LM_STUDIO_BASE_URL = "http://localhost:1234/v1"
+# LM Studio endpoint (override to point at a stub server, see benchmarks/stub_llm.py)
+LM_STUDIO_BASE_URL = os.getenv("LM_STUDIO_BASE_URL", "http://localhost:1234/v1")
 LM_STUDIO_MODEL = "gpt-oss:20b"
 
 # LLM parameters
@@ -14,6 +14,8 @@ DEFAULT_TEMPERATURE = 0.7
 DEFAULT_MAX_TOKENS = 2000
 PLAN_TEMPERATURE = 0.3  # Lower temperature for structured planning
 PLAN_MAX_TOKENS = 1500
+# Stream chat() completions: needed to measure time-to-first-token (see src/metrics.py)
+LLM_STREAM = os.getenv("LLM_STREAM", "false").lower() in ("true", "1", "yes")
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent  # Root of the project (parent of src)
@@ -28,3 +30,79 @@ LOGS_DIR.mkdir(exist_ok=True)
 SHELL_TIMEOUT_SECONDS = 300  # 5 minutes max for shell commands
 MAX_TOOL_OUTPUT_LENGTH = 10000  # Truncate very long outputs in logs
 
+# Python script pool settings (run_python_script)
+PYTHON_POOL_SIZE = int(os.getenv("PYTHON_POOL_SIZE", "2"))  # 0 disables the pool
+PYTHON_POOL_MAX_RUNS_PER_WORKER = 50  # Recycle a worker after this many scripts
+PYTHON_POOL_ACQUIRE_TIMEOUT_SECONDS = 30  # Wait this long for a free worker, then run in a subprocess
+PYTHON_SCRIPT_TIMEOUT_SECONDS = SHELL_TIMEOUT_SECONDS
+PYTHON_SCRIPT_MEMORY_LIMIT_MB = int(os.getenv("PYTHON_SCRIPT_MEMORY_LIMIT_MB", "1024"))  # 0 = unlimited
+
+# Directory browsing settings (runner /browse)
+BROWSE_PAGE_SIZE = 500  # Page size the web UI asks for (/browse without `limit` lists everything)
+BROWSE_MAX_ENTRIES = 20000  # Hard cap on entries collected by a recursive walk
+BROWSE_MAX_DEPTH = 12  # Default depth limit for recursive walks
+BROWSE_TIME_LIMIT_SECONDS = 10.0  # Stop a recursive walk after this long
+BROWSE_WORKERS = 8  # Threads used to scan subtrees in parallel
+BROWSE_CACHE_TTL_SECONDS = 2.0  # Directory listing cache lifetime
+BROWSE_CACHE_MAX_DIRS = 512
+
+# Filesystem index settings (runner /browse/search). Opt-in: set BROWSE_INDEX_ROOTS
+# to one or more directories separated by os.pathsep.
+BROWSE_INDEX_ROOTS = [p for p in os.getenv("BROWSE_INDEX_ROOTS", "").split(os.pathsep) if p]
+BROWSE_INDEX_DIR = LOGS_DIR / "fs_index"
+BROWSE_INDEX_RESCAN_SECONDS = 60  # Interval between incremental rescans
+
+# File reading settings (runner /browse/read and /sandbox/read)
+READ_PAGE_BYTES = 1024 * 1024  # Default/maximum bytes returned by one JSON read
+READ_SAMPLE_BYTES = 64 * 1024  # Prefix sampled once for encoding detection
+READ_MMAP_THRESHOLD = 4 * 1024 * 1024  # Use mmap for line seeks in files above this size
+STREAM_CHUNK_BYTES = 256 * 1024
+TEXT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Decoded file contents kept in memory (LRU)
+TEXT_CACHE_MAX_FILE_BYTES = 4 * 1024 * 1024  # Larger files are read but never cached
+FILE_LOAD_WORKERS = 8  # Threads used to read files for /analyze
+
+# Recursive sandbox listing (runner /sandbox/tree)
+TREE_SNAPSHOT_MAX = 32  # Past listings kept for ?since= diffs
+TREE_MAX_ENTRIES = 50000  # Refuse to list larger subtrees in one response
+
+# Directory-level code analysis (BM25 file/chunk selection)
+CODE_SEARCH_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".java", ".go", ".rs", ".c", ".h", ".cpp", ".hpp",
+    ".cs", ".rb", ".php", ".sh", ".md", ".txt", ".json", ".yaml", ".yml", ".toml", ".ini", ".cfg",
+}
+CODE_SEARCH_SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "dist", "build", ".next"}
+CODE_SEARCH_MAX_FILE_BYTES = 512 * 1024  # Larger files are not indexed
+CODE_SEARCH_MAX_FILES = 5000
+CODE_SEARCH_CHUNK_LINES = 60  # Lines per ranked chunk
+CODE_SEARCH_CONTEXT_CHARS = 24000  # Context budget for code_analysis tasks over a directory
+
+# Code outlines (code_analysis / /analyze mode="outline")
+OUTLINE_CACHE_MAX = 512  # Outlines kept, keyed by file content hash
+OUTLINE_MAX_EXPAND_ROUNDS = 2  # Times the model may ask for full symbol source per task
+
+# Tool-calling agent loop ("agent" task type)
+AGENT_MAX_STEPS = 8  # Model turns per task
+AGENT_MAX_TOKENS = 32000  # Total prompt + completion tokens per task (as reported by the server)
+AGENT_MAX_WALL_SECONDS = 600
+
+# Tool executors: read-only tool calls from one agent turn run concurrently on
+# a thread pool chosen by the tool's cost class
+TOOL_EXECUTOR_WORKERS = {"io": 8, "cpu": max(1, (os.cpu_count() or 2) // 2), "llm": 2}
+
+# Tool memoization (tools registered with memoize="global" or "task")
+TOOL_MEMO_MAX_ENTRIES = 1024  # Global LRU size
+TOOL_MEMO_TASK_ENTRIES = 256  # LRU size per task
+TOOL_MEMO_MAX_TASKS = 32  # Per-task caches kept before the oldest is dropped
+
+# Tool call spans (one TOOL_SPAN event per call, written off the calling thread)
+TOOL_SPAN_SAMPLE_RATES = {"read_file": 0.1, "list_directory": 0.1}  # Fraction of successful calls logged
+TOOL_SPAN_DEFAULT_SAMPLE_RATE = 1.0  # Failed calls are always logged
+EVENT_QUEUE_MAX = 10000  # Queued async events before new ones are dropped
+
+# Per-task traces (stored on the task, see src/tracing.py)
+TRACE_MAX_SPANS = 500  # Spans kept per trace; later ones are only counted
+
+# Sampling profiler (runner /admin/profile, main.py --profile)
+PROFILER_INTERVAL_SECONDS = 0.005  # Time between stack samples
+PROFILER_MAX_DEPTH = 64  # Frames kept per sampled stack
+PROFILER_MAX_SECONDS = 300  # Longest profile the runner will run in one request
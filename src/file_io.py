@@ -0,0 +1,438 @@
+"""
+File reading helpers for Project ME v0
+Range/line reads, streaming, single-sample encoding detection and a decoded-text cache.
+
+The runner's read endpoints use these instead of read_text(), so a file is
+opened once, its encoding is decided from one prefix sample, and large files
+are paged through by byte or line range instead of being loaded whole.
+Whole-file reads of small files go through `text_cache`, which is shared by
+/analyze and the read endpoints and revalidated against fstat on every hit.
+"""
+import codecs
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import config, metrics
+
+_read_bytes = metrics.FILE_READ_BYTES.labels("file_io")
+
+
+class BinaryFileError(ValueError):
+    """Raised when a text read is requested for a binary file."""
+
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> Optional[str]:
+    """
+    Guess the text encoding of a file from a prefix sample.
+
+    Args:
+        sample: Leading bytes of the file
+        complete: True if the sample is the whole file (no cut-off character at the end)
+
+    Returns:
+        "utf-8", "utf-8-sig", "utf-16"/"utf-32" (BOM), "latin-1",
+        or None if the sample looks binary
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if b"\x00" in sample:
+        return None
+
+    try:
+        # Incremental decode tolerates a multi-byte character cut off at the end
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def decode_bytes(data: bytes, encoding: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Decode bytes, detecting the encoding from a prefix when not given.
+
+    Returns:
+        (text, encoding); (None, None) if the data looks binary
+    """
+    if encoding is None:
+        encoding = detect_encoding(data[:config.READ_SAMPLE_BYTES], len(data) <= config.READ_SAMPLE_BYTES)
+        if encoding is None:
+            return None, None
+    return data.decode(encoding, errors="replace"), encoding
+
+
+class TextFile(NamedTuple):
+    """A decoded file as returned by read_text()."""
+    path: str
+    text: str
+    encoding: str
+    size: int
+    sha256: str
+
+
+class TextCache:
+    """
+    LRU of decoded file contents.
+
+    Entries are keyed by absolute path and only reused while the file's
+    size, mtime and inode are unchanged, so edits and atomic replacements
+    are picked up on the next read.
+    """
+
+    def __init__(self, max_bytes: int = config.TEXT_CACHE_MAX_BYTES,
+                 max_file_bytes: int = config.TEXT_CACHE_MAX_FILE_BYTES, name: str = "text_cache"):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int, int], TextFile]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits, self._misses = metrics.cache_metrics(name)
+
+    @staticmethod
+    def _stamp(st: os.stat_result) -> Tuple[int, int, int]:
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def get(self, path: str, st: os.stat_result) -> Optional[TextFile]:
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is None:
+                self._misses.inc()
+                return None
+            if cached[0] != self._stamp(st):
+                self._drop(path)
+                self._misses.inc()
+                return None
+            self._entries.move_to_end(path)
+            self._hits.inc()
+            return cached[1]
+
+    def put(self, path: str, st: os.stat_result, text_file: TextFile):
+        if text_file.size > self.max_file_bytes:
+            return
+        with self._lock:
+            if path in self._entries:
+                self._drop(path)
+            self._entries[path] = (self._stamp(st), text_file)
+            self._bytes += text_file.size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, path: str):
+        _, text_file = self._entries.pop(path)
+        self._bytes -= text_file.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+text_cache = TextCache()
+
+
+def _read_whole(f, path: str, st: os.stat_result, cache: Optional[TextCache]) -> TextFile:
+    """Decode an already-open file in full, through the cache."""
+    if cache is not None:
+        cached = cache.get(path, st)
+        if cached is not None:
+            return cached
+
+    f.seek(0)
+    data = f.read()
+    _read_bytes.inc(len(data))
+    text, encoding = decode_bytes(data)
+    if text is None:
+        raise BinaryFileError("File is not text or has unsupported encoding")
+
+    text_file = TextFile(path, text, encoding, len(data), hashlib.sha256(data).hexdigest())
+    if cache is not None:
+        cache.put(path, st, text_file)
+    return text_file
+
+
+def read_text(path: str, cache: Optional[TextCache] = text_cache) -> TextFile:
+    """
+    Read and decode a whole text file with a single open().
+
+    Raises:
+        BinaryFileError: if the file looks binary
+        OSError: if the file cannot be read
+    """
+    path = os.path.abspath(path)
+    with open(path, "rb") as f:
+        return _read_whole(f, path, os.fstat(f.fileno()), cache)
+
+
+def load_text_files(paths: Iterable[str], max_workers: int = config.FILE_LOAD_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Read many text files concurrently, de-duplicating identical contents.
+
+    Returns:
+        One dict per input path, in order, with keys: path, file (TextFile or
+        None), error, duplicate_of (path of an earlier identical file, if any)
+    """
+    paths = list(paths)
+
+    def load(path):
+        try:
+            return read_text(path), None
+        except BinaryFileError as exc:
+            return None, str(exc)
+        except OSError as exc:
+            return None, exc.strerror or str(exc)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths) or 1))) as executor:
+        loaded = list(executor.map(load, paths))
+
+    results = []
+    first_by_hash: Dict[str, str] = {}
+    for path, (text_file, error) in zip(paths, loaded):
+        duplicate_of = None
+        if text_file is not None:
+            duplicate_of = first_by_hash.setdefault(text_file.sha256, path)
+            if duplicate_of == path:
+                duplicate_of = None
+        results.append({"path": path, "file": text_file, "error": error, "duplicate_of": duplicate_of})
+    return results
+
+
+def _sample_encoding(f, size: int) -> Optional[str]:
+    """Detect encoding from the file's prefix, leaving the position unchanged."""
+    pos = f.tell()
+    f.seek(0)
+    sample = f.read(min(size, config.READ_SAMPLE_BYTES))
+    f.seek(pos)
+    return detect_encoding(sample, size <= config.READ_SAMPLE_BYTES)
+
+
+def read_byte_range(path: str, offset: int = 0, length: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Read and decode a byte range of a text file.
+
+    The encoding is detected from the file's prefix, so ranges that start in
+    the middle of a multi-byte character decode with a replacement char
+    instead of failing.
+
+    Args:
+        path: File path
+        offset: First byte to read
+        length: Number of bytes (capped at config.READ_PAGE_BYTES)
+
+    Returns:
+        Dict with keys: content, encoding, size, offset, length, next_offset (None at EOF)
+    """
+    length = config.READ_PAGE_BYTES if length is None else min(length, config.READ_PAGE_BYTES)
+    offset = max(0, offset)
+
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if offset == 0 and length >= size and size <= text_cache.max_file_bytes:
+            # The whole file fits in one page: serve it from the shared text cache
+            text_file = _read_whole(f, os.path.abspath(path), st, text_cache)
+            return {
+                "content": text_file.text,
+                "encoding": text_file.encoding,
+                "size": size,
+                "offset": 0,
+                "length": size,
+                "next_offset": None,
+            }
+
+        encoding = _sample_encoding(f, size)
+        if encoding is None:
+            raise BinaryFileError("File is not text or has unsupported encoding")
+        decode_as = encoding
+        if offset > 0:
+            # Only the first page carries the BOM; later ones need the byte order spelled out
+            f.seek(0)
+            decode_as = _line_format(f.read(4), encoding)[3]
+
+        f.seek(offset)
+        data = f.read(length)
+        _read_bytes.inc(len(data))
+
+    end = offset + len(data)
+    return {
+        "content": data.decode(decode_as, errors="replace"),
+        "encoding": encoding,
+        "size": size,
+        "offset": offset,
+        "length": len(data),
+        "next_offset": end if end < size else None,
+    }
+
+
+def _line_format(buf, encoding: str) -> Tuple[bytes, int, int, str]:
+    """
+    How lines look in the raw bytes of a file with this (detected) encoding.
+
+    Returns:
+        (encoded newline, code unit size, BOM length, codec that decodes a slice without the BOM)
+    """
+    head = bytes(buf[:4])
+    if encoding == "utf-32":
+        if head.startswith(codecs.BOM_UTF32_BE):
+            return "\n".encode("utf-32-be"), 4, 4, "utf-32-be"
+        return "\n".encode("utf-32-le"), 4, 4, "utf-32-le"
+    if encoding == "utf-16":
+        if head.startswith(codecs.BOM_UTF16_BE):
+            return "\n".encode("utf-16-be"), 2, 2, "utf-16-be"
+        return "\n".encode("utf-16-le"), 2, 2, "utf-16-le"
+    return b"\n", 1, 0, encoding
+
+
+def _find_newline(buf, newline: bytes, pos: int, unit: int, base: int) -> int:
+    """Next newline at or after `pos` that starts on a code unit boundary, or -1."""
+    while True:
+        nl = buf.find(newline, pos)
+        if nl == -1 or (nl - base) % unit == 0:
+            return nl
+        pos = nl + 1
+
+
+def _line_span(buf, size: int, start_line: int, num_lines: int, max_bytes: int,
+               newline: bytes = b"\n", unit: int = 1, base: int = 0) -> Tuple[int, int, int, bool]:
+    """
+    Find the byte span of lines [start_line, start_line + num_lines) in a bytes-like buffer.
+
+    Returns:
+        (start, end, complete lines, cut) where `cut` means the span ends inside
+        a line longer than max_bytes (which is not counted in `lines`)
+    """
+    start = base
+    for _ in range(start_line - 1):
+        nl = _find_newline(buf, newline, start, unit, base)
+        if nl == -1:
+            return size, size, 0, False
+        start = nl + len(newline)
+
+    end = start
+    lines = 0
+    limit = max(unit, max_bytes - max_bytes % unit)
+    while lines < num_lines and end < size:
+        nl = _find_newline(buf, newline, end, unit, base)
+        line_end = size if nl == -1 else nl + len(newline)
+        if line_end - start > limit:
+            return start, start + limit if end == start else end, lines, end == start
+        end = line_end
+        lines += 1
+    return start, end, lines, False
+
+
+def read_line_range(path: str, start_line: int = 1, num_lines: int = 1000) -> Dict[str, Any]:
+    """
+    Read lines [start_line, start_line + num_lines) of a text file (1-based).
+
+    Files above config.READ_MMAP_THRESHOLD are scanned through mmap, so only
+    the pages that are actually touched are loaded. A page holds whole lines
+    only, except when its first line alone is longer than
+    config.READ_PAGE_BYTES: then the page is that line's first bytes,
+    `next_offset` is where the line continues (read on with offset/length)
+    and `next_line` is the line after it.
+
+    Returns:
+        Dict with keys: content, encoding, size, start_line, lines, offset,
+        next_line (None at EOF) and next_offset (only for a cut line)
+    """
+    start_line = max(1, start_line)
+    num_lines = max(1, num_lines)
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        encoding = _sample_encoding(f, size)
+        if encoding is None:
+            raise BinaryFileError("File is not text or has unsupported encoding")
+
+        if size == 0:
+            buf = b""
+        elif size > config.READ_MMAP_THRESHOLD:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = f.read()
+
+        try:
+            newline, unit, bom, decode_as = _line_format(buf, encoding)
+            start, end, lines, cut = _line_span(buf, size, start_line, num_lines, config.READ_PAGE_BYTES,
+                                                newline, unit, bom)
+            next_line = start_line + lines + (1 if cut else 0)
+            if cut and _find_newline(buf, newline, end, unit, bom) == -1:
+                next_line = None  # The cut line is the last one
+            elif not cut and end >= size:
+                next_line = None
+            data = buf[start:end]
+            _read_bytes.inc(end - start if isinstance(buf, mmap.mmap) else len(buf))
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    page = {
+        "content": data.decode(decode_as, errors="replace"),
+        "encoding": encoding,
+        "size": size,
+        "start_line": start_line,
+        "lines": lines,
+        "offset": start,
+        "next_line": next_line,
+    }
+    if cut:
+        page["next_offset"] = end
+    return page
+
+
+def iter_file(path: str, start: int = 0, end: Optional[int] = None,
+              chunk_size: int = config.STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield raw bytes of [start, end) (end inclusive of EOF when None) in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            to_read = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(to_read)
+            if not chunk:
+                break
+            _read_bytes.inc(len(chunk))
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header ("bytes=start-end", "bytes=-suffix").
+
+    Returns:
+        (start, end_exclusive) or None if absent/unsupported/unsatisfiable
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_s == "":
+            suffix = int(end_s)
+            if suffix <= 0:
+                return None
+            return max(0, size - suffix), size
+        start = int(start_s)
+        end = int(end_s) + 1 if end_s else size
+    except ValueError:
+        return None
+    end = min(end, size)
+    if start >= end:
+        return None
+    return start, end
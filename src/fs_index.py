@@ -0,0 +1,352 @@
+"""
+Filesystem index for Project ME v0
+Persistent name index for configured browse roots, kept fresh by mtime-diffing rescans.
+
+Each root is indexed directory by directory. A rescan stats every known
+directory and only re-lists the ones whose mtime changed, so keeping a large
+tree up to date costs one stat per directory rather than a full walk.
+The index is persisted as JSONL (one line per directory) under
+config.BROWSE_INDEX_DIR so restarts don't need a cold walk.
+
+Note: directory mtimes change when entries are created, deleted or renamed,
+not when a file is rewritten in place, so sizes/mtimes of such files are
+refreshed the next time their directory changes.
+"""
+import bisect
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config
+
+logger = logging.getLogger("project_me.fs_index")
+
+# Child entry kinds
+KIND_FILE = "f"
+KIND_DIR = "d"
+KIND_LINKED_DIR = "l"  # Symlinked directory: listed, never descended into
+
+Child = Tuple[str, str, int, int]  # (name, kind, size, mtime_ns)
+
+
+def _scan_children(path: str) -> List[Child]:
+    children = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    kind = KIND_LINKED_DIR if entry.is_symlink() else KIND_DIR
+                    st = entry.stat()
+                    children.append((entry.name, kind, 0, st.st_mtime_ns))
+                else:
+                    st = entry.stat()
+                    children.append((entry.name, KIND_FILE, st.st_size, st.st_mtime_ns))
+            except OSError:
+                continue
+    return children
+
+
+class FileIndex:
+    """Name index for a single root directory."""
+
+    def __init__(self, root: str, index_dir: Path = config.BROWSE_INDEX_DIR):
+        self.root = os.path.abspath(root)
+        digest = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:16]
+        self.index_file = Path(index_dir) / f"{digest}.jsonl"
+
+        # rel dir path -> (dir mtime_ns, children)
+        self._dirs: Dict[str, Tuple[int, List[Child]]] = {}
+        self._lock = threading.Lock()
+        self.last_scan: Optional[float] = None
+        self.ready = False
+
+        # Flat query structures, rebuilt after every change
+        self._paths: List[str] = []
+        self._kinds: List[str] = []
+        self._sizes: List[int] = []
+        self._mtimes: List[int] = []
+        self._names_blob = ""
+        self._name_offsets: List[int] = []
+        self._by_ext: Dict[str, List[int]] = {}
+
+        self._load()
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        if not self.index_file.exists():
+            return
+        dirs = {}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("root") != self.root:
+                    return
+                for line in f:
+                    rel, mtime_ns, children = json.loads(line)
+                    dirs[rel] = (mtime_ns, [tuple(c) for c in children])
+        except (OSError, ValueError):
+            logger.warning("[Index] Ignoring unreadable index file %s", self.index_file)
+            return
+
+        with self._lock:
+            self._dirs = dirs
+            self._rebuild()
+            self.ready = True
+        logger.info("[Index] Loaded %d entries for %s", len(self._paths), self.root)
+
+    def _save(self):
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"root": self.root, "version": 1}) + "\n")
+            for rel, (mtime_ns, children) in self._dirs.items():
+                f.write(json.dumps([rel, mtime_ns, children], separators=(",", ":")) + "\n")
+        os.replace(tmp_file, self.index_file)
+
+    # ---------- scanning ----------
+
+    def rescan(self) -> bool:
+        """
+        Bring the index up to date. Only directories whose mtime changed are re-listed.
+
+        Returns:
+            True if anything changed since the previous scan
+        """
+        started = time.monotonic()
+        old_dirs = self._dirs
+        new_dirs: Dict[str, Tuple[int, List[Child]]] = {}
+        changed = False
+        stack = [""]
+
+        while stack:
+            rel = stack.pop()
+            full = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime_ns = os.stat(full).st_mtime_ns
+                cached = old_dirs.get(rel)
+                if cached and cached[0] == mtime_ns:
+                    children = cached[1]
+                else:
+                    children = _scan_children(full)
+                    changed = True
+            except OSError:
+                continue
+
+            new_dirs[rel] = (mtime_ns, children)
+            for name, kind, _, _ in children:
+                if kind == KIND_DIR:
+                    stack.append(os.path.join(rel, name) if rel else name)
+
+        if new_dirs.keys() != old_dirs.keys():
+            changed = True
+
+        with self._lock:
+            self._dirs = new_dirs
+            if changed or not self.ready:
+                self._rebuild()
+            self.ready = True
+            self.last_scan = time.time()
+
+        if changed:
+            self._save()
+            logger.info("[Index] Rescanned %s: %d entries in %.2fs",
+                        self.root, len(self._paths), time.monotonic() - started)
+        return changed
+
+    def _rebuild(self):
+        """Flatten the per-directory map into query arrays. Caller holds the lock."""
+        paths, kinds, sizes, mtimes, names = [], [], [], [], []
+        for rel, (_, children) in self._dirs.items():
+            for name, kind, size, mtime_ns in children:
+                paths.append(os.path.join(rel, name) if rel else name)
+                kinds.append(kind)
+                sizes.append(size)
+                mtimes.append(mtime_ns)
+                names.append(name.lower())
+
+        by_ext: Dict[str, List[int]] = {}
+        offsets = []
+        pos = 0
+        for i, name in enumerate(names):
+            offsets.append(pos)
+            pos += len(name) + 1
+            if kinds[i] == KIND_FILE:
+                ext = os.path.splitext(name)[1]
+                if ext:
+                    by_ext.setdefault(ext, []).append(i)
+
+        self._paths, self._kinds, self._sizes, self._mtimes = paths, kinds, sizes, mtimes
+        self._names_blob = "\n".join(names) + "\n"
+        self._name_offsets = offsets
+        self._by_ext = by_ext
+
+    # ---------- queries ----------
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def _entry(self, i: int) -> Dict[str, Any]:
+        rel = self._paths[i]
+        kind = self._kinds[i]
+        entry = {
+            "name": os.path.basename(rel),
+            "type": "file" if kind == KIND_FILE else "dir",
+            "path": os.path.join(self.root, rel),
+            "relative": rel,
+            "mtime": self._mtimes[i] / 1e9,
+        }
+        if kind == KIND_FILE:
+            entry["size"] = self._sizes[i]
+        return entry
+
+    def _substring_matches(self, needle: str):
+        blob = self._names_blob
+        offsets = self._name_offsets
+        pos = blob.find(needle)
+        while pos != -1:
+            i = bisect.bisect_right(offsets, pos) - 1
+            yield i
+            # Resume at the next name so each entry matches once
+            if i + 1 >= len(offsets):
+                return
+            pos = blob.find(needle, offsets[i + 1])
+
+    def _glob_matches(self, pattern: str):
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        regex = re.compile(fnmatch.translate(pattern), flags)
+        match_path = "/" in pattern or os.sep in pattern
+        for i, rel in enumerate(self._paths):
+            if regex.match(rel if match_path else os.path.basename(rel)):
+                yield i
+
+    def search(self, query: str, mode: str = "auto", limit: int = 100,
+               under: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Search entry names.
+
+        Args:
+            query: Glob ("*.py", "src/*/test_*"), substring ("config") or extension (".md")
+            mode: "glob", "substring", "ext" or "auto" (guess from the query)
+            limit: Maximum number of results
+            under: Optional absolute directory to restrict results to
+
+        Returns:
+            List of entry dicts (name, type, path, relative, mtime, size);
+            empty when limit <= 0
+        """
+        if limit <= 0:
+            return []
+        if mode == "auto":
+            if any(ch in query for ch in "*?["):
+                mode = "glob"
+            elif query.startswith(".") and query.count(".") == 1:
+                mode = "ext"
+            else:
+                mode = "substring"
+
+        prefix = None
+        if under:
+            prefix = os.path.relpath(os.path.abspath(under), self.root)
+            if prefix == ".":
+                prefix = None
+            elif prefix.startswith(".."):
+                return []
+
+        with self._lock:
+            if mode == "ext":
+                candidates = iter(self._by_ext.get(query.lower(), []))
+            elif mode == "substring":
+                candidates = self._substring_matches(query.lower())
+            elif mode == "glob":
+                simple_ext = re.fullmatch(r"\*(\.[^*?\[\]/\\]+)", query)
+                if simple_ext:
+                    candidates = iter(self._by_ext.get(simple_ext.group(1).lower(), []))
+                else:
+                    candidates = self._glob_matches(query)
+            else:
+                raise ValueError(f"Unknown search mode: {mode}")
+
+            hits = []
+            for i in candidates:
+                if prefix and not self._paths[i].startswith(prefix + os.sep):
+                    continue
+                hits.append(self._entry(i))
+                if len(hits) >= limit:
+                    break
+            return hits
+
+
+class FileIndexer:
+    """Owns one FileIndex per configured root and refreshes them on a background thread."""
+
+    def __init__(self, roots: List[str] = None,
+                 interval: float = config.BROWSE_INDEX_RESCAN_SECONDS,
+                 index_dir: Path = config.BROWSE_INDEX_DIR):
+        roots = config.BROWSE_INDEX_ROOTS if roots is None else roots
+        self.indexes = [FileIndex(root, index_dir) for root in roots]
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.indexes)
+
+    def start(self):
+        """Start the background rescan loop (no-op without roots or if running)."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="fs-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for index in self.indexes:
+                try:
+                    index.rescan()
+                except Exception:
+                    logger.exception("[Index] Rescan failed for %s", index.root)
+            self._stop.wait(self.interval)
+
+    def search(self, query: str, mode: str = "auto", root: Optional[str] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """Search all indexed roots (or only the one containing `root`)."""
+        results: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return results
+        for index in self.indexes:
+            results.extend(index.search(query, mode=mode, limit=limit - len(results), under=root))
+            if len(results) >= limit:
+                break
+        return results
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"root": index.root, "ready": index.ready, "entries": len(index),
+             "last_scan": index.last_scan}
+            for index in self.indexes
+        ]
+
+
+_indexer: Optional[FileIndexer] = None
+_indexer_lock = threading.Lock()
+
+
+def get_indexer() -> FileIndexer:
+    """Return the process-wide indexer for config.BROWSE_INDEX_ROOTS."""
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None:
+            _indexer = FileIndexer()
+        return _indexer
@@ -57,8 +57,8 @@ def stats():
     store = TaskStore()
     mem = MemoryStore()
 
-    tasks = store.load_all_tasks()
-    events = mem.load_all_events()
+    tasks = store.load_task_records()
+    events = mem.load_event_records()
 
     status_counts = {}
     for task in tasks:
@@ -0,0 +1,64 @@
+"""
+Lazy loading for Project ME v0
+On-first-use singletons, so importing a module does not build its globals.
+
+`memory`, `llm` and `agent` are LazyObject stand-ins: code keeps using them
+as before (`from .memory import memory; memory.log_event(...)`), and the
+real MemoryStore / LMStudioClient / Agent is constructed, with its file
+and thread side effects, by whichever attribute access comes first. One-shot
+CLI commands that never touch them never pay for them.
+"""
+import threading
+from typing import Any, Callable
+
+
+class LazyObject:
+    """
+    Forwards attribute access to the object `factory()` returns, calling it once on first use.
+
+    Args:
+        factory: Zero-argument callable building the real object
+    """
+
+    __slots__ = ("_factory", "_instance", "_lock")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, "_instance", self._factory())
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str):
+        delattr(self._resolve(), name)
+
+    def __dir__(self):
+        return dir(self._resolve())
+
+    def __repr__(self) -> str:
+        if self._instance is None:
+            return f"<lazy {getattr(self._factory, '__qualname__', self._factory)} (not built)>"
+        return repr(self._instance)
+
+
+def resolve(obj: Any) -> Any:
+    """The real object behind a LazyObject (building it if needed); other objects are returned as is."""
+    return obj._resolve() if isinstance(obj, LazyObject) else obj
+
+
+def is_built(obj: LazyObject) -> bool:
+    """True once the LazyObject's factory has run."""
+    return obj._instance is not None
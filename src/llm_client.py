@@ -1,12 +1,18 @@
 """
 LLM client for Project ME v0
 Wrapper around LM Studio's OpenAI-compatible endpoint.
+
+Every request is recorded in the llm_* metrics. With config.LLM_STREAM,
+chat() streams the completion so time-to-first-token can be measured too.
+`requests` is imported on the first request rather than with this module,
+which keeps CLI startup fast.
 """
 import json
-import requests
-from typing import List, Dict, Optional, Any
+import time
+from typing import List, Dict, Optional, Any, Tuple
 
-from . import config
+from . import config, metrics, tracing
+from .lazy import LazyObject
 from .memory import memory, EventType
 
 
@@ -65,16 +71,28 @@ class LMStudioClient:
         if response_format == "json":
             payload["response_format"] = {"type": "json_object"}
 
+        import requests
+
+        started = time.perf_counter()
         try:
-            response = requests.post(
-                self.chat_endpoint,
-                json=payload,
-                timeout=120
-            )
-            response.raise_for_status()
+            ttft = None
+            with tracing.span("llm_request", call="chat", stream=config.LLM_STREAM) as span:
+                if config.LLM_STREAM:
+                    content, usage, ttft = self._stream_chat(payload, started)
+                else:
+                    response = requests.post(
+                        self.chat_endpoint,
+                        json=payload,
+                        timeout=120
+                    )
+                    response.raise_for_status()
 
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
+                    data = response.json()
+                    content = data["choices"][0]["message"]["content"]
+                    usage = data.get("usage") or {}
+                if span is not None:
+                    span["completion_tokens"] = usage.get("completion_tokens")
+            metrics.record_llm_call("agent", time.perf_counter() - started, usage=usage, ttft=ttft)
 
             # Log the response
             memory.log_event(
@@ -89,6 +107,130 @@ class LMStudioClient:
             return content.strip()
 
         except requests.exceptions.RequestException as e:
+            metrics.record_llm_call("agent", time.perf_counter() - started, ok=False)
+            error_msg = f"LM Studio request failed: {str(e)}"
+            memory.log_event(
+                EventType.ERROR,
+                data={"error": error_msg},
+                task_id=task_id
+            )
+            raise RuntimeError(error_msg) from e
+        except (KeyError, IndexError, json.JSONDecodeError) as e:
+            metrics.record_llm_call("agent", time.perf_counter() - started, ok=False)
+            error_msg = f"Failed to parse LM Studio response: {str(e)}"
+            memory.log_event(
+                EventType.ERROR,
+                data={"error": error_msg},
+                task_id=task_id
+            )
+            raise RuntimeError(error_msg) from e
+
+    def _stream_chat(self, payload: Dict[str, Any], started: float) -> Tuple[str, Dict[str, Any], Optional[float]]:
+        """
+        Send a streamed completion request and assemble the reply.
+
+        Returns:
+            (content, usage, seconds from `started` to the first content chunk)
+        """
+        import requests
+
+        parts = []
+        usage: Dict[str, Any] = {}
+        ttft = None
+        with requests.post(self.chat_endpoint, json={**payload, "stream": True}, timeout=120, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        parts.append(delta)
+        if not usage:
+            usage = {"completion_tokens": len(parts)}  # One chunk per token
+        return "".join(parts), usage, ttft
+
+    def chat_with_tools(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        temperature: float = config.PLAN_TEMPERATURE,
+        max_tokens: int = config.DEFAULT_MAX_TOKENS,
+        task_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a chat completion request that may answer with tool calls.
+
+        Args:
+            messages: Conversation so far (may include assistant tool_calls and tool results)
+            tools: OpenAI-style function definitions (see tools.tool_schemas)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            task_id: Optional task ID for logging
+
+        Returns:
+            Dict with keys: content (str), tool_calls (list, possibly empty),
+            usage (dict with total_tokens etc., possibly empty)
+        """
+        memory.log_event(
+            EventType.LLM_REQUEST,
+            data={
+                "messages": messages[-1:],  # The full history was logged on earlier turns
+                "tools": [t["function"]["name"] for t in tools],
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            task_id=task_id
+        )
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": "auto",
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+
+        import requests
+
+        started = time.perf_counter()
+        try:
+            with tracing.span("llm_request", call="chat_with_tools"):
+                response = requests.post(
+                    self.chat_endpoint,
+                    json=payload,
+                    timeout=120
+                )
+                response.raise_for_status()
+
+                data = response.json()
+            metrics.record_llm_call("agent_tools", time.perf_counter() - started, usage=data.get("usage"))
+            message = data["choices"][0]["message"]
+            content = message.get("content") or ""
+            tool_calls = message.get("tool_calls") or []
+
+            memory.log_event(
+                EventType.LLM_RESPONSE,
+                data={
+                    "content": content[:500],
+                    "full_length": len(content),
+                    "tool_calls": [c.get("function", {}).get("name") for c in tool_calls]
+                },
+                task_id=task_id
+            )
+
+            return {"content": content.strip(), "tool_calls": tool_calls, "usage": data.get("usage") or {}}
+
+        except requests.exceptions.RequestException as e:
+            metrics.record_llm_call("agent_tools", time.perf_counter() - started, ok=False)
             error_msg = f"LM Studio request failed: {str(e)}"
             memory.log_event(
                 EventType.ERROR,
@@ -154,6 +296,6 @@ class LMStudioClient:
         )
 
 
-# Global LLM client instance
-llm = LMStudioClient()
+# Global LLM client instance (built on first use)
+llm = LazyObject(LMStudioClient)
 
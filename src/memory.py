@@ -1,16 +1,36 @@
 """
 Memory and event logging for Project ME v0
 All system events are logged to JSONL for persistence and debugging.
+
+High-frequency events (tool spans) go through log_event_async(), which
+hands the event to a background writer thread and returns immediately;
+the writer appends queued events in batches with one file open each.
+
+Lines are encoded through codec.py with `data` written last, so queries
+filter on the scalar fields and decode `data` only for the events they
+return. Bulk reads over large logs can use load_event_records(), which
+returns compact EventRecord views and never decodes `data` up front.
 """
+import atexit
 import json
+import queue
+import sys
+import threading
 import uuid
-from dataclasses import dataclass, field, asdict
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Any
+from typing import Iterable, Iterator, List, Optional, Any, Tuple
 from enum import Enum
 
-from . import config
+from . import codec, config, metrics, tracing
+from .lazy import LazyObject, is_built
+
+_write_bytes = metrics.FILE_WRITE_BYTES.labels("events")
+
+# JSON blobs written after the scalar fields (see codec.split_line)
+EVENT_BLOB_FIELDS = ("data",)
 
 
 class EventType(Enum):
@@ -23,6 +43,7 @@ class EventType(Enum):
     LLM_RESPONSE = "llm_response"
     ERROR = "error"
     INFO = "info"
+    TOOL_SPAN = "tool_span"
 
 
 @dataclass
@@ -35,13 +56,74 @@ class Event:
     data: dict = field(default_factory=dict)
 
     def to_dict(self) -> dict:
-        """Convert event to dictionary."""
-        return asdict(self)
+        """Convert event to dictionary (shallow: `data` is the event's own dict)."""
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "timestamp": self.timestamp,
+            "task_id": self.task_id,
+            "data": self.data,
+        }
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Event':
-        """Create event from dictionary."""
-        return cls(**data)
+        """Create event from dictionary (not modified)."""
+        return cls(
+            id=data["id"],
+            event_type=data["event_type"],
+            timestamp=data["timestamp"],
+            task_id=data.get("task_id"),
+            data=data.get("data") or {},
+        )
+
+    @classmethod
+    def from_parts(cls, header: dict, blobs: codec.LazyBlobs) -> 'Event':
+        """Create event from a codec.split_line() result (decodes `data`)."""
+        return cls.from_dict({**header, "data": blobs.get("data")})
+
+
+class EventRecord:
+    """
+    Compact read-only view of a logged event, for bulk reads (see MemoryStore.load_event_records).
+
+    event_type and task_id are interned (a task's events share one id
+    string), the timestamp is packed to an integer, and `data` stays raw
+    JSON until accessed; it is decoded on every access.
+    """
+
+    __slots__ = ("id", "event_type", "task_id", "_timestamp", "_data")
+
+    def __init__(self, header: dict, blobs: codec.LazyBlobs):
+        self.id = header["id"]
+        self.event_type = sys.intern(header["event_type"])
+        task_id = header.get("task_id")
+        self.task_id = sys.intern(task_id) if type(task_id) is str else task_id
+        self._timestamp = codec.pack_timestamp(header["timestamp"])
+        self._data = blobs.raw()
+
+    @property
+    def timestamp(self) -> str:
+        return codec.unpack_timestamp(self._timestamp)
+
+    @property
+    def data(self) -> dict:
+        return (codec.loads(self._data).get("data") if self._data else None) or {}
+
+    def to_dict(self) -> dict:
+        """Same layout as Event.to_dict()."""
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "timestamp": self.timestamp,
+            "task_id": self.task_id,
+            "data": self.data,
+        }
+
+    def to_event(self) -> Event:
+        return Event.from_dict(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"EventRecord(id={self.id!r}, event_type={self.event_type!r}, task_id={self.task_id!r})"
 
 
 class MemoryStore:
@@ -54,6 +136,11 @@ class MemoryStore:
         if not self.filepath.exists():
             self.filepath.touch()
 
+        self._queue: "queue.Queue[Event]" = queue.Queue(maxsize=config.EVENT_QUEUE_MAX)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.dropped_events = 0
+
     def log_event(self, event_type: EventType, data: dict, task_id: Optional[str] = None) -> Event:
         """Log a new event."""
         event = Event(
@@ -63,48 +150,166 @@ class MemoryStore:
             task_id=task_id,
             data=data
         )
-        self._append_event(event)
+        with tracing.span("log_event", type=event.event_type):
+            self._append_event(event)
+        return event
+
+    def log_event_async(self, event_type: EventType, data: dict, task_id: Optional[str] = None) -> Optional[Event]:
+        """
+        Queue an event for the background writer and return without blocking.
+
+        Returns None (and counts the event in dropped_events) if the queue is full.
+        """
+        event = Event(
+            id=str(uuid.uuid4()),
+            event_type=event_type.value,
+            timestamp=datetime.utcnow().isoformat(),
+            task_id=task_id,
+            data=data
+        )
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped_events += 1
+            return None
         return event
 
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="event-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                text = b''.join(codec.encode_line(event.to_dict()) for event in batch)
+                with open(self.filepath, 'ab') as f:
+                    f.write(text)
+                _write_bytes.inc(len(text))
+            except Exception:
+                self.dropped_events += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued async event has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
     def _append_event(self, event: Event):
         """Append an event to the JSONL file."""
-        with open(self.filepath, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(event.to_dict()) + '\n')
+        line = codec.encode_line(event.to_dict())
+        with open(self.filepath, 'ab') as f:
+            f.write(line)
+        _write_bytes.inc(len(line))
 
-    def load_all_events(self) -> List[Event]:
-        """Load all events from JSONL file."""
-        events = []
+    def iter_events(self) -> Iterator[Event]:
+        """Yield events in file order as they are read (after flushing queued async events)."""
+        self.flush()
+        if not self.filepath.exists():
+            return
+
+        with open(self.filepath, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        data = codec.loads(line)
+                    except codec.DECODE_ERRORS:
+                        continue
+                    yield Event.from_dict(data)
+
+    def iter_event_headers(self, needles: Iterable[Optional[bytes]] = (),
+                           min_bytes: int = codec.LAZY_MIN_BYTES) -> Iterator[Tuple[dict, codec.LazyBlobs]]:
+        """
+        Yield (scalar fields, undecoded `data`) per event, in file order.
+
+        Args:
+            needles: codec.needle() byte strings; lines missing any of them are skipped undecoded
+            min_bytes: Shorter lines are decoded in full (see codec.split_line)
+        """
+        self.flush()
         if not self.filepath.exists():
-            return events
+            return
 
-        with open(self.filepath, 'r', encoding='utf-8') as f:
+        needles = [n for n in needles if n]
+        with open(self.filepath, 'rb') as f:
             for line in f:
-                line = line.strip()
-                if line:
+                if needles and not all(n in line for n in needles):
+                    continue
+                if line.strip():
                     try:
-                        data = json.loads(line)
-                        events.append(Event.from_dict(data))
-                    except json.JSONDecodeError:
+                        yield codec.split_line(line, EVENT_BLOB_FIELDS, ("event_type",), min_bytes)
+                    except codec.DECODE_ERRORS:
                         continue
-        return events
+
+    def _iter_matching_headers(self, task_id: Optional[str], event_type: Optional[str],
+                               min_bytes: int = codec.LAZY_MIN_BYTES) -> Iterator[Tuple[dict, codec.LazyBlobs]]:
+        for header, blobs in self.iter_event_headers((codec.needle(task_id), codec.needle(event_type)), min_bytes):
+            if task_id and header.get("task_id") != task_id:
+                continue
+            if event_type and header.get("event_type") != event_type:
+                continue
+            yield header, blobs
+
+    def iter_events_filtered(self, task_id: Optional[str] = None,
+                             event_type: Optional[str] = None) -> Iterator[Event]:
+        """Yield matching events in file order (`data` is decoded for matches only)."""
+        for header, blobs in self._iter_matching_headers(task_id, event_type):
+            yield Event.from_parts(header, blobs)
+
+    def iter_event_records(self, task_id: Optional[str] = None,
+                           event_type: Optional[str] = None) -> Iterator[EventRecord]:
+        """Yield matching events as compact EventRecords, in file order (`data` is never decoded)."""
+        for header, blobs in self._iter_matching_headers(task_id, event_type, min_bytes=0):
+            yield EventRecord(header, blobs)
+
+    def load_event_records(self, task_id: Optional[str] = None,
+                           event_type: Optional[str] = None) -> List[EventRecord]:
+        """
+        Load events as compact EventRecords: a fraction of load_all_events()'s memory for large logs.
+
+        Args:
+            task_id: Only events of this task
+            event_type: Only events of this type
+
+        Returns:
+            Matching records in file order
+        """
+        return list(self.iter_event_records(task_id, event_type))
+
+    def load_all_events(self) -> List[Event]:
+        """Load all events from JSONL file."""
+        return list(self.iter_events())
 
     def get_events_for_task(self, task_id: str) -> List[Event]:
         """Get all events related to a specific task."""
-        events = self.load_all_events()
-        return [e for e in events if e.task_id == task_id]
+        return list(self.iter_events_filtered(task_id=task_id))
 
     def get_recent_events(self, limit: int = 50) -> List[Event]:
         """Get the most recent events."""
-        events = self.load_all_events()
-        return events[-limit:]
+        if limit <= 0:
+            return self.load_all_events()[-limit:]
+        recent = deque(self.iter_event_headers(), maxlen=limit)
+        return [Event.from_parts(header, blobs) for header, blobs in recent]
 
     def get_events_by_type(self, event_type: str, limit: Optional[int] = None) -> List[Event]:
         """Get all events of a specific type. (v0.1)"""
-        events = self.load_all_events()
-        filtered = [e for e in events if e.event_type == event_type]
+        filtered = self.iter_events_filtered(event_type=event_type)
         if limit:
-            return filtered[-limit:]
-        return filtered
+            return list(deque(filtered, maxlen=limit))
+        return list(filtered)
 
     def get_recent_events_for_task(self, task_id: str, limit: int = 20) -> List[Event]:
         """Get recent events for a specific task. (v0.1)"""
@@ -129,7 +334,11 @@ class MemoryStore:
         return "\n".join(lines)
 
 
-# Global memory store instance
-memory = MemoryStore()# Global memory store instance
-memory = MemoryStore()
+# Global memory store instance (built on first use; scraping the gauges does not build it)
+memory = LazyObject(MemoryStore)
+
+metrics.gauge("event_queue_depth", "Events waiting for the background writer").set_function(
+    lambda: memory._queue.qsize() if is_built(memory) else 0)
+metrics.gauge("events_dropped", "Async events dropped because the queue was full or a write failed").set_function(
+    lambda: memory.dropped_events if is_built(memory) else 0)
 
@@ -0,0 +1,367 @@
+"""
+Metrics for Project ME v0
+In-process counters, gauges and histograms exported in Prometheus text format.
+
+Metrics are declared once at import time by the module that owns them:
+
+    _TASKS = metrics.counter("agent_tasks_total", "Tasks processed", ["type", "outcome"])
+    _TASKS.labels("shell", "ok").inc()
+
+Recording is a dict lookup plus one short lock per call; bind label values
+up front with .labels(...) on hot paths to skip the lookup. Gauges can be
+backed by a function (set_function) that is only evaluated when the
+registry is rendered, e.g. for queue depths and cache hit ratios.
+
+The runner serves REGISTRY.render() at GET /metrics.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers fast tool calls up to long LLM generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Report function() at render time instead of a stored value."""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the with-block, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """The child for one combination of label values (created on first use)."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels(...)")
+        return self.labels()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (name it *_total)."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.get())}"
+                for key, child in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at render time."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._unlabelled().set_function(function)
+
+    def track_inprogress(self):
+        return self._unlabelled().track_inprogress()
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.get())}"
+                for key, child in list(self._children.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = _format_value(bound)
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, ('le', le))} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """A named set of metrics rendered together."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs):
+        name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Global registry (every metric name gets the project prefix)
+REGISTRY = Registry(prefix="project_me_")
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# ========== SHARED METRICS ==========
+# Used from more than one module (the agent's LLM client and the runner's
+# direct LM Studio calls; every component that reads or writes files).
+
+_LLM_REQUESTS = counter("llm_requests_total", "LLM chat completion requests", ["source", "outcome"])
+_LLM_DURATION = histogram("llm_request_duration_seconds", "LLM request latency", ["source"])
+_LLM_TTFT = histogram("llm_time_to_first_token_seconds", "Time to the first streamed token", ["source"])
+_LLM_TOKEN_RATE = histogram("llm_tokens_per_second", "Completion tokens per second of generation",
+                            ["source"], buckets=TOKEN_RATE_BUCKETS)
+_LLM_TOKENS = counter("llm_tokens_total", "Tokens processed by the LLM", ["source", "kind"])
+
+FILE_READ_BYTES = counter("file_read_bytes_total", "Bytes read from files", ["component"])
+FILE_WRITE_BYTES = counter("file_write_bytes_total", "Bytes written to files", ["component"])
+
+_CACHE_HITS = counter("cache_hits_total", "Cache lookups answered from the cache", ["cache"])
+_CACHE_MISSES = counter("cache_misses_total", "Cache lookups that had to compute or read", ["cache"])
+_CACHE_HIT_RATIO = gauge("cache_hit_ratio", "Hits / lookups since start", ["cache"])
+
+
+def record_llm_call(source: str, duration: float, ok: bool = True, usage: Optional[Dict] = None,
+                    ttft: Optional[float] = None):
+    """
+    Record one LLM request.
+
+    Args:
+        source: Caller ("agent", "agent_tools", "runner", "analyze", ...)
+        duration: Wall time of the request in seconds
+        ok: False if the request failed
+        usage: OpenAI-style usage dict (prompt_tokens, completion_tokens), if known
+        ttft: Seconds to the first token, for streamed responses
+    """
+    _LLM_REQUESTS.labels(source, "ok" if ok else "error").inc()
+    _LLM_DURATION.labels(source).observe(duration)
+    if not ok:
+        return
+    if ttft is not None:
+        _LLM_TTFT.labels(source).observe(ttft)
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    if prompt_tokens:
+        _LLM_TOKENS.labels(source, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        _LLM_TOKENS.labels(source, "completion").inc(completion_tokens)
+        generation = duration - (ttft or 0.0)
+        if generation > 0:
+            _LLM_TOKEN_RATE.labels(source).observe(completion_tokens / generation)
+
+
+def cache_metrics(cache: str):
+    """
+    Hit and miss counters for one cache (also exported as a hit ratio).
+
+    Returns:
+        (hits, misses): counter children to .inc() on each lookup
+    """
+    hits, misses = _CACHE_HITS.labels(cache), _CACHE_MISSES.labels(cache)
+
+    def ratio() -> float:
+        h, m = hits.get(), misses.get()
+        return h / (h + m) if h + m else 0.0
+
+    _CACHE_HIT_RATIO.labels(cache).set_function(ratio)
+    return hits, misses
@@ -0,0 +1,222 @@
+"""
+Code outlines for Project ME v0
+Compact structural summaries of source files: imports, classes, signatures and docstrings.
+
+Python files are parsed with the `ast` module; JavaScript/TypeScript use a
+small set of line-based regexes. Outlines list every symbol with its line
+range, so a caller can send the outline first and expand just the symbols
+the model asks for. Outlines are cached by content hash.
+"""
+import ast
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from . import config, file_io, metrics
+
+_JS_EXTENSIONS = {".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"}
+_DOC_CHARS = 120  # First docstring line is cut to this length
+
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_hits, _cache_misses = metrics.cache_metrics("outline")
+
+
+def _first_line(doc: Optional[str]) -> str:
+    if not doc:
+        return ""
+    line = doc.strip().splitlines()[0].strip()
+    return line if len(line) <= _DOC_CHARS else line[:_DOC_CHARS - 3] + "..."
+
+
+# ---------- Python ----------
+
+def _signature(node) -> str:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _python_symbols(tree: ast.Module) -> List[Dict[str, Any]]:
+    symbols = []
+
+    def visit(body, parent: Optional[str], depth: int):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = f"{parent}.{node.name}" if parent else node.name
+                decorators = [f"@{ast.unparse(d)}" for d in node.decorator_list]
+                symbols.append({
+                    "name": name, "kind": "method" if parent else "function", "depth": depth,
+                    "start_line": node.lineno, "end_line": node.end_lineno,
+                    "signature": " ".join(decorators + [_signature(node)]),
+                    "doc": _first_line(ast.get_docstring(node)),
+                })
+            elif isinstance(node, ast.ClassDef):
+                name = f"{parent}.{node.name}" if parent else node.name
+                bases = ", ".join(ast.unparse(b) for b in node.bases + node.keywords)
+                symbols.append({
+                    "name": name, "kind": "class", "depth": depth,
+                    "start_line": node.lineno, "end_line": node.end_lineno,
+                    "signature": f"class {node.name}({bases})" if bases else f"class {node.name}",
+                    "doc": _first_line(ast.get_docstring(node)),
+                })
+                visit(node.body, name, depth + 1)
+            elif depth == 0 and isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                names = [t.id for t in targets if isinstance(t, ast.Name) and t.id.isupper()]
+                for target in names:
+                    symbols.append({
+                        "name": target, "kind": "constant", "depth": 0,
+                        "start_line": node.lineno, "end_line": node.end_lineno,
+                        "signature": ast.unparse(node)[:_DOC_CHARS], "doc": "",
+                    })
+
+    visit(tree.body, None, 0)
+    return symbols
+
+
+def _python_outline(text: str) -> Dict[str, Any]:
+    tree = ast.parse(text)
+    imports = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(ast.unparse(node))
+    return {
+        "language": "python",
+        "doc": _first_line(ast.get_docstring(tree)),
+        "imports": imports,
+        "symbols": _python_symbols(tree),
+    }
+
+
+# ---------- JavaScript / TypeScript ----------
+
+_JS_PATTERNS = [
+    ("class", re.compile(r"^(\s*)(?:export\s+(?:default\s+)?)?(?:abstract\s+)?class\s+(\w+)[^{]*")),
+    ("interface", re.compile(r"^(\s*)(?:export\s+)?interface\s+(\w+)[^{]*")),
+    ("type", re.compile(r"^(\s*)(?:export\s+)?type\s+(\w+)\s*(?:<[^=]*>)?\s*=")),
+    ("function", re.compile(r"^(\s*)(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*(\w+)\s*(?:<[^(]*>)?\([^)]*\)[^{]*")),
+    ("function", re.compile(r"^(\s*)(?:export\s+)?(?:const|let|var)\s+(\w+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:\([^)]*\)|\w+)\s*(?::[^=]+)?=>")),
+    ("method", re.compile(r"^(\s+)(?:(?:public|private|protected|static|async|readonly|get|set)\s+)*(\w+)\s*(?:<[^(]*>)?\([^)]*\)\s*(?::\s*[^{]+)?\{\s*$")),
+]
+_JS_IMPORT = re.compile(r"^\s*import\s.+?from\s+['\"][^'\"]+['\"]|^\s*(?:const|let|var)\s+.+?=\s*require\(")
+_JS_KEYWORDS = {"if", "for", "while", "switch", "catch", "return", "function", "constructor"}
+
+
+def _js_outline(text: str) -> Dict[str, Any]:
+    lines = text.splitlines()
+    imports = []
+    symbols = []
+    current_class = None
+    for lineno, line in enumerate(lines, start=1):
+        if _JS_IMPORT.match(line):
+            imports.append(line.strip().rstrip(";"))
+            continue
+        for kind, pattern in _JS_PATTERNS:
+            match = pattern.match(line)
+            if not match:
+                continue
+            indent, name = len(match.group(1).expandtabs()), match.group(2)
+            if kind == "method":
+                if current_class is None or name in _JS_KEYWORDS - {"constructor"}:
+                    break
+                name = f"{current_class}.{name}"
+            elif kind == "class" and indent == 0:
+                current_class = name
+            elif indent == 0:
+                current_class = None
+            symbols.append({
+                "name": name, "kind": kind, "depth": 1 if kind == "method" or indent else 0,
+                "start_line": lineno, "end_line": None,
+                "signature": line.strip().rstrip("{").strip(), "doc": "",
+            })
+            break
+
+    # A symbol runs until the next symbol at the same or a shallower depth
+    for i, symbol in enumerate(symbols):
+        end = len(lines)
+        for later in symbols[i + 1:]:
+            if later["depth"] <= symbol["depth"]:
+                end = later["start_line"] - 1
+                break
+        symbol["end_line"] = end
+    return {"language": "javascript", "doc": "", "imports": imports, "symbols": symbols}
+
+
+# ---------- public API ----------
+
+def build_outline(text: str, filename: str) -> Dict[str, Any]:
+    """
+    Outline source text. Unsupported or unparsable files get an empty symbol list.
+
+    Returns:
+        Dict with keys: language, doc, imports, symbols (name, kind, depth,
+        start_line, end_line, signature, doc), lines
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    try:
+        if ext == ".py":
+            outline = _python_outline(text)
+        elif ext in _JS_EXTENSIONS:
+            outline = _js_outline(text)
+        else:
+            outline = {"language": None, "doc": "", "imports": [], "symbols": []}
+    except SyntaxError:
+        outline = {"language": "python", "doc": "", "imports": [], "symbols": [], "error": "syntax error"}
+    outline["lines"] = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+    return outline
+
+
+def outline_file(path: str) -> Dict[str, Any]:
+    """Outline a file, reusing the cached outline while its content hash is unchanged."""
+    text_file = file_io.read_text(path)
+    key = f"{os.path.splitext(path)[1].lower()}:{text_file.sha256}"
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            _cache_hits.inc()
+            return {**cached, "path": path}
+
+    _cache_misses.inc()
+    outline = build_outline(text_file.text, path)
+    with _cache_lock:
+        _cache[key] = outline
+        while len(_cache) > config.OUTLINE_CACHE_MAX:
+            _cache.popitem(last=False)
+    return {**outline, "path": path}
+
+
+def format_outline(outline: Dict[str, Any]) -> str:
+    """Render an outline as compact prompt text."""
+    parts = [f"=== Outline: {outline['path']} ({outline['lines']} lines) ==="]
+    if outline.get("doc"):
+        parts.append(f'"""{outline["doc"]}"""')
+    if outline["imports"]:
+        parts.append("imports: " + "; ".join(outline["imports"]))
+    if not outline["symbols"] and outline["language"] is None:
+        parts.append("(no outline available for this file type)")
+    for symbol in outline["symbols"]:
+        line = f"{'    ' * symbol['depth']}L{symbol['start_line']}-{symbol['end_line']}: {symbol['signature']}"
+        if symbol["doc"]:
+            line += f"  # {symbol['doc']}"
+        parts.append(line)
+    return "\n".join(parts) + "\n"
+
+
+def expand_symbols(path: str, names: List[str]) -> Dict[str, str]:
+    """
+    Return the full source of the named symbols ("Class", "Class.method", "func").
+
+    Names that are not found are omitted from the result.
+    """
+    outline = outline_file(path)
+    lines = file_io.read_text(path).text.splitlines()
+    wanted = set(names)
+    return {
+        symbol["name"]: "\n".join(lines[symbol["start_line"] - 1:symbol["end_line"]])
+        for symbol in outline["symbols"]
+        if symbol["name"] in wanted
+    }
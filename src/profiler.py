@@ -0,0 +1,219 @@
+"""
+Sampling profiler for Project ME v0
+Opt-in stack sampling with collapsed-stack output for flamegraphs.
+
+Two samplers are available:
+
+- "signal" (Linux/macOS): an ITIMER_PROF interval timer delivers SIGPROF
+  every `interval` seconds of CPU time and the handler records the stack of
+  every thread. The handler must be installed from the main thread
+  (install_signal_handler(), called at startup by the runner, and by the CLI when
+  profiling is requested); after that a profile can be started from any thread.
+- "thread": a daemon thread wakes every `interval` seconds of wall time and
+  samples sys._current_frames(). Used on Windows, or when the signal
+  handler is not installed.
+
+Nothing runs while no profile is active: the timer is disarmed and the
+installed handler is never called. Output is one "frame;frame;frame count"
+line per distinct stack (root first), as read by flamegraph.pl, speedscope
+and similar tools.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from . import config
+
+MODES = ("auto", "signal", "thread")
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is started while another one is running."""
+
+
+_signal_installed = False
+_active: Optional["Profiler"] = None
+_active_lock = threading.Lock()
+
+
+def signal_supported() -> bool:
+    return hasattr(signal, "SIGPROF") and hasattr(signal, "setitimer")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+def _collapse(frame, max_depth: int) -> str:
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def _on_sigprof(signum, frame):
+    profiler = _active
+    if profiler is not None and profiler.mode == "signal":
+        profiler._sample(skip_thread=None, own_frame=frame)
+
+
+def install_signal_handler() -> bool:
+    """
+    Install the SIGPROF handler (main thread only; safe to call repeatedly).
+
+    Returns:
+        True if signal-based profiling is available afterwards
+    """
+    global _signal_installed
+    if _signal_installed:
+        return True
+    if not signal_supported() or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGPROF, _on_sigprof)
+    _signal_installed = True
+    return True
+
+
+class Profiler:
+    """
+    One profiling session.
+
+    Args:
+        interval: Seconds between samples
+        mode: "signal", "thread" or "auto" (signal when the handler is installed)
+        max_depth: Frames kept per stack (innermost frames win)
+    """
+
+    def __init__(self, interval: float = config.PROFILER_INTERVAL_SECONDS, mode: str = "auto",
+                 max_depth: int = config.PROFILER_MAX_DEPTH):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        if mode == "auto":
+            mode = "signal" if _signal_installed else "thread"
+        if mode == "signal" and not _signal_installed:
+            raise RuntimeError("Signal profiling needs install_signal_handler() from the main thread first")
+        self.interval = max(0.001, interval)
+        self.mode = mode
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Timer] = None
+        self._sampling = False
+
+    def _sample(self, skip_thread: Optional[int], own_frame=None):
+        if self._sampling:  # A signal arrived while the previous sample was being taken
+            return
+        self._sampling = True
+        try:
+            self._record(skip_thread, own_frame)
+        finally:
+            self._sampling = False
+
+    def _record(self, skip_thread: Optional[int], own_frame):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_thread:
+                continue
+            if ident == me and own_frame is not None:
+                frame = own_frame  # The interrupted frame, not the signal handler's
+            stack = _collapse(frame, self.max_depth)
+            if stack:
+                self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+        self.samples += 1
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(skip_thread=me)
+
+    def start(self, seconds: Optional[float] = None) -> "Profiler":
+        """Start sampling (and stop automatically after `seconds`, if given)."""
+        global _active
+        with _active_lock:
+            if _active is not None:
+                raise ProfilerBusyError("A profile is already running")
+            _active = self
+        self.started_at = time.time()
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+            self._sampler.start()
+        if seconds is not None:
+            self._timer = threading.Timer(seconds, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling (idempotent) and return the result."""
+        global _active
+        with _active_lock:
+            if _active is self:
+                if self.mode == "signal":
+                    signal.setitimer(signal.ITIMER_PROF, 0, 0)
+                else:
+                    self._stop.set()
+                _active = None
+                self.stopped_at = time.time()
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.cancel()
+        if self._sampler is not None and self._sampler is not threading.current_thread():
+            self._sampler.join(timeout=1)
+        return self.result()
+
+    @property
+    def running(self) -> bool:
+        return _active is self
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def result(self) -> Dict[str, Any]:
+        end = self.stopped_at or time.time()
+        return {
+            "mode": self.mode,
+            "interval": self.interval,
+            "running": self.running,
+            "samples": self.samples,
+            "duration": round(end - (self.started_at or end), 3),
+            "stacks": len(self.stacks),
+            "collapsed": self.collapsed(),
+        }
+
+
+def active() -> Optional[Profiler]:
+    """The running profile, if any."""
+    return _active
+
+
+@contextmanager
+def profiling(interval: float = config.PROFILER_INTERVAL_SECONDS, mode: str = "auto") -> Iterator[Profiler]:
+    """Profile the with-block; read the result from the yielded Profiler afterwards."""
+    profiler = Profiler(interval, mode).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def write_collapsed(result: Dict[str, Any], path: str):
+    """Write a result's collapsed stacks to `path` (creating parent directories)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(result["collapsed"])
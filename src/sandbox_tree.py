@@ -0,0 +1,182 @@
+"""
+Recursive tree listings for Project ME v0
+Sandbox tree listings with metadata, ETags from directory mtimes, and diffs between snapshots.
+
+Each directory's child names are cached against the directory's mtime, so
+an unchanged directory is not re-read with scandir. Files are still
+stat'ed on every scan: tools, shell commands and scripts edit files in
+place, which changes the file but not its directory. The ETag is a hash of
+every directory's mtime and every file's size and mtime, so it changes
+whenever anything in the tree does.
+
+Recent listings are kept by ETag, so a client can pass the ETag it last saw
+as `since` and get back only the entries that changed.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import config
+from .uploads import sha256_file
+
+Child = Tuple[str, bool]  # (name, is_dir)
+Stat = Tuple[bool, int, int]  # (is_dir, size, mtime_ns)
+
+
+class TreeTooLargeError(ValueError):
+    """Raised when a subtree has more than config.TREE_MAX_ENTRIES entries."""
+
+
+class TreeLister:
+    """Recursive listings of one base directory, with per-directory and snapshot caches."""
+
+    def __init__(self, base_dir: Path, skip_names: Iterable[str] = (),
+                 max_snapshots: int = config.TREE_SNAPSHOT_MAX,
+                 max_entries: int = config.TREE_MAX_ENTRIES):
+        self.base_dir = Path(base_dir)
+        self.skip_names = set(skip_names)
+        self.max_snapshots = max_snapshots
+        self.max_entries = max_entries
+        self._dirs: Dict[str, Tuple[int, List[Child]]] = {}  # abs dir -> (mtime_ns, children)
+        self._snapshots: "OrderedDict[str, Dict[str, Stat]]" = OrderedDict()
+        # abs file -> ((size, mtime_ns, inode), sha256); pruned to existing files by scan()
+        self._hashes: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def _children(self, path: str, mtime_ns: int) -> List[Child]:
+        cached = self._dirs.get(path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+
+        children = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name in self.skip_names:
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                children.append((entry.name, is_dir))
+        children.sort()
+        self._dirs[path] = (mtime_ns, children)
+        return children
+
+    def scan(self, rel_path: str = "") -> Tuple[str, Dict[str, Stat]]:
+        """
+        List everything under `rel_path`.
+
+        Returns:
+            (etag, {relative path: (is_dir, size, mtime_ns)})
+        """
+        root = os.path.join(self.base_dir, rel_path) if rel_path else str(self.base_dir)
+        etag_hash = hashlib.sha1(rel_path.encode("utf-8"))
+        entries: Dict[str, Stat] = {}
+        seen_dirs = set()
+
+        with self._lock:
+            stack = [("", root)]
+            while stack:
+                rel, full = stack.pop()
+                try:
+                    mtime_ns = os.stat(full).st_mtime_ns
+                    children = self._children(full, mtime_ns)
+                except OSError:
+                    continue
+                seen_dirs.add(full)
+                if rel:
+                    entries[rel] = (True, 0, mtime_ns)  # The parent's cached child mtime may be stale
+                etag_hash.update(f"{rel}\0{mtime_ns}\n".encode("utf-8"))
+
+                for name, is_dir in children:
+                    child_rel = f"{rel}/{name}" if rel else name
+                    if is_dir:
+                        stack.append((child_rel, os.path.join(full, name)))
+                        continue
+                    try:
+                        st = os.lstat(os.path.join(full, name))  # Fresh: in-place edits leave the dir alone
+                    except OSError:
+                        continue
+                    entries[child_rel] = (False, st.st_size, st.st_mtime_ns)
+                    etag_hash.update(f"{child_rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+                if len(entries) > self.max_entries:
+                    raise TreeTooLargeError(
+                        f"More than {self.max_entries} entries under {rel_path or '/'}; list a subdirectory")
+
+            # Forget cached directories under this root that no longer exist
+            prefix = root.rstrip(os.sep) + os.sep
+            for path in [p for p in self._dirs if p.startswith(prefix) and p not in seen_dirs]:
+                del self._dirs[path]
+            # ...and hashes of files that are gone
+            for path in [p for p in list(self._hashes) if p.startswith(prefix)
+                         and os.path.relpath(p, root).replace(os.sep, "/") not in entries]:
+                del self._hashes[path]
+
+            etag = etag_hash.hexdigest()[:20]
+            self._snapshots[etag] = entries
+            self._snapshots.move_to_end(etag)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+
+        return etag, entries
+
+    def file_hash(self, path: str) -> str:
+        """SHA-256 of a file, cached until a fresh stat shows a different size, mtime or inode."""
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        digest = sha256_file(path)
+        self._hashes[path] = (stamp, digest)
+        return digest
+
+    def _entry(self, root: str, rel: str, stat: Stat, hashes: bool) -> Dict[str, Any]:
+        is_dir, size, mtime_ns = stat
+        entry: Dict[str, Any] = {"path": rel, "type": "dir" if is_dir else "file", "mtime": mtime_ns / 1e9}
+        if not is_dir:
+            entry["size"] = size
+            if hashes:
+                try:
+                    entry["sha256"] = self.file_hash(os.path.join(root, rel))
+                except OSError:
+                    entry["sha256"] = None
+        return entry
+
+    def listing(self, rel_path: str = "", hashes: bool = False, since: Optional[str] = None,
+                scanned: Optional[Tuple[str, Dict[str, Stat]]] = None) -> Dict[str, Any]:
+        """
+        Recursive listing of `rel_path`, optionally as a diff against an earlier ETag.
+
+        Args:
+            rel_path: Directory relative to the base directory
+            hashes: Include a sha256 for every (changed) file
+            since: ETag of an earlier listing of the same directory
+            scanned: The result of scan(rel_path) if the caller already has it (no second walk)
+
+        Returns:
+            Dict with keys: etag, full (False for a diff), entries, removed (diffs only)
+        """
+        root = os.path.join(self.base_dir, rel_path) if rel_path else str(self.base_dir)
+        with self._lock:
+            previous = self._snapshots.get(since) if since else None
+        etag, entries = scanned if scanned is not None else self.scan(rel_path)
+
+        if previous is None:
+            return {
+                "etag": etag,
+                "full": True,
+                "entries": [self._entry(root, rel, stat, hashes) for rel, stat in sorted(entries.items())],
+            }
+
+        changed = [rel for rel, stat in entries.items() if previous.get(rel) != stat]
+        removed = [rel for rel in previous if rel not in entries]
+        return {
+            "etag": etag,
+            "full": False,
+            "entries": [self._entry(root, rel, entries[rel], hashes) for rel in sorted(changed)],
+            "removed": sorted(removed),
+        }
@@ -0,0 +1,362 @@
+"""
+Python script pool for Project ME v0
+Pre-started worker processes that run scripts in-process via runpy.
+
+Spawning `python script.py` (through PowerShell) costs one or two interpreter
+startups per call. The pool keeps warm workers around instead: each worker
+runs scripts with `runpy.run_path`, captures stdout/stderr at the file
+descriptor level, and is recycled after a fixed number of runs so state
+leaked by scripts (imported modules, globals, open handles) cannot pile up.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import runpy
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from . import config
+
+logger = logging.getLogger("project_me.script_pool")
+
+_SPAWN_ATTEMPTS = 3
+_SPAWN_BACKOFF_SECONDS = 0.5  # Doubled after each failed attempt
+
+
+class PoolUnavailableError(RuntimeError):
+    """Raised when no worker can take a script (none could be started, or none freed up in time)."""
+
+
+def _apply_memory_limit(memory_limit_mb: int):
+    """Cap the worker's address space (POSIX only, best effort)."""
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return  # Not available on Windows
+
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _run_script(script_path: str, args: List[str], cwd: Optional[str]) -> Dict[str, Any]:
+    """Run one script inside the current (worker) process and capture its output."""
+    saved_argv = sys.argv
+    saved_path = list(sys.path)
+    saved_cwd = os.getcwd()
+    saved_modules = set(sys.modules)
+
+    out_file = tempfile.TemporaryFile()
+    err_file = tempfile.TemporaryFile()
+
+    for stream in (sys.stdout, sys.stderr):
+        if stream:
+            stream.flush()
+    saved_stdout_fd = os.dup(1)
+    saved_stderr_fd = os.dup(2)
+    os.dup2(out_file.fileno(), 1)
+    os.dup2(err_file.fileno(), 2)
+
+    exit_code = 0
+    try:
+        if cwd:
+            os.chdir(cwd)
+        sys.argv = [script_path] + list(args)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script_path)))
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            if stream:
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+        os.dup2(saved_stdout_fd, 1)
+        os.dup2(saved_stderr_fd, 2)
+        os.close(saved_stdout_fd)
+        os.close(saved_stderr_fd)
+
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+        os.chdir(saved_cwd)
+        # Drop modules imported by the script so the next run re-imports them fresh
+        for name in set(sys.modules) - saved_modules:
+            del sys.modules[name]
+
+    out_file.seek(0)
+    err_file.seek(0)
+    stdout = out_file.read().decode("utf-8", errors="replace")
+    stderr = err_file.read().decode("utf-8", errors="replace")
+    out_file.close()
+    err_file.close()
+
+    return {"stdout": stdout, "stderr": stderr, "exit_code": exit_code}
+
+
+def _worker_main(conn, memory_limit_mb: int):
+    """Worker loop: receive (script_path, args, cwd) jobs until told to stop."""
+    _apply_memory_limit(memory_limit_mb)
+
+    # Scripts must never block on the parent's stdin
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        conn.send(_run_script(*job))
+
+
+class _Worker:
+    """Handle for one worker process."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.runs = 0
+
+    def stop(self, graceful: bool = True):
+        """Stop the worker process and close its pipe."""
+        try:
+            if graceful and self.process.is_alive():
+                self.conn.send(None)
+                self.process.join(timeout=2)
+        except (OSError, BrokenPipeError):
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=2)
+        self.conn.close()
+
+
+class PythonScriptPool:
+    """
+    Fixed-size pool of warm Python workers for running scripts.
+
+    Workers are started on first use. A run that exceeds its timeout kills
+    the worker; a worker that reaches `max_runs_per_worker` is retired. In
+    both cases a replacement is started in the background, retrying with
+    backoff; if that keeps failing the pool shrinks by one. run() raises
+    PoolUnavailableError instead of waiting forever when no worker is left
+    or none frees up within `acquire_timeout`.
+    """
+
+    def __init__(
+        self,
+        size: int = config.PYTHON_POOL_SIZE,
+        max_runs_per_worker: int = config.PYTHON_POOL_MAX_RUNS_PER_WORKER,
+        memory_limit_mb: int = config.PYTHON_SCRIPT_MEMORY_LIMIT_MB,
+        acquire_timeout: float = config.PYTHON_POOL_ACQUIRE_TIMEOUT_SECONDS
+    ):
+        self.size = max(1, size)
+        self.max_runs_per_worker = max(1, max_runs_per_worker)
+        self.memory_limit_mb = memory_limit_mb
+        self.acquire_timeout = acquire_timeout
+
+        # forkserver forks workers from a clean single-threaded server process,
+        # which is safe even when the caller (e.g. the runner) has threads.
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
+        self._ctx = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._ctx.set_forkserver_preload([__name__])
+
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._live = 0  # Workers running or being replaced; lost slots are subtracted
+
+    def _spawn_worker(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_limit_mb),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _spawn_with_retry(self) -> Optional[_Worker]:
+        """Start a worker, retrying with backoff; None if every attempt failed."""
+        delay = _SPAWN_BACKOFF_SECONDS
+        for attempt in range(1, _SPAWN_ATTEMPTS + 1):
+            try:
+                return self._spawn_worker()
+            except Exception:
+                logger.warning("[ScriptPool] Starting a worker failed (attempt %d/%d)",
+                               attempt, _SPAWN_ATTEMPTS, exc_info=True)
+            if attempt < _SPAWN_ATTEMPTS and not self._closed:
+                time.sleep(delay)
+                delay *= 2
+        return None
+
+    def _replace_worker(self, worker: _Worker, graceful: bool):
+        """Stop a worker and put a fresh one into the idle queue (or give up its slot)."""
+        worker.stop(graceful=graceful)
+        if self._closed:
+            return
+        replacement = self._spawn_with_retry()
+        if replacement is None:
+            with self._lock:
+                self._live -= 1
+            logger.error("[ScriptPool] Could not replace a worker; pool is down to %d", self._live)
+            return
+        if self._closed:
+            replacement.stop()
+        else:
+            self._idle.put(replacement)
+
+    def _recycle(self, worker: _Worker, graceful: bool = True):
+        threading.Thread(
+            target=self._replace_worker,
+            args=(worker, graceful),
+            daemon=True
+        ).start()
+
+    def start(self):
+        """Start all workers (no-op if already started)."""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                try:
+                    self._idle.put(self._spawn_worker())
+                    self._live += 1
+                except Exception:
+                    logger.warning("[ScriptPool] Starting a worker failed", exc_info=True)
+            self._started = True
+        if not self._live:
+            raise PoolUnavailableError("No Python worker could be started")
+
+    @property
+    def live_workers(self) -> int:
+        return self._live
+
+    def _acquire(self) -> _Worker:
+        """Take an idle worker, giving up when none is left or `acquire_timeout` passes."""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            if self._live <= 0:
+                raise PoolUnavailableError("No Python workers are running (they could not be restarted)")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolUnavailableError(f"No Python worker became free within {self.acquire_timeout} seconds")
+            try:
+                return self._idle.get(timeout=min(0.5, remaining))
+            except queue.Empty:
+                continue
+
+    def run(
+        self,
+        script_path: str,
+        args: Optional[List[str]] = None,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = config.PYTHON_SCRIPT_TIMEOUT_SECONDS
+    ) -> Dict[str, Any]:
+        """
+        Run a script on a pool worker.
+
+        Args:
+            script_path: Path to the Python script
+            args: Optional list of command-line arguments
+            cwd: Optional working directory for the run
+            timeout: Seconds before the worker is killed (None = no limit)
+
+        Returns:
+            Dict with keys: stdout (str), stderr (str), exit_code (int), timed_out (bool)
+
+        Raises:
+            PoolUnavailableError: No worker could take the script
+        """
+        if self._closed:
+            raise PoolUnavailableError("Python script pool is shut down")
+        self.start()
+
+        job = (str(script_path), [str(a) for a in (args or [])], cwd)
+        worker = self._acquire()
+
+        try:
+            worker.conn.send(job)
+            if not worker.conn.poll(timeout):
+                self._recycle(worker, graceful=False)
+                return {
+                    "stdout": "",
+                    "stderr": f"Script timed out after {timeout} seconds",
+                    "exit_code": -1,
+                    "timed_out": True
+                }
+            result = worker.conn.recv()
+        except (EOFError, OSError):
+            # Worker died mid-run (crash, memory limit, killed externally)
+            worker.process.join(timeout=1)
+            exit_code = worker.process.exitcode
+            self._recycle(worker, graceful=False)
+            return {
+                "stdout": "",
+                "stderr": f"Python worker exited unexpectedly (exit code {exit_code})",
+                "exit_code": -1,
+                "timed_out": False
+            }
+
+        worker.runs += 1
+        if self._closed:
+            worker.stop()
+        elif worker.runs >= self.max_runs_per_worker:
+            self._recycle(worker)
+        else:
+            self._idle.put(worker)
+
+        result["timed_out"] = False
+        return result
+
+    def shutdown(self):
+        """Stop all idle workers. Busy workers are stopped when released."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+_pool: Optional[PythonScriptPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_script_pool() -> PythonScriptPool:
+    """Return the process-wide script pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PythonScriptPool()
+            atexit.register(_pool.shutdown)
+        return _pool
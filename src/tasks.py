@@ -1,16 +1,47 @@
 """
 Task management for Project ME v0
 Dataclass definitions and JSONL persistence.
+
+Lines are encoded through codec.py (orjson/msgspec when installed), with
+the payload/result/trace blobs written last so filtered scans can decode
+just the scalar fields and build Task objects only for matching lines.
+Bulk writes (create_tasks / append_tasks) serialize the whole batch into
+one buffer and write it with a single call. TaskStore keeps an id -> byte
+offset index of the file, built on the first lookup and extended once per
+batch, so get_task_by_id reads one line instead of parsing the file.
+
+Task is the working object for single tasks. Bulk reads that only look at
+a large set (stats, listings) can use load_task_records() instead, which
+returns compact TaskRecord views with the blobs left undecoded.
 """
 import json
+import os
+import re
+import sys
 import uuid
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional, List
+from typing import Any, Dict, Iterable, Iterator, Optional, List, Tuple
 from enum import Enum
 
-from . import config
+from . import codec, config, tracing
+
+# A task line starts with its id (Task.to_dict() keeps field order)
+_ID_PREFIX = re.compile(rb'\{"id":\s*"([^"]+)"')
+
+# JSON blobs written after the scalar fields (see codec.split_line)
+TASK_BLOB_FIELDS = ("payload", "result", "trace")
+
+
+def _new_ids(count: int) -> List[str]:
+    """`count` random (version 4) UUID strings from a single urandom call, formatted without uuid.UUID."""
+    raw = bytearray(os.urandom(16 * count))
+    raw[6::16] = bytes((b & 0x0F) | 0x40 for b in raw[6::16])  # Version 4
+    raw[8::16] = bytes((b & 0x3F) | 0x80 for b in raw[8::16])  # RFC 4122 variant
+    h = raw.hex()
+    return [f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+            for i in range(0, 32 * count, 32)]
 
 
 class TaskStatus(Enum):
@@ -40,20 +71,51 @@ class Task:
     error: Optional[str] = None
     title: Optional[str] = None  # v0.1: Human-readable label
     tags: List[str] = field(default_factory=list)  # v0.1: Categorization tags
+    trace: Optional[dict] = None  # Span trace of the last run (see tracing.py)
 
     def to_dict(self) -> dict:
-        """Convert task to dictionary."""
-        return asdict(self)
+        """
+        Convert task to dictionary (scalars first, blobs last).
+
+        Shallow: payload/result/trace are the task's own objects, not copies.
+        """
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "error": self.error,
+            "title": self.title,
+            "tags": self.tags,
+            "payload": self.payload,
+            "result": self.result,
+            "trace": self.trace,
+        }
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Task':
-        """Create task from dictionary. Backward compatible with v0 tasks."""
-        # Ensure backward compatibility - handle missing v0.1 fields
-        if 'title' not in data:
-            data['title'] = None
-        if 'tags' not in data:
-            data['tags'] = []
-        return cls(**data)
+        """Create task from dictionary (not modified). Backward compatible with v0 tasks."""
+        get = data.get
+        return cls(
+            id=data["id"],
+            type=data["type"],
+            payload=data["payload"],
+            status=get("status", TaskStatus.PENDING.value),
+            created_at=get("created_at") or datetime.utcnow().isoformat(),
+            updated_at=get("updated_at") or datetime.utcnow().isoformat(),
+            result=get("result"),
+            error=get("error"),
+            # v0.1+ fields may be missing in older files
+            title=get("title"),
+            tags=get("tags") or [],
+            trace=get("trace"),
+        )
+
+    @classmethod
+    def from_parts(cls, header: dict, blobs: codec.LazyBlobs) -> 'Task':
+        """Create task from a codec.split_line() result (decodes the blobs)."""
+        return cls.from_dict({**header, **blobs.values()})
 
     def update_status(self, status: TaskStatus, result: Optional[dict] = None, error: Optional[str] = None):
         """Update task status and timestamp."""
@@ -65,6 +127,87 @@ class Task:
             self.error = error
 
 
+class TaskRecord:
+    """
+    Compact read-only view of a stored task, for bulk reads (see TaskStore.load_task_records).
+
+    Holds the scalar fields in __slots__ with status/type/tags interned,
+    timestamps packed to integers (codec.pack_timestamp), and payload,
+    result and trace kept as the line's raw JSON bytes. Those three are
+    decoded on every access; call to_task() for a regular, mutable Task.
+    """
+
+    __slots__ = ("id", "type", "status", "title", "tags", "error", "_created", "_updated", "_blobs")
+
+    def __init__(self, header: dict, blobs: codec.LazyBlobs, tag_sets: Optional[Dict[tuple, tuple]] = None):
+        get = header.get
+        self.id = header["id"]
+        self.type = sys.intern(header["type"])
+        status = get("status") or TaskStatus.PENDING.value
+        self.status = sys.intern(status) if type(status) is str else status
+        self.title = get("title")
+        tags = tuple(get("tags") or ())
+        # Records from one load share each distinct tag tuple
+        shared = tag_sets.get(tags) if tag_sets is not None else None
+        if shared is None:
+            shared = tuple(sys.intern(t) if type(t) is str else t for t in tags)
+            if tag_sets is not None:
+                tag_sets[tags] = shared
+        self.tags = shared
+        self.error = get("error")
+        created, updated = get("created_at"), get("updated_at")
+        self._created = codec.pack_timestamp(created)
+        self._updated = self._created if updated == created else codec.pack_timestamp(updated)
+        self._blobs = blobs.raw()
+
+    @property
+    def created_at(self) -> Optional[str]:
+        return codec.unpack_timestamp(self._created)
+
+    @property
+    def updated_at(self) -> Optional[str]:
+        return codec.unpack_timestamp(self._updated)
+
+    def _blob_values(self) -> dict:
+        return codec.loads(self._blobs) if self._blobs else {}
+
+    @property
+    def payload(self) -> dict:
+        return self._blob_values().get("payload") or {}
+
+    @property
+    def result(self) -> Optional[dict]:
+        return self._blob_values().get("result")
+
+    @property
+    def trace(self) -> Optional[dict]:
+        return self._blob_values().get("trace")
+
+    def to_dict(self) -> dict:
+        """Same layout as Task.to_dict()."""
+        blobs = self._blob_values()
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "error": self.error,
+            "title": self.title,
+            "tags": list(self.tags),
+            "payload": blobs.get("payload") or {},
+            "result": blobs.get("result"),
+            "trace": blobs.get("trace"),
+        }
+
+    def to_task(self) -> Task:
+        """A full Task with its blobs decoded."""
+        return Task.from_dict(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"TaskRecord(id={self.id!r}, type={self.type!r}, status={self.status!r}, title={self.title!r})"
+
+
 class TaskStore:
     """JSONL-based task persistence."""
 
@@ -74,6 +217,47 @@ class TaskStore:
         # Ensure file exists
         if not self.filepath.exists():
             self.filepath.touch()
+        # id -> byte offset of the task's line; valid while the file matches _index_stat
+        self._index: Optional[Dict[str, int]] = None
+        self._index_stat: Optional[Tuple[int, int]] = None
+
+    def _file_stat(self) -> Tuple[int, int]:
+        st = os.stat(self.filepath)
+        return st.st_size, st.st_mtime_ns
+
+    def _ensure_index(self) -> Dict[str, int]:
+        """The id -> offset index, rebuilt if the file changed behind our back."""
+        if self._index is not None and self._index_stat == self._file_stat():
+            return self._index
+        index: Dict[str, int] = {}
+        offset = 0
+        with open(self.filepath, 'rb') as f:
+            for line in f:
+                match = _ID_PREFIX.match(line)
+                if match:
+                    index[match.group(1).decode("utf-8")] = offset
+                elif line.strip():
+                    try:
+                        index[json.loads(line)["id"]] = offset
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                offset += len(line)
+            self._index_stat = (offset, os.fstat(f.fileno()).st_mtime_ns)
+        self._index = index
+        return index
+
+    def _index_appended(self, start: int, end: int, entries: List[Tuple[str, int]]):
+        """Record tasks appended at [start, end) if nobody else wrote to the file around the append."""
+        if self._index is None or self._index_stat is None or self._index_stat[0] != start:
+            self._index = None  # Someone else wrote too; rebuild on next lookup
+            return
+        stat = self._file_stat()
+        if stat[0] != end:
+            self._index = None
+            return
+        for task_id, offset in entries:
+            self._index[task_id] = offset
+        self._index_stat = stat
 
     def create_task(self, task_type: str, payload: dict, title: Optional[str] = None, tags: Optional[List[str]] = None) -> Task:
         """Create a new task and persist it."""
@@ -87,53 +271,139 @@ class TaskStore:
         self._append_task(task)
         return task
 
+    def create_tasks(self, specs: Iterable[dict], fsync: bool = True) -> List[Task]:
+        """
+        Create and persist many tasks with one file open and one write call.
+
+        Args:
+            specs: Dicts with "type" and optional "payload", "title", "tags"
+            fsync: Flush the batch to disk before returning
+
+        Returns:
+            The created tasks, in order
+        """
+        specs = list(specs)
+        now = datetime.utcnow().isoformat()
+        tasks = [
+            Task(
+                id=task_id,
+                type=spec["type"],
+                payload=spec.get("payload") or {},
+                created_at=now,
+                updated_at=now,
+                title=spec.get("title"),
+                tags=list(spec.get("tags") or []),
+            )
+            for task_id, spec in zip(_new_ids(len(specs)), specs)
+        ]
+        self.append_tasks(tasks, fsync=fsync)
+        return tasks
+
     def _append_task(self, task: Task):
         """Append a task to the JSONL file."""
-        with open(self.filepath, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(task.to_dict()) + '\n')
+        self.append_tasks([task], fsync=False)
+
+    def append_tasks(self, tasks: Iterable[Task], fsync: bool = True) -> int:
+        """
+        Append many tasks: the batch is serialized into one buffer and written with a single call.
+
+        Args:
+            tasks: Tasks to persist, in order
+            fsync: Flush the batch to disk before returning
+
+        Returns:
+            Number of tasks written
+        """
+        lines = []
+        entries = []
+        size = 0
+        for task in tasks:
+            line = codec.encode_line(task.to_dict())
+            entries.append((task.id, size))
+            lines.append(line)
+            size += len(line)
+        if not lines:
+            return 0
+
+        with open(self.filepath, 'ab') as f:
+            start = f.seek(0, os.SEEK_END)
+            f.write(b"".join(lines))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._index_appended(start, start + size, [(task_id, start + offset) for task_id, offset in entries])
+        return len(lines)
 
     def update_task(self, task: Task):
         """Update an existing task by rewriting the file."""
-        tasks = self.load_all_tasks()
-        with open(self.filepath, 'w', encoding='utf-8') as f:
-            for t in tasks:
-                if t.id == task.id:
-                    f.write(json.dumps(task.to_dict()) + '\n')
-                else:
-                    f.write(json.dumps(t.to_dict()) + '\n')
+        with tracing.span("persist"):
+            tasks = self.load_all_tasks()
+            with open(self.filepath, 'wb') as f:
+                f.write(b"".join(codec.encode_line((task if t.id == task.id else t).to_dict()) for t in tasks))
+            self._index = None  # Offsets moved
 
-    def load_all_tasks(self) -> List[Task]:
-        """Load all tasks from JSONL file."""
-        tasks = []
+    def iter_tasks(self) -> Iterator[Task]:
+        """Yield tasks in file order as they are read (nothing is kept in memory)."""
         if not self.filepath.exists():
-            return tasks
+            return
 
-        with open(self.filepath, 'r', encoding='utf-8') as f:
+        with open(self.filepath, 'rb') as f:
             for line in f:
-                line = line.strip()
-                if line:
+                if line.strip():
                     try:
-                        data = json.loads(line)
-                        tasks.append(Task.from_dict(data))
-                    except json.JSONDecodeError:
+                        data = codec.loads(line)
+                    except codec.DECODE_ERRORS:
                         continue
-        return tasks
+                    yield Task.from_dict(data)
+
+    def iter_task_headers(self, needles: Iterable[Optional[bytes]] = (),
+                          min_bytes: int = codec.LAZY_MIN_BYTES) -> Iterator[Tuple[dict, codec.LazyBlobs]]:
+        """
+        Yield (scalar fields, undecoded blobs) per task, in file order.
+
+        Args:
+            needles: codec.needle() byte strings; lines missing any of them are skipped undecoded
+            min_bytes: Shorter lines are decoded in full (see codec.split_line)
+        """
+        if not self.filepath.exists():
+            return
+
+        needles = [n for n in needles if n]
+        with open(self.filepath, 'rb') as f:
+            for line in f:
+                if needles and not all(n in line for n in needles):
+                    continue
+                if line.strip():
+                    try:
+                        yield codec.split_line(line, TASK_BLOB_FIELDS, ("status",), min_bytes)
+                    except codec.DECODE_ERRORS:
+                        continue
+
+    def load_all_tasks(self) -> List[Task]:
+        """Load all tasks from JSONL file."""
+        return list(self.iter_tasks())
 
     def get_next_pending_task(self) -> Optional[Task]:
         """Get the next pending task (FIFO order)."""
-        tasks = self.load_all_tasks()
-        for task in tasks:
-            if task.status == TaskStatus.PENDING.value:
-                return task
-        return None
+        return next(self.iter_tasks_filtered(status=TaskStatus.PENDING.value), None)
 
     def get_task_by_id(self, task_id: str) -> Optional[Task]:
-        """Retrieve a specific task by ID."""
-        tasks = self.load_all_tasks()
-        for task in tasks:
-            if task.id == task_id:
-                return task
-        return None
+        """Retrieve a specific task by ID (one line read through the offset index)."""
+        offset = self._ensure_index().get(task_id)
+        if offset is None:
+            return None
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            line = f.readline()
+        try:
+            data = codec.loads(line)
+        except codec.DECODE_ERRORS:
+            data = None
+        if not data or data.get("id") != task_id:
+            # The file was rewritten without changing size/mtime; fall back to a scan
+            self._index = None
+            return next((t for t in self.iter_tasks() if t.id == task_id), None)
+        return Task.from_dict(data)
 
     def get_recent_tasks(self, limit: int = 10) -> List[Task]:
         """Get the most recent tasks."""
@@ -142,30 +412,60 @@ class TaskStore:
 
     def get_tasks_by_status(self, status: str) -> List[Task]:
         """Get all tasks with a specific status. (v0.1)"""
-        tasks = self.load_all_tasks()
-        return [t for t in tasks if t.status == status]
+        return list(self.iter_tasks_filtered(status=status))
 
     def get_tasks_by_type(self, task_type: str) -> List[Task]:
         """Get all tasks of a specific type. (v0.1)"""
-        tasks = self.load_all_tasks()
-        return [t for t in tasks if t.type == task_type]
+        return list(self.iter_tasks_filtered(task_type=task_type))
 
     def get_tasks_by_tag(self, tag: str) -> List[Task]:
         """Get all tasks that have a specific tag. (v0.1)"""
-        tasks = self.load_all_tasks()
-        return [t for t in tasks if tag in t.tags]
+        return list(self.iter_tasks_filtered(tag=tag))
+
+    def _iter_matching_headers(self, status: Optional[str], task_type: Optional[str], tag: Optional[str],
+                               min_bytes: int = codec.LAZY_MIN_BYTES) -> Iterator[Tuple[dict, codec.LazyBlobs]]:
+        needles = (codec.needle(status), codec.needle(task_type), codec.needle(tag))
+        for header, blobs in self.iter_task_headers(needles, min_bytes):
+            if status and header.get("status") != status:
+                continue
+            if task_type and header.get("type") != task_type:
+                continue
+            if tag and tag not in (header.get("tags") or []):
+                continue
+            yield header, blobs
+
+    def iter_tasks_filtered(self, status: Optional[str] = None, task_type: Optional[str] = None,
+                            tag: Optional[str] = None) -> Iterator[Task]:
+        """Yield matching tasks in file order as they are found (blobs are decoded for matches only)."""
+        for header, blobs in self._iter_matching_headers(status, task_type, tag):
+            yield Task.from_parts(header, blobs)
+
+    def iter_task_records(self, status: Optional[str] = None, task_type: Optional[str] = None,
+                          tag: Optional[str] = None) -> Iterator[TaskRecord]:
+        """Yield matching tasks as compact TaskRecords, in file order (blobs are never decoded)."""
+        tag_sets: Dict[tuple, tuple] = {}
+        for header, blobs in self._iter_matching_headers(status, task_type, tag, min_bytes=0):
+            yield TaskRecord(header, blobs, tag_sets)
+
+    def load_task_records(self, status: Optional[str] = None, task_type: Optional[str] = None,
+                          tag: Optional[str] = None) -> List[TaskRecord]:
+        """
+        Load tasks as compact TaskRecords: a fraction of load_all_tasks()'s memory for large files.
+
+        Args:
+            status: Only tasks with this status
+            task_type: Only tasks of this type
+            tag: Only tasks with this tag
+
+        Returns:
+            Matching records in file order
+        """
+        return list(self.iter_task_records(status, task_type, tag))
 
     def get_tasks_filtered(self, status: Optional[str] = None, task_type: Optional[str] = None,
                           tag: Optional[str] = None, limit: Optional[int] = None) -> List[Task]:
         """Get tasks with multiple filters applied. (v0.1)"""
-        tasks = self.load_all_tasks()
-
-        if status:
-            tasks = [t for t in tasks if t.status == status]
-        if task_type:
-            tasks = [t for t in tasks if t.type == task_type]
-        if tag:
-            tasks = [t for t in tasks if tag in t.tags]
+        tasks = list(self.iter_tasks_filtered(status=status, task_type=task_type, tag=tag))
 
         # Return newest first
         tasks.reverse()
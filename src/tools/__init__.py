@@ -1,33 +1,237 @@
 """
 Tools package for Project ME v0
 Registry and loader for all available tools.
+
+Each tool is described by a ToolSpec: the callable plus its JSON schema
+(derived from the signature, type hints and docstring), a cost class that
+tells the scheduler which executor to use, and side-effect flags.
+
+Every call through get_tool() is recorded as one TOOL_SPAN event (see
+spans.py). Read-only tools can declare memoize="global" or "task" (see
+memo.py); repeated calls are then served from a cache validated against
+the files named in `path_args`.
+
+Tool modules are imported lazily. Built-in tools are listed in
+_TOOL_MANIFEST (tool name -> module); third-party tools can be added through
+the "project_me.tools" entry point group, where each entry point is named
+after the tool and points either at a module that registers it or at the
+tool function itself. list_tools() never imports a tool module.
 """
-from typing import Dict, Callable, Any
+import importlib
+import inspect
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Callable, Any, List, Optional, Tuple, get_type_hints
+
+from .. import metrics
+from . import memo, spans
+
+COST_CLASSES = ("cpu", "io", "llm")
+ENTRY_POINT_GROUP = "project_me.tools"
+
+# Built-in tools: tool name -> module (relative to this package)
+_TOOL_MANIFEST: Dict[str, str] = {
+    "run_shell_command": "shell_tools",
+    "run_python_script": "shell_tools",
+    "read_file": "fs_tools",
+    "write_file": "fs_tools",
+    "list_directory": "fs_tools",
+    "append_file": "fs_tools",
+}
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
+_HIDDEN_PARAMS = {"task_id"}  # Filled in by the agent, never by the model
+
+
+@dataclass
+class ToolSpec:
+    """A registered tool and what the scheduler needs to know about it."""
+    name: str
+    func: Callable
+    cost_class: str = "io"  # "cpu" | "io" | "llm": which executor the call belongs on
+    read_only: bool = False  # True if the tool never changes anything (safe to run concurrently)
+    side_effects: Tuple[str, ...] = ()  # e.g. ("fs_write",), ("process",)
+    memoize: Optional[str] = None  # None, "global" or "task" (see memo.py)
+    path_args: Tuple[str, ...] = ()  # Arguments naming files the tool reads or writes
+    _schema: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    _call: Optional[Callable] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.cost_class not in COST_CLASSES:
+            raise ValueError(f"Unknown cost class for {self.name}: {self.cost_class}")
+        if self.memoize is not None and self.memoize not in memo.MEMO_SCOPES:
+            raise ValueError(f"Unknown memoize scope for {self.name}: {self.memoize}")
+        if self.memoize and not self.read_only:
+            raise ValueError(f"Only read-only tools can be memoized: {self.name}")
 
-# Tool registry: maps tool names to callable functions
-TOOL_REGISTRY: Dict[str, Callable] = {}
+    @property
+    def parameters(self) -> List[str]:
+        return list(inspect.signature(self.func).parameters)
 
+    @property
+    def call(self) -> Callable:
+        """The callable handed out by get_tool(): traced, and memoized/invalidating as declared."""
+        if self._call is None:
+            self._call = spans.traced(self, memo.wrap(self))
+        return self._call
 
-def register_tool(name: str):
+    @property
+    def schema(self) -> Dict[str, Any]:
+        """OpenAI-style function definition (built on first use)."""
+        if self._schema is None:
+            self._schema = _build_schema(self.name, self.func)
+        return self._schema
+
+    def __call__(self, *args, **kwargs):
+        return self.call(*args, **kwargs)
+
+
+# Tool registry: maps tool names to specs of loaded tools
+TOOL_REGISTRY: Dict[str, ToolSpec] = {}
+
+_load_lock = threading.RLock()
+_entry_points: Optional[Dict[str, Any]] = None
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_queue_depth = metrics.gauge("tool_executor_queue_depth", "Tool calls waiting for an executor thread", ["cost_class"])
+
+
+def register_tool(name: str, cost_class: str = "io", read_only: bool = False,
+                  side_effects: Tuple[str, ...] = (), memoize: Optional[str] = None,
+                  path_args: Tuple[str, ...] = ()):
     """Decorator to register a tool function."""
     def decorator(func: Callable):
-        TOOL_REGISTRY[name] = func
+        TOOL_REGISTRY[name] = ToolSpec(name, func, cost_class, read_only, tuple(side_effects),
+                                       memoize, tuple(path_args))
         return func
     return decorator
 
 
-def get_tool(name: str) -> Callable:
-    """Get a tool function by name."""
+def _discover_entry_points() -> Dict[str, Any]:
+    """Tools advertised by installed packages (looked up once)."""
+    global _entry_points
+    if _entry_points is None:
+        from importlib.metadata import entry_points
+        try:
+            found = entry_points(group=ENTRY_POINT_GROUP)
+        except TypeError:  # Python < 3.10
+            found = entry_points().get(ENTRY_POINT_GROUP, [])
+        _entry_points = {ep.name: ep for ep in found}
+    return _entry_points
+
+
+def _load(name: str):
+    """Import whatever provides `name`, registering it."""
+    with _load_lock:
+        if name in TOOL_REGISTRY:
+            return
+        if name in _TOOL_MANIFEST:
+            importlib.import_module(f".{_TOOL_MANIFEST[name]}", __name__)
+            return
+        ep = _discover_entry_points().get(name)
+        if ep is not None:
+            obj = ep.load()
+            if name not in TOOL_REGISTRY and callable(obj):
+                TOOL_REGISTRY[name] = ToolSpec(name, obj)
+
+
+def get_tool_spec(name: str) -> ToolSpec:
+    """Get a tool's spec by name, importing its module on first use."""
+    if name not in TOOL_REGISTRY:
+        _load(name)
     if name not in TOOL_REGISTRY:
         raise ValueError(f"Unknown tool: {name}")
     return TOOL_REGISTRY[name]
 
 
+def get_tool(name: str) -> Callable:
+    """Get a tool function by name."""
+    return get_tool_spec(name).call
+
+
 def list_tools() -> list:
-    """List all registered tool names."""
-    return list(TOOL_REGISTRY.keys())
+    """List all available tool names (without importing any tool module)."""
+    names = dict.fromkeys(_TOOL_MANIFEST)
+    names.update(dict.fromkeys(TOOL_REGISTRY))
+    names.update(dict.fromkeys(_discover_entry_points()))
+    return list(names)
+
+
+def executor_for(spec: ToolSpec) -> ThreadPoolExecutor:
+    """Shared thread pool for a tool's cost class (sized by config.TOOL_EXECUTOR_WORKERS)."""
+    from .. import config
+
+    with _load_lock:
+        if spec.cost_class not in _executors:
+            _executors[spec.cost_class] = ThreadPoolExecutor(
+                max_workers=config.TOOL_EXECUTOR_WORKERS.get(spec.cost_class, 4),
+                thread_name_prefix=f"tool-{spec.cost_class}",
+            )
+            executor = _executors[spec.cost_class]
+            _queue_depth.labels(spec.cost_class).set_function(lambda: executor._work_queue.qsize())
+        return _executors[spec.cost_class]
+
+
+def _param_docs(doc: str) -> Dict[str, str]:
+    """Parse 'name: description' lines from a Google-style Args section."""
+    docs = {}
+    in_args = False
+    for line in doc.splitlines():
+        stripped = line.strip()
+        if stripped in ("Args:", "Arguments:"):
+            in_args = True
+            continue
+        if in_args:
+            if not stripped or stripped.endswith(":") and " " not in stripped:
+                if docs:
+                    break
+                continue
+            match = re.match(r"(\w+)(?:\s*\([^)]*\))?:\s*(.*)", stripped)
+            if match:
+                docs[match.group(1)] = match.group(2)
+    return docs
+
+
+def _build_schema(name: str, func: Callable) -> Dict[str, Any]:
+    doc = inspect.getdoc(func) or ""
+    param_docs = _param_docs(doc)
+    try:
+        hints = get_type_hints(func)
+    except Exception:
+        hints = {}
+
+    properties = {}
+    required = []
+    for param in inspect.signature(func).parameters.values():
+        if param.name in _HIDDEN_PARAMS:
+            continue
+        hint = hints.get(param.name, str)
+        origin = getattr(hint, "__origin__", hint)
+        prop = {"type": _JSON_TYPES.get(origin, "string")}
+        if param.name in param_docs:
+            prop["description"] = param_docs[param.name]
+        if prop["type"] == "array":
+            prop["items"] = {"type": "string"}
+        properties[param.name] = prop
+        if param.default is inspect.Parameter.empty:
+            required.append(param.name)
+
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": doc.split("\n\n")[0].strip(),
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        },
+    }
+
 
+def tool_schema(name: str) -> Dict[str, Any]:
+    """Describe a tool as an OpenAI-style function definition (from its signature and docstring)."""
+    return get_tool_spec(name).schema
 
-# Import tool modules to trigger registration
-from . import shell_tools, fs_tools
 
+def tool_schemas(names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Function definitions for the given tools (default: all available tools)."""
+    return [tool_schema(name) for name in (names or list_tools())]
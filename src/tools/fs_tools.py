@@ -1,17 +1,19 @@
 """
 Filesystem tools for Project ME v0
-File and directory operations with logging.
+File and directory operations (calls are logged as spans by the tool registry).
 """
 import os
 from pathlib import Path
 from typing import Dict, Any, List
 
-from .. import config
-from ..memory import memory, EventType
+from .. import config, metrics
 from . import register_tool
 
+_read_bytes = metrics.FILE_READ_BYTES.labels("tools")
+_write_bytes = metrics.FILE_WRITE_BYTES.labels("tools")
 
-@register_tool("read_file")
+
+@register_tool("read_file", read_only=True, memoize="global", path_args=("filepath",))
 def read_file(filepath: str, task_id: str = None) -> Dict[str, Any]:
     """
     Read the contents of a file.
@@ -23,12 +25,6 @@ def read_file(filepath: str, task_id: str = None) -> Dict[str, Any]:
     Returns:
         Dict with keys: success (bool), content (str), error (str or None)
     """
-    memory.log_event(
-        EventType.TOOL_CALLED,
-        data={"tool": "read_file", "filepath": filepath},
-        task_id=task_id
-    )
-
     try:
         path = Path(filepath)
         if not path.exists():
@@ -47,21 +43,12 @@ def read_file(filepath: str, task_id: str = None) -> Dict[str, Any]:
 
         with open(path, 'r', encoding='utf-8') as f:
             content = f.read()
+        _read_bytes.inc(len(content))
 
         # Truncate if too large
         if len(content) > config.MAX_TOOL_OUTPUT_LENGTH:
             content = content[:config.MAX_TOOL_OUTPUT_LENGTH] + "\n... [truncated]"
 
-        memory.log_event(
-            EventType.TOOL_RESULT,
-            data={
-                "tool": "read_file",
-                "success": True,
-                "content_length": len(content)
-            },
-            task_id=task_id
-        )
-
         return {
             "success": True,
             "content": content,
@@ -69,12 +56,6 @@ def read_file(filepath: str, task_id: str = None) -> Dict[str, Any]:
         }
 
     except Exception as e:
-        memory.log_event(
-            EventType.ERROR,
-            data={"tool": "read_file", "error": str(e)},
-            task_id=task_id
-        )
-
         return {
             "success": False,
             "content": "",
@@ -82,7 +63,7 @@ def read_file(filepath: str, task_id: str = None) -> Dict[str, Any]:
         }
 
 
-@register_tool("write_file")
+@register_tool("write_file", side_effects=("fs_write",), path_args=("filepath",))
 def write_file(filepath: str, content: str, task_id: str = None) -> Dict[str, Any]:
     """
     Write content to a file (overwrites existing content).
@@ -95,16 +76,6 @@ def write_file(filepath: str, content: str, task_id: str = None) -> Dict[str, An
     Returns:
         Dict with keys: success (bool), error (str or None)
     """
-    memory.log_event(
-        EventType.TOOL_CALLED,
-        data={
-            "tool": "write_file",
-            "filepath": filepath,
-            "content_length": len(content)
-        },
-        task_id=task_id
-    )
-
     try:
         path = Path(filepath)
         # Create parent directories if needed
@@ -112,16 +83,7 @@ def write_file(filepath: str, content: str, task_id: str = None) -> Dict[str, An
 
         with open(path, 'w', encoding='utf-8') as f:
             f.write(content)
-
-        memory.log_event(
-            EventType.TOOL_RESULT,
-            data={
-                "tool": "write_file",
-                "success": True,
-                "filepath": filepath
-            },
-            task_id=task_id
-        )
+        _write_bytes.inc(len(content))
 
         return {
             "success": True,
@@ -129,19 +91,13 @@ def write_file(filepath: str, content: str, task_id: str = None) -> Dict[str, An
         }
 
     except Exception as e:
-        memory.log_event(
-            EventType.ERROR,
-            data={"tool": "write_file", "error": str(e)},
-            task_id=task_id
-        )
-
         return {
             "success": False,
             "error": str(e)
         }
 
 
-@register_tool("list_directory")
+@register_tool("list_directory", read_only=True, memoize="global", path_args=("dirpath",))
 def list_directory(dirpath: str, task_id: str = None) -> Dict[str, Any]:
     """
     List contents of a directory.
@@ -153,12 +109,6 @@ def list_directory(dirpath: str, task_id: str = None) -> Dict[str, Any]:
     Returns:
         Dict with keys: success (bool), files (list), directories (list), error (str or None)
     """
-    memory.log_event(
-        EventType.TOOL_CALLED,
-        data={"tool": "list_directory", "dirpath": dirpath},
-        task_id=task_id
-    )
-
     try:
         path = Path(dirpath)
         if not path.exists():
@@ -186,17 +136,6 @@ def list_directory(dirpath: str, task_id: str = None) -> Dict[str, Any]:
             elif item.is_dir():
                 directories.append(item.name)
 
-        memory.log_event(
-            EventType.TOOL_RESULT,
-            data={
-                "tool": "list_directory",
-                "success": True,
-                "file_count": len(files),
-                "dir_count": len(directories)
-            },
-            task_id=task_id
-        )
-
         return {
             "success": True,
             "files": sorted(files),
@@ -205,12 +144,6 @@ def list_directory(dirpath: str, task_id: str = None) -> Dict[str, Any]:
         }
 
     except Exception as e:
-        memory.log_event(
-            EventType.ERROR,
-            data={"tool": "list_directory", "error": str(e)},
-            task_id=task_id
-        )
-
         return {
             "success": False,
             "files": [],
@@ -219,7 +152,7 @@ def list_directory(dirpath: str, task_id: str = None) -> Dict[str, Any]:
         }
 
 
-@register_tool("append_file")
+@register_tool("append_file", side_effects=("fs_write",), path_args=("filepath",))
 def append_file(filepath: str, content: str, task_id: str = None) -> Dict[str, Any]:
     """
     Append content to a file.
@@ -232,16 +165,6 @@ def append_file(filepath: str, content: str, task_id: str = None) -> Dict[str, A
     Returns:
         Dict with keys: success (bool), error (str or None)
     """
-    memory.log_event(
-        EventType.TOOL_CALLED,
-        data={
-            "tool": "append_file",
-            "filepath": filepath,
-            "content_length": len(content)
-        },
-        task_id=task_id
-    )
-
     try:
         path = Path(filepath)
         # Create parent directories if needed
@@ -249,16 +172,7 @@ def append_file(filepath: str, content: str, task_id: str = None) -> Dict[str, A
 
         with open(path, 'a', encoding='utf-8') as f:
             f.write(content)
-
-        memory.log_event(
-            EventType.TOOL_RESULT,
-            data={
-                "tool": "append_file",
-                "success": True,
-                "filepath": filepath
-            },
-            task_id=task_id
-        )
+        _write_bytes.inc(len(content))
 
         return {
             "success": True,
@@ -266,12 +180,6 @@ def append_file(filepath: str, content: str, task_id: str = None) -> Dict[str, A
         }
 
     except Exception as e:
-        memory.log_event(
-            EventType.ERROR,
-            data={"tool": "append_file", "error": str(e)},
-            task_id=task_id
-        )
-
         return {
             "success": False,
             "error": str(e)
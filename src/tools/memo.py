@@ -0,0 +1,168 @@
+"""
+Tool memoization for Project ME v0
+Caches results of idempotent tools, validated against the files they touch.
+
+A tool opts in with register_tool(..., memoize="global" | "task",
+path_args=(...)). The cache key is the tool name and its arguments; each
+path argument also contributes a stat stamp (mtime, size, inode, ctime),
+so a hit is only served while the files are unchanged. "global" entries
+are shared by all callers; "task" entries live in a per-task LRU that is
+dropped when the task finishes.
+
+Tools tagged with the "fs_write" side effect invalidate every entry for
+the paths they write (and their parent directories, for listings).
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from .. import config, metrics
+
+MEMO_SCOPES = ("global", "task")
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns)
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[Tuple, Dict[str, Any], Tuple[str, ...]]]" = OrderedDict()
+
+    def get(self, key):
+        item = self.entries.get(key)
+        if item is not None:
+            self.entries.move_to_end(key)
+        return item
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class ToolMemo:
+    """Global and per-task result caches for memoized tools."""
+
+    def __init__(self, max_entries: int = config.TOOL_MEMO_MAX_ENTRIES,
+                 task_entries: int = config.TOOL_MEMO_TASK_ENTRIES,
+                 max_tasks: int = config.TOOL_MEMO_MAX_TASKS):
+        self._global = _LRU(max_entries)
+        self._tasks: "OrderedDict[str, _LRU]" = OrderedDict()
+        self._task_entries = task_entries
+        self._max_tasks = max_tasks
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_metric, self._miss_metric = metrics.cache_metrics("tool_memo")
+
+    def _cache_for(self, scope: str, task_id: Optional[str], create: bool) -> Optional[_LRU]:
+        if scope == "global":
+            return self._global
+        if task_id is None:
+            return None
+        cache = self._tasks.get(task_id)
+        if cache is None and create:
+            cache = self._tasks[task_id] = _LRU(self._task_entries)
+            while len(self._tasks) > self._max_tasks:
+                self._tasks.popitem(last=False)
+        return cache
+
+    def call(self, spec, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run `spec` through the cache."""
+        task_id = kwargs.get("task_id")
+        args = {k: v for k, v in kwargs.items() if k != "task_id"}
+        try:
+            key = (spec.name, json.dumps(args, sort_keys=True, default=str))
+        except (TypeError, ValueError):
+            return spec.func(**kwargs)
+
+        paths = tuple(os.path.abspath(str(args[name])) for name in spec.path_args if args.get(name))
+        stamps = tuple(_stamp(p) for p in paths)
+
+        with self._lock:
+            cache = self._cache_for(spec.memoize, task_id, create=False)
+            item = cache.get(key) if cache is not None else None
+            if item is not None and item[0] == stamps:
+                self.hits += 1
+                self._hit_metric.inc()
+                return dict(item[1])
+            self.misses += 1
+            self._miss_metric.inc()
+
+        result = spec.func(**kwargs)
+        # Stamp again after the call: if the file changed meanwhile, the entry simply won't match
+        if isinstance(result, dict) and result.get("success") and tuple(_stamp(p) for p in paths) == stamps:
+            with self._lock:
+                cache = self._cache_for(spec.memoize, task_id, create=True)
+                if cache is not None:
+                    cache.put(key, (stamps, dict(result), paths))
+        return result
+
+    def invalidate_paths(self, paths: Set[str]):
+        """Drop every entry that read one of `paths` (absolute)."""
+        with self._lock:
+            for cache in [self._global, *self._tasks.values()]:
+                stale = [key for key, (_, _, used) in cache.entries.items() if paths.intersection(used)]
+                for key in stale:
+                    del cache.entries[key]
+
+    def clear_task(self, task_id: str):
+        """Forget the per-task cache of a finished task."""
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._global.entries.clear()
+            self._tasks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "global_entries": len(self._global.entries),
+                "task_caches": len(self._tasks),
+            }
+
+
+tool_memo = ToolMemo()
+
+
+def wrap(spec) -> Callable[..., Any]:
+    """Build the callable handed out by get_tool(): memoized and/or invalidating as declared."""
+    func = spec.func
+    writes = "fs_write" in spec.side_effects and spec.path_args
+    if not spec.memoize and not writes:
+        return func
+
+    def call(*args, **kwargs):
+        if args:
+            # Map positional arguments onto names so the cache key is stable
+            names = list(spec.parameters)
+            kwargs.update(zip(names, args))
+        if spec.memoize:
+            return tool_memo.call(spec, kwargs)
+        try:
+            return func(**kwargs)
+        finally:
+            touched = set()
+            for name in spec.path_args:
+                if kwargs.get(name):
+                    path = os.path.abspath(str(kwargs[name]))
+                    touched.update((path, os.path.dirname(path)))
+            tool_memo.invalidate_paths(touched)
+
+    call.__name__ = getattr(func, "__name__", spec.name)
+    call.__doc__ = func.__doc__
+    call.__wrapped__ = func
+    return call
@@ -3,14 +3,15 @@ Shell tools for Project ME v0
 Execute shell commands and capture output.
 """
 import subprocess
+import sys
 from typing import Dict, Any
 
 from .. import config
-from ..memory import memory, EventType
+from ..script_pool import PoolUnavailableError, get_script_pool
 from . import register_tool
 
 
-@register_tool("run_shell_command")
+@register_tool("run_shell_command", cost_class="cpu", side_effects=("process",))
 def run_shell_command(command: str, task_id: str = None, cwd: str = None) -> Dict[str, Any]:
     """
     Execute a shell command and return stdout/stderr.
@@ -23,12 +24,6 @@ def run_shell_command(command: str, task_id: str = None, cwd: str = None) -> Dic
     Returns:
         Dict with keys: success (bool), stdout (str), stderr (str), exit_code (int)
     """
-    memory.log_event(
-        EventType.TOOL_CALLED,
-        data={"tool": "run_shell_command", "command": command, "cwd": cwd},
-        task_id=task_id
-    )
-
     try:
         # Run command in PowerShell on Windows
         result = subprocess.run(
@@ -57,18 +52,6 @@ def run_shell_command(command: str, task_id: str = None, cwd: str = None) -> Dic
             "exit_code": exit_code
         }
 
-        memory.log_event(
-            EventType.TOOL_RESULT,
-            data={
-                "tool": "run_shell_command",
-                "success": success,
-                "exit_code": exit_code,
-                "stdout_length": len(result.stdout),
-                "stderr_length": len(result.stderr)
-            },
-            task_id=task_id
-        )
-
         return output
 
     except subprocess.TimeoutExpired:
@@ -79,12 +62,6 @@ def run_shell_command(command: str, task_id: str = None, cwd: str = None) -> Dic
             "exit_code": -1
         }
 
-        memory.log_event(
-            EventType.ERROR,
-            data={"tool": "run_shell_command", "error": "timeout"},
-            task_id=task_id
-        )
-
         return error_output
 
     except Exception as e:
@@ -95,29 +72,109 @@ def run_shell_command(command: str, task_id: str = None, cwd: str = None) -> Dic
             "exit_code": -1
         }
 
-        memory.log_event(
-            EventType.ERROR,
-            data={"tool": "run_shell_command", "error": str(e)},
-            task_id=task_id
-        )
-
         return error_output
 
 
-@register_tool("run_python_script")
-def run_python_script(script_path: str, args: list = None, task_id: str = None) -> Dict[str, Any]:
+@register_tool("run_python_script", cost_class="cpu", side_effects=("process",))
+def run_python_script(script_path: str, args: list = None, task_id: str = None, cwd: str = None) -> Dict[str, Any]:
     """
     Execute a Python script with optional arguments.
 
+    Scripts run on a warm worker from the Python script pool (see
+    src/script_pool.py) instead of spawning a new interpreter per call.
+    With PYTHON_POOL_SIZE=0, or when no pool worker is available, the script
+    runs in a new interpreter process instead.
+
     Args:
         script_path: Path to the Python script
         args: Optional list of command-line arguments
         task_id: Optional task ID for logging
+        cwd: Optional working directory
 
     Returns:
         Dict with keys: success (bool), stdout (str), stderr (str), exit_code (int)
     """
-    args = args or []
-    command = f"python {script_path} {' '.join(args)}"
-    return run_shell_command(command, task_id=task_id)
+    args = [str(a) for a in args or []]
+
+    if config.PYTHON_POOL_SIZE <= 0:
+        return _run_python_subprocess(script_path, args, cwd)
+
+    try:
+        result = get_script_pool().run(script_path, args=args, cwd=cwd)
+
+        stdout = result["stdout"]
+        stderr = result["stderr"]
+        exit_code = result["exit_code"]
+        success = exit_code == 0
+
+        if result["timed_out"]:
+            return {
+                "success": False,
+                "stdout": "",
+                "stderr": stderr,
+                "exit_code": exit_code
+            }
+
+        # Truncate very long outputs
+        if len(stdout) > config.MAX_TOOL_OUTPUT_LENGTH:
+            stdout = stdout[:config.MAX_TOOL_OUTPUT_LENGTH] + "\n... [truncated]"
+        if len(stderr) > config.MAX_TOOL_OUTPUT_LENGTH:
+            stderr = stderr[:config.MAX_TOOL_OUTPUT_LENGTH] + "\n... [truncated]"
+
+        return {
+            "success": success,
+            "stdout": stdout,
+            "stderr": stderr,
+            "exit_code": exit_code
+        }
+
+    except PoolUnavailableError:
+        return _run_python_subprocess(script_path, args, cwd)
+
+    except Exception as e:
+        return {
+            "success": False,
+            "stdout": "",
+            "stderr": f"Exception: {str(e)}",
+            "exit_code": -1
+        }
+
+
+def _run_python_subprocess(script_path: str, args: list, cwd: str = None) -> Dict[str, Any]:
+    """Run a script in a new interpreter (argv list, no shell parsing of the path or arguments)."""
+    try:
+        result = subprocess.run(
+            [sys.executable, str(script_path), *args],
+            capture_output=True,
+            text=True,
+            timeout=config.PYTHON_SCRIPT_TIMEOUT_SECONDS,
+            cwd=cwd
+        )
+    except subprocess.TimeoutExpired:
+        return {
+            "success": False,
+            "stdout": "",
+            "stderr": f"Script timed out after {config.PYTHON_SCRIPT_TIMEOUT_SECONDS} seconds",
+            "exit_code": -1
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "stdout": "",
+            "stderr": f"Exception: {str(e)}",
+            "exit_code": -1
+        }
 
+    stdout = result.stdout
+    stderr = result.stderr
+    if len(stdout) > config.MAX_TOOL_OUTPUT_LENGTH:
+        stdout = stdout[:config.MAX_TOOL_OUTPUT_LENGTH] + "\n... [truncated]"
+    if len(stderr) > config.MAX_TOOL_OUTPUT_LENGTH:
+        stderr = stderr[:config.MAX_TOOL_OUTPUT_LENGTH] + "\n... [truncated]"
+
+    return {
+        "success": result.returncode == 0,
+        "stdout": stdout,
+        "stderr": stderr,
+        "exit_code": result.returncode
+    }
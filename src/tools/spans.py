@@ -0,0 +1,87 @@
+"""
+Tool call spans for Project ME v0
+One structured TOOL_SPAN event per tool call, written off the calling thread.
+
+Each record holds the tool name, a digest of its arguments, the duration,
+bytes in (string arguments) and out (string fields of the result) and the
+outcome. Successful calls of high-frequency tools are sampled
+(config.TOOL_SPAN_SAMPLE_RATES); failures are always recorded. Every call,
+sampled or not, is also counted in the tool_call_duration_seconds metric.
+"""
+import hashlib
+import json
+import random
+import time
+from typing import Any, Callable, Dict
+
+from .. import config, metrics, tracing
+from ..memory import memory, EventType
+
+_DURATION = metrics.histogram("tool_call_duration_seconds", "Tool call latency", ["tool", "outcome"])
+
+
+def _bytes_in(kwargs: Dict[str, Any]) -> int:
+    return sum(len(v) for v in kwargs.values() if isinstance(v, str))
+
+
+def _bytes_out(result: Any) -> int:
+    if isinstance(result, dict):
+        return sum(len(v) for v in result.values() if isinstance(v, str))
+    return len(result) if isinstance(result, str) else 0
+
+
+def _args_digest(kwargs: Dict[str, Any]) -> str:
+    try:
+        blob = json.dumps(kwargs, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        blob = repr(sorted(kwargs.items()))
+    return hashlib.sha1(blob.encode("utf-8", "replace")).hexdigest()[:12]
+
+
+def traced(spec, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a tool callable so every call emits a TOOL_SPAN event."""
+    rate = config.TOOL_SPAN_SAMPLE_RATES.get(spec.name, config.TOOL_SPAN_DEFAULT_SAMPLE_RATE)
+    names = spec.parameters
+
+    def call(*args, **kwargs):
+        if args:
+            kwargs.update(zip(names, args))
+        task_id = kwargs.get("task_id")
+        started = time.perf_counter()
+        outcome = "ok"
+        error = None
+        result = None
+        try:
+            with tracing.span(f"tool:{spec.name}"):
+                result = func(**kwargs)
+            if isinstance(result, dict) and result.get("success") is False:
+                outcome = "error"
+                error = result.get("error") or result.get("stderr")
+            return result
+        except Exception as e:
+            outcome = "exception"
+            error = str(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _DURATION.labels(spec.name, outcome).observe(elapsed)
+            if outcome != "ok" or rate >= 1.0 or random.random() < rate:
+                args_only = {k: v for k, v in kwargs.items() if k != "task_id"}
+                data = {
+                    "tool": spec.name,
+                    "args_digest": _args_digest(args_only),
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "bytes_in": _bytes_in(args_only),
+                    "bytes_out": _bytes_out(result),
+                    "outcome": outcome,
+                }
+                if rate < 1.0:
+                    data["sample_rate"] = rate
+                if error:
+                    data["error"] = str(error)[:200]
+                memory.log_event_async(EventType.TOOL_SPAN, data=data, task_id=task_id)
+
+    call.__name__ = getattr(func, "__name__", spec.name)
+    call.__doc__ = func.__doc__
+    call.__wrapped__ = func
+    return call
@@ -0,0 +1,183 @@
+"""
+Task tracing for Project ME v0
+Per-task span traces with monotonic phase timings, exportable to Chrome's trace viewer.
+
+Agent.process_task opens a trace for each task; code on the task's path
+marks phases with `with tracing.span("name", key=value):`. Spans nest per
+thread, and tool calls handed to executor threads keep their parent when
+submitted through tracing.bind(). Outside a trace, span() does nothing
+beyond one thread-local lookup.
+
+Timings come from time.perf_counter_ns() relative to the trace start. The
+finished trace is stored on the task (Task.trace); to_chrome_trace() turns
+one or more stored traces into Chrome trace-event JSON that chrome://tracing
+or https://ui.perfetto.dev can open as a flame view.
+"""
+import itertools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from . import config
+
+_local = threading.local()
+
+
+class Trace:
+    """Spans recorded for one unit of work (usually one task)."""
+
+    def __init__(self, name: str, task_id: Optional[str] = None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.task_id = task_id
+        self.started_at = datetime.utcnow().isoformat()
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped_spans = 0
+        self._t0 = time.perf_counter_ns()
+        self._end: Optional[int] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _add(self, record: Dict[str, Any]):
+        with self._lock:
+            if len(self.spans) >= config.TRACE_MAX_SPANS:
+                self.dropped_spans += 1
+                return
+            self.spans.append(record)
+
+    def phases(self) -> Dict[str, float]:
+        """Total milliseconds per span name (nested spans are also counted in their parent)."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for record in self.spans:
+                totals[record["name"]] = totals.get(record["name"], 0.0) + record["dur_us"] / 1000
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self._end if self._end is not None else time.perf_counter_ns()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda r: r["start_us"])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "task_id": self.task_id,
+            "started_at": self.started_at,
+            "duration_ms": round((end - self._t0) / 1e6, 3),
+            "phases": self.phases(),
+            "spans": spans,
+            "dropped_spans": self.dropped_spans,
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def start_trace(name: str, task_id: Optional[str] = None) -> Iterator[Trace]:
+    """Make a new trace current for this thread until the block exits."""
+    previous = (getattr(_local, "trace", None), getattr(_local, "stack", None))
+    trace = Trace(name, task_id)
+    _local.trace, _local.stack = trace, []
+    try:
+        yield trace
+    finally:
+        trace._end = time.perf_counter_ns()
+        _local.trace, _local.stack = previous
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Time the with-block as a span of the current trace (no-op without one).
+
+    Yields the span's attribute dict (or None), so the block can add details
+    it only learns while running.
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield None
+        return
+    stack = _local.stack
+    span_id = next(trace._ids)
+    parent = stack[-1] if stack else 0
+    stack.append(span_id)
+    start = time.perf_counter_ns()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        end = time.perf_counter_ns()
+        stack.pop()
+        trace._add({
+            "id": span_id,
+            "parent": parent,
+            "name": name,
+            "start_us": round((start - trace._t0) / 1000, 1),
+            "dur_us": round((end - start) / 1000, 1),
+            "thread": threading.current_thread().name,
+            "attrs": attrs,
+        })
+
+
+def bind(func: Callable) -> Callable:
+    """Wrap `func` so that, run on another thread, its spans join the caller's trace and span."""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return func
+    parent = list(getattr(_local, "stack", []))[-1:]
+
+    def bound(*args, **kwargs):
+        previous = (getattr(_local, "trace", None), getattr(_local, "stack", None))
+        _local.trace, _local.stack = trace, list(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.trace, _local.stack = previous
+
+    return bound
+
+
+def to_chrome_trace(traces: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert stored traces (Trace.to_dict() output) to Chrome trace-event JSON.
+
+    Each trace becomes one process (named after the trace) and each thread
+    that recorded spans one track; spans are complete ("X") events.
+    """
+    events: List[Dict[str, Any]] = []
+    for pid, trace in enumerate(traces, start=1):
+        label = trace.get("name") or "trace"
+        if trace.get("task_id"):
+            label = f"{label} {trace['task_id'][:8]}"
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": label}})
+        tids: Dict[str, int] = {}
+        for record in trace.get("spans", []):
+            thread = record.get("thread") or "main"
+            if thread not in tids:
+                tids[thread] = len(tids) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[thread],
+                               "args": {"name": thread}})
+            events.append({
+                "name": record["name"],
+                "cat": "task",
+                "ph": "X",
+                "ts": record["start_us"],
+                "dur": record["dur_us"],
+                "pid": pid,
+                "tid": tids[thread],
+                "args": record.get("attrs") or {},
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(traces: Iterable[Dict[str, Any]], path: str):
+    """Write to_chrome_trace(traces) to `path`."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(traces), f, default=str)
@@ -0,0 +1,237 @@
+"""
+Chunked uploads for Project ME v0
+Resumable, constant-memory uploads into a base directory (the runner's sandbox).
+
+An upload is staged as `<base>/.uploads/<upload_id>.part` next to a small
+JSON metadata file. Chunks are written at explicit byte offsets, so a client
+can ask for the received size after a dropped connection and resume from
+there. Completing an upload verifies size/SHA-256, fsyncs, and atomically
+renames the staged file onto its final path (or into a BlobStore, see
+src/blobstore.py).
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_HASH_CHUNK_BYTES = 1024 * 1024
+_STALE_UPLOAD_SECONDS = 24 * 3600  # Unfinished uploads older than this are removed by expire()
+
+
+class UploadError(ValueError):
+    """Raised for invalid upload requests (unknown id, bad offset, checksum mismatch...)."""
+
+
+def sha256_file(path: Path) -> str:
+    """Hash a file in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fsync_dir(path: Path):
+    """Flush a directory entry (POSIX only; a no-op on Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def resolve_within(base_dir: Path, rel_path: str) -> Path:
+    """Resolve `rel_path` under `base_dir`, rejecting paths that escape it."""
+    base = base_dir.resolve()
+    target = (base / rel_path).resolve()
+    if target == base or base not in target.parents:
+        raise UploadError(f"Path escapes the sandbox: {rel_path}")
+    return target
+
+
+class _ChunkWriter:
+    """Appends chunks to a staged file, enforcing the declared upload size."""
+
+    def __init__(self, f, offset: int, limit: Optional[int]):
+        self._f = f
+        self.position = offset
+        self._limit = limit
+
+    def write(self, chunk: bytes):
+        if self._limit is not None and self.position + len(chunk) > self._limit:
+            raise UploadError(f"Upload exceeds declared size of {self._limit} bytes")
+        self._f.write(chunk)
+        self.position += len(chunk)
+
+
+class UploadManager:
+    """Tracks staged uploads under `<base_dir>/.uploads`."""
+
+    def __init__(self, base_dir: Path, blob_store=None):
+        self.base_dir = Path(base_dir)
+        self.staging_dir = self.base_dir / ".uploads"
+        self.blob_store = blob_store  # Optional BlobStore: completed files are deduplicated
+
+    def _paths(self, upload_id: str):
+        if not _UPLOAD_ID_RE.match(upload_id or ""):
+            raise UploadError(f"Invalid upload id: {upload_id}")
+        return (self.staging_dir / f"{upload_id}.part",
+                self.staging_dir / f"{upload_id}.json")
+
+    def _load_meta(self, upload_id: str) -> Dict[str, Any]:
+        _, meta_path = self._paths(upload_id)
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise UploadError(f"Unknown upload: {upload_id}")
+
+    def start(self, path: str, size: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Begin an upload to `path` (relative to the base directory).
+
+        Args:
+            path: Destination path
+            size: Optional expected total size in bytes
+            sha256: Optional expected SHA-256 hex digest
+
+        Returns:
+            Upload status dict (upload_id, path, received, size)
+        """
+        resolve_within(self.base_dir, path)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+
+        upload_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(upload_id)
+        meta = {
+            "upload_id": upload_id,
+            "path": path,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "created_at": time.time(),
+        }
+        part_path.touch()
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Return how many bytes have been received so far."""
+        meta = self._load_meta(upload_id)
+        part_path, _ = self._paths(upload_id)
+        return {
+            "upload_id": upload_id,
+            "path": meta["path"],
+            "size": meta["size"],
+            "received": part_path.stat().st_size,
+        }
+
+    @contextmanager
+    def open_writer(self, upload_id: str, offset: int):
+        """
+        Open the staged file for writing at `offset`; yields a _ChunkWriter.
+
+        `offset` may not be past the bytes already received; writing at an
+        earlier offset truncates first, so a retried chunk simply overwrites.
+        """
+        meta = self._load_meta(upload_id)
+        part_path, _ = self._paths(upload_id)
+        received = part_path.stat().st_size
+        if offset < 0 or offset > received:
+            raise UploadError(f"Offset {offset} is past the {received} bytes received")
+
+        with open(part_path, "r+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            yield _ChunkWriter(f, offset, meta["size"])
+
+    def write_chunks(self, upload_id: str, offset: int, chunks: Iterable[bytes]) -> Dict[str, Any]:
+        """Write a stream of chunks starting at `offset` and return the new status."""
+        with self.open_writer(upload_id, offset) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        return self.status(upload_id)
+
+    def complete(self, upload_id: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Verify the staged file and atomically move it into place.
+
+        Returns:
+            Dict with keys: path, size, sha256
+        """
+        meta = self._load_meta(upload_id)
+        part_path, meta_path = self._paths(upload_id)
+        target = resolve_within(self.base_dir, meta["path"])
+
+        size = part_path.stat().st_size
+        if meta["size"] is not None and size != meta["size"]:
+            raise UploadError(f"Incomplete upload: received {size} of {meta['size']} bytes")
+
+        digest = sha256_file(part_path)
+        expected = (sha256 or meta["sha256"] or "").lower()
+        if expected and digest != expected:
+            raise UploadError(f"Checksum mismatch: expected {expected}, got {digest}")
+
+        with open(part_path, "rb+") as f:
+            os.fsync(f.fileno())
+
+        if self.blob_store is not None:
+            self.blob_store.place(part_path, target, digest)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part_path, target)
+            fsync_dir(target.parent)
+        meta_path.unlink(missing_ok=True)
+
+        return {"path": meta["path"], "size": size, "sha256": digest}
+
+    def abort(self, upload_id: str):
+        """Discard a staged upload."""
+        part_path, meta_path = self._paths(upload_id)
+        part_path.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+
+    def expire(self, max_age: float = _STALE_UPLOAD_SECONDS) -> int:
+        """
+        Discard uploads started more than `max_age` seconds ago.
+
+        Age comes from the metadata's `created_at`; a staged file whose
+        metadata is missing or unreadable falls back to its mtime.
+
+        Returns:
+            Number of uploads removed
+        """
+        if not self.staging_dir.is_dir():
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in list(self.staging_dir.iterdir()):
+            upload_id, ext = os.path.splitext(path.name)
+            if ext != ".part" or not _UPLOAD_ID_RE.match(upload_id):
+                continue
+            try:
+                created = self._load_meta(upload_id)["created_at"]
+            except (UploadError, ValueError, KeyError):
+                try:
+                    created = path.stat().st_mtime
+                except FileNotFoundError:  # Completed or aborted meanwhile
+                    continue
+            if created < cutoff:
+                self.abort(upload_id)
+                removed += 1
+        # Metadata left without its staged file
+        for path in list(self.staging_dir.glob("*.json")):
+            upload_id = path.stem
+            if (_UPLOAD_ID_RE.match(upload_id) and not (self.staging_dir / f"{upload_id}.part").exists()):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink(missing_ok=True)
+                except FileNotFoundError:
+                    pass
+        return removed
@@ -0,0 +1,182 @@
+"""
+File helper tests for Project ME v0
+Line/byte range reads, directory scans and the file index.
+
+Runs under pytest or directly: python test_files.py
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from src import browse, config, file_io, fs_index
+
+
+def _file(name: str, data: bytes) -> Path:
+    path = Path(tempfile.mkdtemp(prefix="files_test_")) / name
+    path.write_bytes(data)
+    return path
+
+
+# ---------- line ranges ----------
+
+def test_line_range_continues_a_cut_line_by_offset():
+    path = _file("long.txt", b"a\n" + b"x" * 20 + b"\nb\n")
+    original = config.READ_PAGE_BYTES
+    config.READ_PAGE_BYTES = 8
+    try:
+        page = file_io.read_line_range(str(path), start_line=1, num_lines=10)
+        assert page["content"] == "a\n" and page["lines"] == 1 and page["next_line"] == 2
+        assert "next_offset" not in page
+
+        page = file_io.read_line_range(str(path), start_line=2, num_lines=10)
+        assert page["content"] == "x" * 8 and page["lines"] == 0
+        assert page["next_offset"] == 10 and page["next_line"] == 3  # Rest of line 2, then line 3
+
+        rest = file_io.read_byte_range(str(path), page["next_offset"], 8)
+        assert rest["content"] == "x" * 8 and rest["next_offset"] == 18
+        assert file_io.read_line_range(str(path), start_line=3)["content"] == "b\n"
+    finally:
+        config.READ_PAGE_BYTES = original
+
+
+def test_line_range_page_ending_on_a_line_break_is_not_cut():
+    path = _file("exact.txt", b"abc\ndefg\n")
+    original = config.READ_PAGE_BYTES
+    config.READ_PAGE_BYTES = 4
+    try:
+        page = file_io.read_line_range(str(path), start_line=1, num_lines=10)
+        assert page["content"] == "abc\n" and page["next_line"] == 2 and "next_offset" not in page
+    finally:
+        config.READ_PAGE_BYTES = original
+
+
+def test_line_range_on_utf16_and_utf32():
+    text = "first\nsecond ✓\nthird\n"
+    for encoding in ("utf-16", "utf-16-be", "utf-32", "utf-32-be"):
+        data = text.encode(encoding)
+        if encoding.endswith("-be"):  # Explicit byte order carries no BOM; add it
+            bom = "﻿".encode(encoding)
+            data = bom + data
+        path = _file("wide.txt", data)
+        page = file_io.read_line_range(str(path), start_line=2, num_lines=1)
+        assert page["content"] == "second ✓\n", (encoding, page)
+        assert page["lines"] == 1 and page["next_line"] == 3
+        assert file_io.read_line_range(str(path), start_line=3)["content"] == "third\n"
+
+
+def test_line_range_utf16_ignores_misaligned_newline_bytes():
+    text = "ੁx\nnext\n"  # U+0A41 is 41 0A in UTF-16-LE: a newline byte inside a character
+    path = _file("gurmukhi.txt", text.encode("utf-16"))
+    page = file_io.read_line_range(str(path), start_line=1, num_lines=1)
+    assert page["content"] == "ੁx\n" and page["next_line"] == 2
+
+
+def test_byte_range_keeps_the_bom_byte_order_past_the_first_page():
+    for encoding in ("utf-16-be", "utf-16-le", "utf-32-be"):
+        unit = 4 if "32" in encoding else 2
+        data = "\ufeff".encode(encoding) + "abc✓".encode(encoding)
+        path = _file("wide.txt", data)
+        page = file_io.read_byte_range(str(path), unit * 2, unit * 3)
+        assert page["content"] == "bc✓", (encoding, page)
+        assert file_io.read_byte_range(str(path))["content"] == "abc✓"
+
+
+# ---------- directory scans ----------
+
+def test_scan_directory_lists_broken_symlinks():
+    base = Path(tempfile.mkdtemp(prefix="browse_test_"))
+    (base / "real.txt").write_text("abc")
+    os.symlink(base / "real.txt", base / "good")
+    os.symlink(base / "missing.txt", base / "dangling")
+
+    items = {item.name: item for item in browse.scan_directory(str(base))}
+    assert items["dangling"] == browse.DirItem("dangling", False, True, None)
+    assert items["good"].size == 3 and items["real.txt"].size == 3
+
+    entry = browse._entry_dict(items["dangling"], str(base))
+    assert entry["type"] == "symlink" and "size" not in entry
+    assert browse._entry_dict(items["good"], str(base))["type"] == "file"
+
+
+def test_browse_pages_are_stable_and_complete():
+    base = Path(tempfile.mkdtemp(prefix="browse_test_"))
+    for name in ("b.py", "A.txt", "c.py"):
+        (base / name).write_text("x")
+    (base / "sub" / "deep").mkdir(parents=True)
+    (base / "sub" / "d.py").write_text("x")
+    (base / "sub" / "deep" / "e.py").write_text("x")
+    os.symlink(base / "sub", base / "loop")  # Listed, not descended into
+
+    flat = browse.browse(str(base), pattern="*.py")
+    assert [e["name"] for e in flat["entries"]] == ["loop", "sub", "b.py", "c.py"]
+
+    names, cursor = [], None
+    while True:
+        page = browse.browse(str(base), recursive=True, pattern="*.py", cursor=cursor, limit=2)
+        names += [e["relative"] for e in page["entries"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["b.py", "c.py", os.path.join("sub", "d.py"), os.path.join("sub", "deep", "e.py")]
+
+    shallow = browse.browse(str(base), recursive=True, pattern="*", max_depth=1)
+    assert shallow["truncated"] and all(os.sep not in e["relative"] for e in shallow["entries"])
+
+    everything = browse.browse(str(base), recursive=True)  # No pattern, no limit: the whole directory
+    assert [e["name"] for e in everything["entries"]] == ["loop", "sub", "A.txt", "b.py", "c.py"]
+    assert everything["next_cursor"] is None and not everything["truncated"]
+
+
+# ---------- file index ----------
+
+def test_index_search_respects_limit():
+    base = Path(tempfile.mkdtemp(prefix="index_test_"))
+    for name in ("a.py", "b.py", "c.py"):
+        (base / name).write_text("")
+    indexer = fs_index.FileIndexer(roots=[str(base)], index_dir=base / ".index")
+    indexer.indexes[0].rescan()
+
+    assert len(indexer.search("*.py", limit=2)) == 2
+    assert indexer.search("*.py", limit=0) == []
+    assert indexer.search("*.py", limit=-1) == []
+    assert indexer.indexes[0].search(".py", limit=0) == []
+
+
+def test_index_search_modes_rescans_and_persistence():
+    base = Path(tempfile.mkdtemp(prefix="index_test_"))
+    (base / "src" / "pkg").mkdir(parents=True)
+    (base / "src" / "pkg" / "test_config.py").write_text("x")
+    (base / "src" / "config.md").write_text("x")
+    (base / "README.md").write_text("x")
+    index = fs_index.FileIndex(str(base), base.parent / (base.name + "_index"))
+    assert index.rescan() and not index.rescan()  # Second scan: nothing changed
+
+    def found(query, **kwargs):
+        return sorted(e["relative"] for e in index.search(query, **kwargs))
+
+    assert found(".md") == ["README.md", os.path.join("src", "config.md")]
+    assert found("CONFIG") == [os.path.join("src", "config.md"), os.path.join("src", "pkg", "test_config.py")]
+    assert found("src/*/test_*") == [os.path.join("src", "pkg", "test_config.py")]
+    assert found("pkg", mode="substring") == [os.path.join("src", "pkg")]
+    assert found("*.md", under=str(base / "src")) == [os.path.join("src", "config.md")]
+    assert found("*.md", under=str(base.parent)) == []
+
+    (base / "src" / "pkg" / "new.md").write_text("x")
+    assert index.rescan() and os.path.join("src", "pkg", "new.md") in found("*.md")
+
+    reloaded = fs_index.FileIndex(str(base), base.parent / (base.name + "_index"))
+    assert reloaded.ready and len(reloaded) == len(index)
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✓ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {name}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,329 @@
+"""
+Runtime tests for Project ME v0
+Script pool recovery, the Python script fallback path, tool memoization,
+tool spans, task traces, the sampling profiler and agent tool errors.
+
+Runs under pytest or directly: python test_runtime.py
+"""
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src import config, profiler, script_pool, tracing
+from src.memory import MemoryStore
+from src.tools import ToolSpec, memo, shell_tools, spans
+
+
+def _script(source: str) -> Path:
+    path = Path(tempfile.mkdtemp(prefix="script_test_")) / "script name.py"
+    path.write_text(source, encoding="utf-8")
+    return path
+
+
+# ---------- script pool ----------
+
+def test_pool_shrinks_instead_of_hanging_when_respawn_fails():
+    pool = script_pool.PythonScriptPool(size=1, max_runs_per_worker=1, acquire_timeout=5)
+    original_backoff = script_pool._SPAWN_BACKOFF_SECONDS
+    script_pool._SPAWN_BACKOFF_SECONDS = 0.01
+    try:
+        script = _script("print('hi')")
+        assert pool.run(str(script))["stdout"].strip() == "hi"
+
+        def broken_spawn():
+            raise OSError("cannot fork")
+        pool._spawn_worker = broken_spawn  # The recycled worker cannot be replaced
+
+        deadline = time.monotonic() + 5
+        while pool.live_workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.live_workers == 0
+
+        started = time.monotonic()
+        try:
+            pool.run(str(script))
+            raise AssertionError("run() should have raised")
+        except script_pool.PoolUnavailableError:
+            pass
+        assert time.monotonic() - started < 2
+    finally:
+        script_pool._SPAWN_BACKOFF_SECONDS = original_backoff
+        pool.shutdown()
+
+
+def test_pool_acquire_times_out():
+    pool = script_pool.PythonScriptPool(size=1, acquire_timeout=0.2)
+    try:
+        pool.start()
+        worker = pool._idle.get()  # Hold the only worker
+        try:
+            pool.run(str(_script("pass")))
+            raise AssertionError("run() should have raised")
+        except script_pool.PoolUnavailableError:
+            pass
+        pool._idle.put(worker)
+    finally:
+        pool.shutdown()
+
+
+def test_run_python_script_falls_back_to_subprocess_with_argv():
+    script = _script("import sys; print(sys.argv[1:])")
+    original_size = config.PYTHON_POOL_SIZE
+    config.PYTHON_POOL_SIZE = 0
+    try:
+        result = shell_tools.run_python_script(str(script), args=["two words", "$HOME;x"])
+    finally:
+        config.PYTHON_POOL_SIZE = original_size
+    assert result["success"], result
+    assert result["stdout"].strip() == "['two words', '$HOME;x']"
+
+
+# ---------- tool memoization ----------
+
+def _memo_tools():
+    """A counting read tool, a write tool and a directory listing, wrapped as get_tool() would."""
+    reads = []
+
+    def read(path: str, task_id: str = None):
+        reads.append(path)
+        return {"success": True, "content": Path(path).read_text()}
+
+    def write(path: str, content: str):
+        Path(path).write_text(content)
+        return {"success": True}
+
+    read_spec = ToolSpec("memo_read", read, read_only=True, memoize="global", path_args=("path",))
+    task_spec = ToolSpec("memo_task_read", read, read_only=True, memoize="task", path_args=("path",))
+    write_spec = ToolSpec("memo_write", write, side_effects=("fs_write",), path_args=("path",))
+    return memo.wrap(read_spec), memo.wrap(task_spec), memo.wrap(write_spec), reads
+
+
+def test_memo_serves_hits_until_the_file_changes():
+    original = memo.tool_memo
+    memo.tool_memo = memo.ToolMemo()
+    try:
+        read, _, write, reads = _memo_tools()
+        path = str(_script("one"))
+        assert read(path)["content"] == "one" and read(path=path)["content"] == "one"
+        assert len(reads) == 1 and memo.tool_memo.stats()["hits"] == 1
+
+        write(path, "two")  # Through a tool: invalidated even if the stamp looked the same
+        assert read(path)["content"] == "two" and len(reads) == 2
+
+        with open(path, "a") as f:  # Behind the registry's back: the stat stamp changes
+            f.write("!")
+        assert read(path)["content"] == "two!" and len(reads) == 3
+    finally:
+        memo.tool_memo = original
+
+
+def test_memo_task_scope_is_dropped_with_the_task():
+    original = memo.tool_memo
+    memo.tool_memo = memo.ToolMemo()
+    try:
+        _, read, _, reads = _memo_tools()
+        path = str(_script("one"))
+        read(path, task_id="t1")
+        read(path, task_id="t1")
+        read(path, task_id="t2")
+        read(path)  # No task: never cached
+        read(path)
+        assert len(reads) == 4
+
+        memo.tool_memo.clear_task("t1")
+        read(path, task_id="t1")
+        assert len(reads) == 5
+    finally:
+        memo.tool_memo = original
+
+
+# ---------- tool spans ----------
+
+def _span_events(rate: float, calls):
+    """Run `calls` through a traced tool sampled at `rate`; return the TOOL_SPAN data logged."""
+    def tool(text: str = "", fail: str = None, task_id: str = None):
+        if fail == "raise":
+            raise OSError("boom")
+        if fail:
+            return {"success": False, "error": fail}
+        return {"success": True, "echo": text}
+
+    original = (spans.memory, dict(config.TOOL_SPAN_SAMPLE_RATES))
+    spans.memory = MemoryStore(Path(tempfile.mkdtemp(prefix="spans_test_")) / "events.jsonl")
+    config.TOOL_SPAN_SAMPLE_RATES["span_tool"] = rate
+    try:
+        traced = spans.traced(ToolSpec("span_tool", tool), tool)
+        for kwargs in calls:
+            try:
+                traced(**kwargs)
+            except OSError:
+                pass
+        spans.memory.flush()
+        return [(e.task_id, e.data) for e in spans.memory.iter_events_filtered(event_type="tool_span")]
+    finally:
+        spans.memory = original[0]
+        config.TOOL_SPAN_SAMPLE_RATES.clear()
+        config.TOOL_SPAN_SAMPLE_RATES.update(original[1])
+
+
+def test_spans_record_every_call_at_full_rate():
+    events = _span_events(1.0, [{"text": "abcd", "task_id": "t1"}, {"fail": "bad input"}])
+    assert [task_id for task_id, _ in events] == ["t1", None]
+    ok, failed = events[0][1], events[1][1]
+    assert ok["tool"] == "span_tool" and ok["outcome"] == "ok" and "sample_rate" not in ok
+    assert ok["bytes_in"] == 4 and ok["bytes_out"] == 4 and ok["duration_ms"] >= 0
+    assert failed["outcome"] == "error" and failed["error"] == "bad input"
+
+
+def test_spans_sample_successes_but_keep_failures():
+    events = _span_events(0.0, [{"text": "x"}] * 20 + [{"fail": "bad"}, {"fail": "raise"}])
+    assert [data["outcome"] for _, data in events] == ["error", "exception"]
+    assert events[1][1]["error"] == "boom" and events[1][1]["sample_rate"] == 0.0
+
+
+# ---------- task traces ----------
+
+def test_trace_nests_spans_across_bound_threads():
+    assert tracing.current_trace() is None
+    with tracing.span("outside") as attrs:
+        assert attrs is None
+
+    with tracing.start_trace("task", task_id="abcdef123456") as trace:
+        with tracing.span("outer", kind="test") as attrs:
+            attrs["learned"] = True
+            bound = tracing.bind(_traced_sleep)
+            worker = threading.Thread(target=bound, name="tool-thread")
+            worker.start()
+            worker.join()
+        try:
+            with tracing.span("failing"):
+                raise ValueError("nope")
+        except ValueError:
+            pass
+    assert tracing.current_trace() is None
+
+    stored = trace.to_dict()
+    by_name = {record["name"]: record for record in stored["spans"]}
+    assert by_name["outer"]["parent"] == 0 and by_name["outer"]["attrs"] == {"kind": "test", "learned": True}
+    assert by_name["inner"]["parent"] == by_name["outer"]["id"] and by_name["inner"]["thread"] == "tool-thread"
+    assert by_name["failing"]["attrs"]["error"] == "ValueError: nope"
+    assert stored["phases"]["outer"] >= stored["phases"]["inner"] >= 1
+
+    chrome = tracing.to_chrome_trace([stored])["traceEvents"]
+    assert chrome[0]["args"]["name"] == "task abcdef12"
+    threads = {e["args"]["name"] for e in chrome if e["name"] == "thread_name"}
+    assert threads == {"MainThread", "tool-thread"}
+    assert sorted(e["name"] for e in chrome if e["ph"] == "X") == ["failing", "inner", "outer"]
+
+
+def _traced_sleep():
+    with tracing.span("inner"):
+        time.sleep(0.002)
+
+
+# ---------- profiler ----------
+
+def _busy(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_thread_profiler_samples_busy_code():
+    with profiler.profiling(interval=0.002, mode="thread") as prof:
+        assert profiler.active() is prof
+        try:
+            profiler.Profiler(mode="thread").start()
+            raise AssertionError("a second profile should not start")
+        except profiler.ProfilerBusyError:
+            pass
+        _busy(0.2)
+    assert profiler.active() is None and not prof.running
+
+    result = prof.result()
+    assert result["mode"] == "thread" and result["samples"] > 10
+    lines = result["collapsed"].splitlines()
+    assert any("MainThread;" in line and f"{__name__}:_busy" in line for line in lines)
+    assert not any(line.startswith("profiler;") for line in lines)  # The sampler skips itself
+
+    path = Path(tempfile.mkdtemp(prefix="profile_test_")) / "out" / "busy.folded"
+    profiler.write_collapsed(result, str(path))
+    assert path.read_text() == result["collapsed"]
+
+
+def test_signal_profiler_samples_cpu_time():
+    if not profiler.signal_supported():
+        return
+    previous = profiler.signal.getsignal(profiler.signal.SIGPROF)
+    installed = profiler._signal_installed
+    try:
+        assert profiler.install_signal_handler()
+        with profiler.profiling(interval=0.002, mode="signal") as prof:
+            _busy(0.2)
+        assert prof.samples > 10 and f"{__name__}:_busy" in prof.collapsed()
+    finally:
+        profiler.signal.signal(profiler.signal.SIGPROF, previous)
+        profiler._signal_installed = installed
+
+
+# ---------- agent loop ----------
+
+class _ScriptedLLM:
+    """Replies with the queued turns in order, recording the messages it was sent."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.sent = []
+
+    def chat_with_tools(self, messages, tools, task_id=None, **kwargs):
+        self.sent.append(list(messages))
+        return self.replies.pop(0)
+
+
+def _tool_call(call_id: str, name: str, arguments: str = "{}"):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def test_agent_returns_tool_exceptions_to_the_model():
+    import importlib
+    from src.tasks import Task
+
+    agent_module = importlib.import_module("src.agent")  # `from src import agent` is the Agent singleton
+
+    def broken_tool(**kwargs):
+        raise OSError("disk on fire")
+
+    fake = _ScriptedLLM([
+        {"content": "", "tool_calls": [_tool_call("1", "broken"), _tool_call("2", "broken", "[1]")],
+         "usage": {"total_tokens": 10}},
+        {"content": "Recovered", "tool_calls": [], "usage": {"total_tokens": 5}},
+    ])
+    originals = (agent_module.llm, agent_module.get_tool, agent_module.tool_schemas)
+    agent_module.llm = fake
+    agent_module.get_tool = lambda name: broken_tool
+    agent_module.tool_schemas = lambda names: []
+    try:
+        task = Task(id="t-agent", type="agent", payload={"goal": "test", "tools": ["broken"]})
+        result = agent_module.Agent.__new__(agent_module.Agent)._handle_agent_task(task)
+    finally:
+        agent_module.llm, agent_module.get_tool, agent_module.tool_schemas = originals
+
+    assert result["success"] and result["answer"] == "Recovered" and result["steps"] == 2
+    tool_messages = [m for m in fake.sent[1] if m["role"] == "tool"]
+    assert "OSError: disk on fire" in tool_messages[0]["content"]
+    assert "JSON object" in tool_messages[1]["content"]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✓ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {name}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
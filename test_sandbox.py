@@ -0,0 +1,393 @@
+"""
+Sandbox tests for Project ME v0
+Blob store, batch operations and listings, against a temporary sandbox.
+
+Runs under pytest or directly: python test_sandbox.py
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from src import blobstore
+
+_SANDBOX = Path(tempfile.mkdtemp(prefix="sandbox_test_"))
+os.environ.setdefault("SANDBOX_DIR", str(_SANDBOX))
+
+
+def _client(name: str):
+    """A runner TestClient on a fresh sandbox directory."""
+    import runner
+    from fastapi.testclient import TestClient
+
+    runner.SANDBOX_DIR = _SANDBOX / name
+    runner.SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
+    return TestClient(runner.app), runner.SANDBOX_DIR
+
+
+def _copying_reflink(src, dst) -> bool:
+    """Stands in for FICLONE on filesystems without reflinks (same visible behaviour)."""
+    shutil.copyfile(src, dst)
+    return True
+
+
+# ---------- blob store ----------
+
+def _check_dedup_isolation(base: Path):
+    store = blobstore.BlobStore(base)
+    store.write(base / "a.txt", b"same")
+    store.write(base / "b.txt", b"same")
+    assert os.stat(base / "a.txt").st_ino != os.stat(base / "b.txt").st_ino
+
+    with open(base / "a.txt", "a") as f:  # In-place edit, as fs_tools and editors do
+        f.write("EDIT")
+    assert (base / "b.txt").read_bytes() == b"same"
+    assert (base / "a.txt").read_bytes() == b"sameEDIT"
+    return store
+
+
+def test_blob_dedup_isolation():
+    base = Path(tempfile.mkdtemp(prefix="blobs_"))
+    try:
+        _check_dedup_isolation(base)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def test_blob_dedup_isolation_with_reflinks():
+    base = Path(tempfile.mkdtemp(prefix="blobs_"))
+    original = blobstore.reflink
+    blobstore.reflink = _copying_reflink
+    try:
+        store = _check_dedup_isolation(base)
+        assert store.reflinks
+        assert store.stats()["blobs"] == 1  # One blob for both files
+
+        store.write(base / "c.txt", b"other")
+        (base / "c.txt").unlink()
+        assert store.gc() == 1  # Only the blob of the deleted file goes
+        assert (base / "b.txt").read_bytes() == b"same"
+        assert store.stats()["blobs"] == 1
+    finally:
+        blobstore.reflink = original
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def test_blob_gc_splits_legacy_hardlinks():
+    base = Path(tempfile.mkdtemp(prefix="blobs_"))
+    original = blobstore.reflink
+    blobstore.reflink = _copying_reflink
+    try:
+        store = blobstore.BlobStore(base)
+        blob = store.blob_path(store.write(base / "a.txt", b"legacy"))
+        os.link(blob, base / "b.txt")  # What the old store did
+        os.link(blob, base / "c.txt")
+        store.gc()
+        assert os.stat(base / "b.txt").st_ino != os.stat(base / "c.txt").st_ino
+        with open(base / "b.txt", "a") as f:
+            f.write("EDIT")
+        assert (base / "c.txt").read_bytes() == b"legacy"
+    finally:
+        blobstore.reflink = original
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def test_sandbox_write_keeps_identical_files_separate():
+    client, sandbox = _client("write")
+    for name in ("a.txt", "b.txt"):
+        assert client.post("/sandbox/write", json={"path": name, "content": "same"}).json()["ok"]
+    with open(sandbox / "a.txt", "a") as f:
+        f.write("EDIT")
+    assert (sandbox / "b.txt").read_text() == "same"
+
+
+def test_sandbox_read_returns_whole_files_unless_a_range_is_asked_for():
+    from src import config
+
+    client, sandbox = _client("read")
+    text = "line\n" * (config.READ_PAGE_BYTES // 5 + 1000)  # Over one page
+    (sandbox / "big.txt").write_text(text)
+
+    whole = client.get("/sandbox/read", params={"path": "big.txt"}).json()
+    assert whole["ok"] and whole["content"] == text and not whole["truncated"]
+
+    page = client.get("/sandbox/read", params={"path": "big.txt", "offset": 0, "length": 10}).json()
+    assert page["content"] == text[:10] and page["truncated"] and page["next_offset"] == 10
+    last = client.get("/sandbox/read", params={"path": "big.txt", "offset": len(text) - 5}).json()
+    assert last["content"] == "line\n" and not last["truncated"]
+
+
+def test_sandbox_blob_store_is_shared_and_plain_without_reflinks():
+    import runner
+
+    client, sandbox = _client("plain_writes")
+    original = blobstore.reflink
+    probes = []
+    blobstore.reflink = lambda src, dst: probes.append(dst) or False
+    try:
+        for content in ("same", "same", "other"):
+            result = client.post("/sandbox/write", json={"path": "a.txt", "content": content}).json()
+            assert result["ok"] and "sha256" not in result  # Nothing hashed without dedup
+        assert len(probes) == 1 and runner._sandbox_blobs() is runner._sandbox_blobs()
+        assert runner._sandbox_blobs().stats()["blobs"] == 0
+        assert (sandbox / "a.txt").read_text() == "other"
+    finally:
+        blobstore.reflink = original
+
+
+# ---------- uploads ----------
+
+def test_chunked_upload_resumes_and_verifies():
+    client, sandbox = _client("upload")
+    data = os.urandom(3000)
+    digest = hashlib.sha256(data).hexdigest()
+    start = client.post("/sandbox/upload/start", json={"path": "d/up.bin", "size": len(data)}).json()
+    upload_id = start["upload_id"]
+
+    assert client.put(f"/sandbox/upload/{upload_id}", params={"offset": 0}, content=data[:2000]).json()["ok"]
+    # The client lost the reply, asks where to resume and re-sends an overlapping chunk
+    assert client.get(f"/sandbox/upload/{upload_id}").json()["received"] == 2000
+    status = client.put(f"/sandbox/upload/{upload_id}", params={"offset": 1500}, content=data[1500:]).json()
+    assert status["received"] == len(data)
+    assert not client.put(f"/sandbox/upload/{upload_id}", params={"offset": 5000}, content=b"x").json()["ok"]
+
+    bad = client.post(f"/sandbox/upload/{upload_id}/complete", json={"sha256": "0" * 64}).json()
+    assert not bad["ok"] and "Checksum" in bad["error"] and not (sandbox / "d" / "up.bin").exists()
+    done = client.post(f"/sandbox/upload/{upload_id}/complete", json={"sha256": digest}).json()
+    assert done["ok"] and done["sha256"] == digest
+    assert (sandbox / "d" / "up.bin").read_bytes() == data
+    assert not any((sandbox / ".uploads").iterdir())
+
+
+def test_upload_rejects_short_files_and_escaping_paths():
+    client, sandbox = _client("upload_errors")
+    upload_id = client.post("/sandbox/upload/start", json={"path": "a.bin", "size": 10}).json()["upload_id"]
+    client.put(f"/sandbox/upload/{upload_id}", content=b"12345")
+    result = client.post(f"/sandbox/upload/{upload_id}/complete", json={}).json()
+    assert not result["ok"] and "Incomplete" in result["error"]
+    assert client.delete(f"/sandbox/upload/{upload_id}").json()["ok"]
+    assert not client.get(f"/sandbox/upload/{upload_id}").json()["ok"]
+
+    assert not client.post("/sandbox/upload/start", json={"path": "../x.bin"}).json()["ok"]
+    assert not client.put("/sandbox/upload", params={"path": "../x.bin"}, content=b"x").json()["ok"]
+    assert "Invalid" in client.get("/sandbox/upload/not-an-id").json()["error"]
+
+    whole = client.put("/sandbox/upload", params={"path": "whole.txt"}, content=b"one request").json()
+    assert whole["ok"] and (sandbox / "whole.txt").read_bytes() == b"one request"
+
+
+def test_gc_expires_stale_uploads():
+    client, sandbox = _client("upload_expiry")
+    stale = client.post("/sandbox/upload/start", json={"path": "old.bin"}).json()["upload_id"]
+    fresh = client.post("/sandbox/upload/start", json={"path": "new.bin"}).json()["upload_id"]
+    client.put(f"/sandbox/upload/{stale}", content=b"partial")
+    meta_path = sandbox / ".uploads" / f"{stale}.json"
+    meta = json.loads(meta_path.read_text())
+    meta_path.write_text(json.dumps({**meta, "created_at": meta["created_at"] - 2 * 24 * 3600}))
+
+    result = client.post("/sandbox/gc").json()
+    assert result["ok"] and result["expired_uploads"] == 1
+    assert not client.get(f"/sandbox/upload/{stale}").json()["ok"]
+    assert client.get(f"/sandbox/upload/{fresh}").json()["ok"]
+    assert sorted(p.name for p in (sandbox / ".uploads").iterdir()) == [f"{fresh}.json", f"{fresh}.part"]
+
+
+# ---------- delta sync ----------
+
+def _plan(client, path: str, data: bytes, block_size: int = 64):
+    return client.post("/sandbox/sync/plan", json={
+        "path": path, "size": len(data), "sha256": hashlib.sha256(data).hexdigest(),
+        "block_size": block_size, "blocks": blobstore.compute_block_hashes(data, block_size),
+    }).json()
+
+
+def _missing_blocks(data: bytes, missing, block_size: int = 64) -> bytes:
+    return b"".join(data[i * block_size:(i + 1) * block_size] for i in missing)
+
+
+def test_delta_sync_uploads_only_changed_blocks():
+    client, sandbox = _client("sync")
+    old = bytes(range(256)) * 8
+    (sandbox / "f.bin").write_bytes(old)
+    new = b"inserted" + old[:1000] + b"changed" + old[1000:] + b"tail"
+
+    plan = _plan(client, "f.bin", new)
+    assert plan["ok"] and plan["reused_bytes"] > len(new) // 2
+    payload = _missing_blocks(new, plan["missing"])
+    result = client.post(f"/sandbox/sync/{plan['sync_id']}", content=payload).json()
+    assert result["ok"] and result["uploaded_bytes"] == len(payload)
+    assert (sandbox / "f.bin").read_bytes() == new
+
+    fresh = _plan(client, "new.bin", b"brand new")  # Nothing to reuse
+    assert fresh["missing"] == [0] and fresh["reused_bytes"] == 0
+    assert client.post(f"/sandbox/sync/{fresh['sync_id']}", content=b"brand new").json()["ok"]
+    assert (sandbox / "new.bin").read_bytes() == b"brand new"
+
+
+def test_delta_sync_rejects_bad_payloads_and_stale_plans():
+    client, sandbox = _client("sync_errors")
+    old = b"0123456789" * 40
+    (sandbox / "f.txt").write_bytes(old)
+    new = old + b"more"
+
+    plan = _plan(client, "f.txt", new)
+    wrong = b"x" * len(_missing_blocks(new, plan["missing"]))
+    result = client.post(f"/sandbox/sync/{plan['sync_id']}", content=wrong).json()
+    assert not result["ok"] and "Checksum" in result["error"]
+    assert (sandbox / "f.txt").read_bytes() == old
+
+    plan = _plan(client, "f.txt", new)
+    (sandbox / "f.txt").write_bytes(old)  # Changed (mtime) after planning
+    os.utime(sandbox / "f.txt", ns=(0, 0))
+    result = client.post(f"/sandbox/sync/{plan['sync_id']}",
+                         content=_missing_blocks(new, plan["missing"])).json()
+    assert not result["ok"] and "changed" in result["error"]
+
+    assert not client.post("/sandbox/sync/unknown", content=b"").json()["ok"]
+    assert not _plan(client, "../escape.txt", b"x")["ok"]
+
+
+# ---------- listings ----------
+
+def test_tree_walks_once_per_request():
+    import runner
+
+    client, sandbox = _client("tree")
+    (sandbox / "d").mkdir()
+    (sandbox / "d" / "a.txt").write_text("A")
+    lister = runner._sandbox_tree()
+    scans = []
+    original = lister.scan
+    lister.scan = lambda *args, **kwargs: scans.append(args) or original(*args, **kwargs)
+
+    response = client.get("/sandbox/tree")
+    assert response.json()["ok"] and len(scans) == 1
+    etag = response.headers["ETag"]
+    assert client.get("/sandbox/tree", headers={"If-None-Match": etag}).status_code == 304
+    assert len(scans) == 2
+
+    (sandbox / "d" / "b.txt").write_text("B")
+    diff = client.get("/sandbox/tree", params={"since": etag.strip('"')}).json()
+    assert not diff["full"] and [e["path"] for e in diff["entries"]] == ["d", "d/b.txt"]
+    assert len(scans) == 3
+
+
+def test_tree_sees_in_place_edits():
+    import runner
+
+    client, sandbox = _client("tree_edits")
+    (sandbox / "d").mkdir()
+    (sandbox / "d" / "a.txt").write_text("A")
+    (sandbox / "gone.txt").write_text("G")
+    first = client.get("/sandbox/tree", params={"hashes": True})
+    etag = first.headers["ETag"]
+
+    dir_mtime = os.stat(sandbox / "d").st_mtime_ns
+    with open(sandbox / "d" / "a.txt", "a") as f:  # As append_file, /shell and scripts do
+        f.write("PPEND")
+    os.utime(sandbox / "d" / "a.txt", ns=(0, 10 ** 18))
+    assert os.stat(sandbox / "d").st_mtime_ns == dir_mtime
+
+    again = client.get("/sandbox/tree", params={"hashes": True}, headers={"If-None-Match": etag})
+    assert again.status_code == 200
+    entry = next(e for e in again.json()["entries"] if e["path"] == "d/a.txt")
+    assert entry["size"] == 6 and entry["sha256"] == hashlib.sha256(b"APPEND").hexdigest()
+
+    diff = client.get("/sandbox/tree", params={"since": etag.strip('"').removesuffix("-h")}).json()
+    assert [e["path"] for e in diff["entries"]] == ["d/a.txt"]
+
+    (sandbox / "gone.txt").unlink()
+    client.get("/sandbox/tree")
+    assert str(sandbox / "gone.txt") not in runner._sandbox_tree()._hashes
+
+
+# ---------- batch ----------
+
+def test_atomic_batch_rolls_back_on_failure():
+    client, sandbox = _client("batch_rollback")
+    (sandbox / "keep.txt").write_text("original")
+    (sandbox / "d").mkdir()
+    (sandbox / "d" / "b.txt").write_text("B")
+    result = client.post("/sandbox/batch", json={"atomic": True, "ops": [
+        {"op": "write", "path": "keep.txt", "content": "changed"},
+        {"op": "write", "path": "new.txt", "content": "N"},
+        {"op": "rename", "from": "d/b.txt", "to": "c.txt"},
+        {"op": "delete", "path": "missing.txt"},
+        {"op": "write", "path": "never.txt", "content": "x"},
+    ]}).json()
+    assert not result["ok"] and result["rolled_back"]
+    assert (sandbox / "keep.txt").read_text() == "original"
+    assert not (sandbox / "new.txt").exists()
+    assert (sandbox / "d" / "b.txt").read_text() == "B" and not (sandbox / "c.txt").exists()
+    assert not (sandbox / "never.txt").exists()
+    assert result["results"][4]["error"].startswith("Skipped")
+    assert not any((sandbox / ".batch").iterdir())
+
+
+def test_atomic_batch_with_invalid_op_runs_nothing():
+    client, sandbox = _client("batch_invalid")
+    (sandbox / "keep.txt").write_text("original")
+    response = client.post("/sandbox/batch", json={"atomic": True, "ops": [
+        {"op": "write", "path": "keep.txt", "content": "changed"},
+        {"op": "write", "content": "no path"},
+        {"op": "rename", "from": "keep.txt"},
+    ]})
+    assert response.status_code == 200
+    result = response.json()
+    assert not result["ok"] and not result["rolled_back"]
+    assert [r["ok"] for r in result["results"]] == [False, False, False]
+    assert "path" in result["results"][1]["error"] and "to" in result["results"][2]["error"]
+    assert (sandbox / "keep.txt").read_text() == "original"
+
+
+def test_batch_reports_invalid_ops_and_runs_the_rest():
+    client, sandbox = _client("batch_partial")
+    result = client.post("/sandbox/batch", json={"ops": [
+        {"op": "delete"},
+        {"op": "write", "path": "a.txt", "content": "A"},
+        {"op": "frobnicate", "path": "a.txt"},
+        {"op": "read", "path": "a.txt"},
+    ]}).json()
+    assert [r["ok"] for r in result["results"]] == [False, True, False, True]
+    assert result["results"][3]["content"] == "A"
+
+
+# ---------- request metrics ----------
+
+def test_request_metrics_cover_streamed_bodies():
+    import runner
+    from fastapi.responses import StreamingResponse
+
+    seen = []
+
+    def chunks():
+        for _ in range(3):
+            seen.append(runner._HTTP_IN_FLIGHT.labels().get())
+            yield b"x"
+
+    if not any(getattr(r, "path", None) == "/_test/stream" for r in runner.app.routes):
+        runner.app.add_api_route("/_test/stream", lambda: StreamingResponse(chunks()))
+    client, _ = _client("metrics")
+    timed = runner._HTTP_DURATION.labels("GET", "/_test/stream", 200)
+    count = timed.snapshot()[2]
+
+    assert client.get("/_test/stream").content == b"xxx"
+    assert seen and all(value >= 1 for value in seen)  # Still in flight while the body streams
+    assert runner._HTTP_IN_FLIGHT.labels().get() == 0
+    assert timed.snapshot()[2] == count + 1
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✓ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {name}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
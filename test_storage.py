@@ -0,0 +1,173 @@
+"""
+Storage tests for Project ME v0
+Record codec, task store id index and compact bulk records, on temporary files.
+
+Runs under pytest or directly: python test_storage.py
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from src import codec
+from src.memory import EventType, MemoryStore
+from src.tasks import Task, TaskStatus, TaskStore
+
+
+def _store() -> TaskStore:
+    return TaskStore(Path(tempfile.mkdtemp(prefix="storage_test_")) / "tasks.jsonl")
+
+
+# ---------- codec ----------
+
+_RECORD = {
+    "id": "t1",
+    "status": "pending",
+    "title": "Ünïcode ✓ \"quoted\" \\ back",
+    "tags": ["a", "b"],
+    "count": 2 ** 70,  # Past 64 bits: the fast backends hand this to json
+    "payload": {"text": "x" * 5000, "nested": {"list": [1, 2.5, None, True]}},
+    "result": None,
+}
+
+
+def test_codec_round_trip():
+    line = codec.encode_line(_RECORD)
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert codec.loads(line) == _RECORD
+    assert json.loads(line) == _RECORD  # Any backend's output reads back with the json module
+    assert codec.loads(json.dumps(_RECORD).encode()) == _RECORD
+
+
+def test_codec_split_line_defers_blobs():
+    line = codec.encode_line(_RECORD)
+    header, blobs = codec.split_line(line, ("payload", "result"), required=("status",), min_bytes=0)
+    assert not blobs.decoded and blobs.nbytes > 5000
+    assert header == {k: v for k, v in _RECORD.items() if k not in ("payload", "result")}
+    assert blobs.values() == {"payload": _RECORD["payload"], "result": None}
+    assert codec.loads(blobs.raw()) == blobs.values()
+
+
+def test_codec_split_line_other_layouts_decode_in_full():
+    blobs_first = json.dumps({"payload": {"status": "fake"}, "id": "t1", "status": "done"}).encode()
+    header, blobs = codec.split_line(blobs_first, ("payload",), required=("status",), min_bytes=0)
+    assert header == {"id": "t1", "status": "done"} and blobs.get("payload") == {"status": "fake"}
+
+    short = codec.encode_line({"id": "t2", "payload": {"a": 1}})
+    header, blobs = codec.split_line(short, ("payload",))
+    assert blobs.decoded and header == {"id": "t2"} and blobs.get("payload") == {"a": 1}
+
+    try:
+        codec.split_line(b'{"id": "t3", "payload": {', ("payload",), min_bytes=0)
+        raise AssertionError("split_line() should have raised")
+    except codec.DECODE_ERRORS:
+        pass
+
+
+def test_codec_needles_match_encoded_values():
+    line = codec.encode_line(_RECORD)
+    assert codec.needle("pending") in line
+    assert codec.needle("t1") in line
+    for value in ("", None, "Ünïcode", 'with "quote"', "back\\slash", "tab\t"):
+        assert codec.needle(value) is None
+
+
+def test_codec_timestamps_pack_exactly():
+    for value in ("2024-05-01T12:30:45.123456", "2024-05-01T12:30:45"):
+        packed = codec.pack_timestamp(value)
+        assert type(packed) is int and codec.unpack_timestamp(packed) == value
+    for value in ("2024-05-01T12:30:45.000000", "2024-05-01T12:30:45+00:00", "yesterday", None, 5):
+        assert codec.pack_timestamp(value) == value
+
+
+# ---------- task store id index ----------
+
+def test_task_index_finds_batched_and_single_tasks():
+    store = _store()
+    batch = store.create_tasks([{"type": "echo", "payload": {"i": i}, "tags": ["bulk"]} for i in range(50)])
+    single = store.create_task("echo", {"i": "single"}, title="one")
+    assert len({task.id for task in batch}) == 50
+
+    for task in (batch[0], batch[37], single):
+        assert store.get_task_by_id(task.id).to_dict() == task.to_dict()
+    assert store.get_task_by_id("missing") is None
+    assert len(store._index) == 51  # Appends extended the index instead of dropping it
+
+
+def test_task_index_follows_rewrites_and_outside_appends():
+    store = _store()
+    first, second = store.create_tasks([{"type": "echo"}, {"type": "echo"}])
+    store.get_task_by_id(first.id)
+
+    first.payload = {"grown": "x" * 1000}  # Moves the second task's offset
+    store.update_task(first)
+    assert store.get_task_by_id(second.id).id == second.id
+    assert store.get_task_by_id(first.id).payload == first.payload
+
+    other = _store()
+    other.filepath = store.filepath
+    outside = other.create_task("echo", {})  # Another process appending
+    assert store.get_task_by_id(outside.id).id == outside.id
+
+
+def test_task_index_survives_same_size_rewrite():
+    store = _store()
+    task = store.create_task("echo", {})
+    store.get_task_by_id(task.id)
+
+    stat = os.stat(store.filepath)
+    replacement = Task(**{**task.__dict__, "id": task.id[::-1]})
+    store.filepath.write_bytes(codec.encode_line(replacement.to_dict()))
+    os.utime(store.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # Same size and mtime
+
+    assert store.get_task_by_id(task.id) is None
+    assert store.get_task_by_id(replacement.id).id == replacement.id
+
+
+# ---------- compact records ----------
+
+def test_task_records_match_tasks():
+    store = _store()
+    tasks = store.create_tasks([
+        {"type": "echo", "payload": {"n": 1}, "tags": ["x", "y"], "title": "first"},
+        {"type": "shell", "payload": {"cmd": "ls"}, "tags": ["x", "y"]},
+    ])
+    tasks[1].update_status(TaskStatus.DONE, result={"out": "ok"})
+    store.update_task(tasks[1])
+
+    records = store.load_task_records()
+    assert [r.to_dict() for r in records] == [t.to_dict() for t in tasks]
+    assert records[0].tags is records[1].tags  # One shared tuple per distinct tag set
+    assert records[1].result == {"out": "ok"} and records[1].to_task() == tasks[1]
+    assert [r.id for r in store.load_task_records(status="done")] == [tasks[1].id]
+    assert [r.id for r in store.load_task_records(task_type="echo", tag="x")] == [tasks[0].id]
+
+
+def test_event_records_match_events():
+    memory = MemoryStore(Path(tempfile.mkdtemp(prefix="storage_test_")) / "events.jsonl")
+    events = [
+        memory.log_event(EventType.INFO, {"message": "a"}, task_id="t1"),
+        memory.log_event(EventType.ERROR, {"message": "b"}, task_id="t2"),
+        memory.log_event_async(EventType.INFO, {"message": "c" * 5000}, task_id="t1"),
+    ]
+    memory.flush()
+
+    records = list(memory.iter_event_records())
+    assert [r.to_dict() for r in records] == [e.to_dict() for e in events]
+    assert records[2].data == {"message": "c" * 5000}
+    assert [e.id for e in memory.iter_events_filtered(task_id="t1")] == [events[0].id, events[2].id]
+    assert [r.id for r in memory.iter_event_records(event_type="error")] == [events[1].id]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"✓ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {name}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
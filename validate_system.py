@@ -4,8 +4,15 @@ Run this to verify all components are properly installed and configured.
 """
 import sys
 import os
+import json
+import subprocess
 from pathlib import Path
 
+# Import-time budget for `import main` (project modules only, not interpreter startup)
+STARTUP_BUDGET_MS = 100
+# Modules `import main` must leave for the commands that need them
+DEFERRED_MODULES = ["requests", "src.agent", "src.llm_client", "src.tools"]
+
 
 def print_header(text):
     """Print a section header."""
@@ -131,6 +138,47 @@ def check_api_server():
         return False
 
 
+def check_startup_time():
+    """Check that `import main` stays within its import-time budget and defers heavy modules."""
+    print_header("CLI Startup Check")
+
+    probe = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = (time.perf_counter() - t) * 1000\n"
+        f"print(json.dumps([elapsed, [m for m in {DEFERRED_MODULES!r} if m in sys.modules]]))\n"
+    )
+    timings = []
+    loaded = []
+    for _ in range(3):  # Best of three: the first run may also be compiling .pyc files
+        try:
+            result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, timeout=60)
+        except subprocess.TimeoutExpired:
+            print("❌ `import main` timed out")
+            return False
+        if result.returncode != 0:
+            print(f"❌ `import main` failed: {result.stderr.strip()[-300:]}")
+            return False
+        elapsed, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(elapsed)
+
+    best = min(timings)
+    ok = True
+    if best <= STARTUP_BUDGET_MS:
+        print(f"✅ import main: {best:.1f} ms (budget {STARTUP_BUDGET_MS} ms)")
+    else:
+        print(f"❌ import main: {best:.1f} ms (budget {STARTUP_BUDGET_MS} ms)")
+        ok = False
+    if loaded:
+        print(f"❌ Imported eagerly (should be deferred): {', '.join(loaded)}")
+        print("💡 Run: python -X importtime -c \"import main\" to see who imports them")
+        ok = False
+    else:
+        print("✅ Agent, tools and requests are loaded on first use")
+    return ok
+
+
 def check_web_ui():
     """Check if Web UI dependencies are installed."""
     print_header("Web UI Check")
@@ -201,6 +249,7 @@ def main():
         ("Project Structure", check_project_structure),
         ("Logs Directory", check_logs_directory),
         ("API Server", check_api_server),
+        ("CLI Startup", check_startup_time),
         ("Web UI", check_web_ui),
         ("LM Studio", check_lm_studio),
     ]
@@ -217,7 +266,8 @@ def main():
         "Python Dependencies",
         "Project Structure",
         "Logs Directory",
-        "API Server"
+        "API Server",
+        "CLI Startup",
     ]
 
     optional_checks = [